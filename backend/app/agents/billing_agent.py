@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-import os
+import asyncio
 import re
 import sys
-import importlib
-from contextlib import contextmanager
+import threading
 from pathlib import Path
 
 from app.core.langfuse_config import langfuse
@@ -19,14 +18,25 @@ def _ensure_sys_path(path: Path) -> None:
         sys.path.insert(0, path_str)
 
 
-@contextmanager
-def _working_directory(path: Path):
-    current = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(current)
+_load_lock = threading.Lock()
+_process_billing = None
+
+
+def get_process_billing():
+    """
+    Import the billing pipeline once. Its modules resolve data files from
+    their own location and cache the inventory, so calls need no chdir and
+    can run concurrently in worker threads.
+    """
+    global _process_billing
+    if _process_billing is None:
+        with _load_lock:
+            if _process_billing is None:
+                _ensure_sys_path(BILLING_ROOT)
+                from billing_main import process_billing
+
+                _process_billing = process_billing
+    return _process_billing
 
 
 def _normalize_cart_items(input_data: dict) -> list[dict]:
@@ -57,8 +67,6 @@ async def run(input_data: dict) -> dict:
     _out: dict = {}
     with langfuse.start_as_current_span(name="billing-agent", input=input_data) as span:
         try:
-            _ensure_sys_path(BILLING_ROOT)
-
             cart_items = _normalize_cart_items(input_data)
             if not cart_items:
                 _out = {
@@ -67,9 +75,7 @@ async def run(input_data: dict) -> dict:
                     "message": "Provide `cart_items`/`items` or a parsable `query` (e.g. 'buy 2 paracetamol').",
                 }
             else:
-                with _working_directory(BILLING_ROOT):
-                    process_billing = importlib.import_module("billing_main").process_billing
-                    invoice = process_billing(cart_items)
+                invoice = await asyncio.to_thread(get_process_billing(), cart_items)
                 _out = {"agent": "billing", "status": "success", "invoice": invoice}
         except Exception as e:
             _out = {"agent": "billing", "status": "error", "message": str(e)}
@@ -10,6 +10,7 @@ from datetime import datetime
 import os
 
 from app.core.langfuse_config import langfuse
+from app.services import active_alerts
 
 
 # Stock refill thresholds (percentage)
@@ -44,7 +45,7 @@ async def run(input_data: dict) -> dict:
             elif action == "subscribe":
                 _out = await _subscribe_to_alerts(input_data)
             elif action == "get_alerts":
-                _out = _get_active_alerts(input_data)
+                _out = await _get_active_alerts(input_data)
             else:
                 _out = {
                     "agent": "notification",
@@ -218,36 +219,23 @@ async def _subscribe_to_alerts(input_data: dict) -> dict:
     }
 
 
-def _get_active_alerts(input_data: dict) -> dict:
-    """Get active stock refill alerts"""
+async def _get_active_alerts(input_data: dict) -> dict:
+    """Get active stock refill alerts from the in-memory view of stock_alerts"""
     customer_id = input_data.get("customer_id")
+    medicine_id = input_data.get("medicine_id")
     medicine_name = input_data.get("medicine_name")
+    severity = input_data.get("severity")
     
-    # Simulated active alerts
-    active_alerts = [
-        {
-            "id": "ALERT-001",
-            "medicine_name": "Paracetamol 500mg",
-            "level": "warning",
-            "current_stock": 25,
-            "threshold": 30,
-            "created_at": datetime.now().isoformat(),
-            "refill_quantity": 100
-        },
-        {
-            "id": "ALERT-002",
-            "medicine_name": "Amoxicillin 250mg",
-            "level": "critical",
-            "current_stock": 5,
-            "threshold": 10,
-            "created_at": datetime.now().isoformat(),
-            "refill_quantity": 200
-        }
-    ]
+    await active_alerts.ensure_loaded()
+    filtered_alerts = active_alerts.query(medicine_id=medicine_id, medicine_name=medicine_name, severity=severity)
     
-    filtered_alerts = active_alerts
-    if medicine_name:
-        filtered_alerts = [a for a in active_alerts if medicine_name.lower() in a["medicine_name"].lower()]
+    if medicine_id is None and not medicine_name and not severity:
+        by_severity = active_alerts.counts()
+        critical = by_severity.get("critical", 0)
+        warning = by_severity.get("warning", 0)
+    else:
+        critical = len([a for a in filtered_alerts if a["severity"] == "critical"])
+        warning = len([a for a in filtered_alerts if a["severity"] == "warning"])
     
     return {
         "agent": "notification",
@@ -255,8 +243,8 @@ def _get_active_alerts(input_data: dict) -> dict:
         "customer_id": customer_id,
         "active_alerts": filtered_alerts,
         "alert_count": len(filtered_alerts),
-        "critical_alerts": len([a for a in filtered_alerts if a["level"] == "critical"]),
-        "warning_alerts": len([a for a in filtered_alerts if a["level"] == "warning"]),
+        "critical_alerts": critical,
+        "warning_alerts": warning,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -1,19 +1,17 @@
 from __future__ import annotations
 
-import os
+import asyncio
 import re
 import sys
-import importlib
-from contextlib import contextmanager
 from pathlib import Path
 
+from app.agents.billing_agent import get_process_billing
+from app.agents.prescription_agent import get_analyze_prescription, resolve_image_path
 from app.core.langfuse_config import langfuse
 
 
 TEMP_MODELS_DIR = Path(__file__).resolve().parents[2] / "temp_models"
 PLANNER_ROOT = TEMP_MODELS_DIR / "planner"
-BILLING_ROOT = TEMP_MODELS_DIR / "billing" / "billing_agent"
-PRESCRIPTION_ROOT = TEMP_MODELS_DIR / "prescription" / "prescription_authorization"
 
 
 def _ensure_sys_path(path: Path) -> None:
@@ -22,16 +20,6 @@ def _ensure_sys_path(path: Path) -> None:
         sys.path.insert(0, path_str)
 
 
-@contextmanager
-def _working_directory(path: Path):
-    current = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(current)
-
-
 def _load_dependencies():
     _ensure_sys_path(PLANNER_ROOT)
 
@@ -93,8 +81,6 @@ async def run(input_data: dict) -> dict:
     with langfuse.start_as_current_span(name="planner-agent", input=input_data) as span:
         try:
             Planner = _load_dependencies()
-            _ensure_sys_path(BILLING_ROOT)
-            _ensure_sys_path(PRESCRIPTION_ROOT)
 
             order_items = _normalize_order_items(input_data)
             if not order_items:
@@ -108,9 +94,7 @@ async def run(input_data: dict) -> dict:
 
                 def prescription_analyzer(path: str | None) -> dict:
                     if path:
-                        with _working_directory(PRESCRIPTION_ROOT):
-                            analyze_prescription = importlib.import_module("main").analyze_prescription
-                            return analyze_prescription(path)
+                        return get_analyze_prescription()(resolve_image_path(path))
                     return {
                         "status": "success",
                         "decision": "APPROVED",
@@ -119,16 +103,14 @@ async def run(input_data: dict) -> dict:
 
                 def billing_processor(items: list[dict]) -> dict:
                     cart_items = [{"name": item["name"], "quantity": int(item.get("quantity", 1))} for item in items]
-                    with _working_directory(BILLING_ROOT):
-                        process_billing = importlib.import_module("billing_main").process_billing
-                        return process_billing(cart_items)
+                    return get_process_billing()(cart_items)
 
                 planner = Planner(
                     stock_checker=lambda items: {"status": "success", "items": items},
                     prescription_analyzer=prescription_analyzer,
                     billing_processor=billing_processor,
                 )
-                result = planner.execute_workflow(order_items, prescription_image_path)
+                result = await asyncio.to_thread(planner.execute_workflow, order_items, prescription_image_path)
                 _out = {"agent": "planner", **result}
         except Exception as e:
             _out = {"agent": "planner", "status": "error", "message": str(e)}
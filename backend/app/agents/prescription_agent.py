@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import os
+import asyncio
 import sys
-import importlib
-from contextlib import contextmanager
+import threading
 from pathlib import Path
 
 from app.core.langfuse_config import langfuse
@@ -18,22 +17,35 @@ def _ensure_sys_path(path: Path) -> None:
         sys.path.insert(0, path_str)
 
 
-@contextmanager
-def _working_directory(path: Path):
-    current = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(current)
+_load_lock = threading.Lock()
+_analyze_prescription = None
+
+
+def get_analyze_prescription():
+    """Import the prescription pipeline once; its registries load at import."""
+    global _analyze_prescription
+    if _analyze_prescription is None:
+        with _load_lock:
+            if _analyze_prescription is None:
+                _ensure_sys_path(PRESCRIPTION_ROOT)
+                from main import analyze_prescription
+
+                _analyze_prescription = analyze_prescription
+    return _analyze_prescription
+
+
+def resolve_image_path(image_path: str) -> str:
+    # Relative paths used to resolve against the pipeline directory via chdir.
+    path = Path(image_path)
+    if not path.is_absolute():
+        path = PRESCRIPTION_ROOT / path
+    return str(path)
 
 
 async def run(input_data: dict) -> dict:
     _out: dict = {}
     with langfuse.start_as_current_span(name="prescription-agent", input=input_data) as span:
         try:
-            _ensure_sys_path(PRESCRIPTION_ROOT)
-
             image_path = input_data.get("image_path") or input_data.get("prescription_image_path")
             if not image_path:
                 _out = {
@@ -42,9 +54,7 @@ async def run(input_data: dict) -> dict:
                     "message": "Provide `image_path` (or `prescription_image_path`) for prescription analysis.",
                 }
             else:
-                with _working_directory(PRESCRIPTION_ROOT):
-                    analyze_prescription = importlib.import_module("main").analyze_prescription
-                    result = analyze_prescription(str(image_path))
+                result = await asyncio.to_thread(get_analyze_prescription(), resolve_image_path(str(image_path)))
                 _out = {"agent": "prescription", **result}
         except Exception as e:
             _out = {"agent": "prescription", "status": "error", "message": str(e)}
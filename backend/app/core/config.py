@@ -16,6 +16,14 @@ class Settings(BaseSettings):
     SUPABASE_JWT_SECRET: str
 
     DATABASE_URL: str
+    DB_BREAKER_FAILURE_THRESHOLD: int = 3
+    DB_BREAKER_RESET_SECONDS: float = 30.0
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_PAYLOAD_TTL_SECONDS: float = 120.0
+    INVOICE_RENDER_WORKERS: int = 2
+    INVOICE_RENDER_CONCURRENCY: int = 4
+    INVOICE_PDF_WRITE_TO_DISK: bool = False
+    INVOICE_PDF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
 
     GROK_API_KEY: str
     GROK_BASE_URL: str
@@ -29,6 +37,17 @@ class Settings(BaseSettings):
     N8N_ORDER_WEBHOOK: str
     RAZORPAY_KEY_ID: str
     RAZORPAY_KEY_SECRET: str
+    RAZORPAY_MAX_WORKERS: int = 4
+    RAZORPAY_ORDER_REUSE_SECONDS: float = 3600.0
+    STOCK_HOLD_TTL_SECONDS: float = 900.0
+    STOCK_HOLD_SWEEP_SECONDS: float = 60.0
+    ANALYTICS_CACHE_MAX_AGE_SECONDS: float = 60.0
+    DEMAND_FORECAST_HISTORY_DAYS: int = 90
+    DEMAND_FORECAST_INTERVAL_SECONDS: float = 3600.0
+    STOCK_ALERT_WINDOW_SECONDS: float = 60.0
+    REFILL_REMINDER_BATCH_SIZE: int = 100
+    REFILL_REMINDER_MAX_SLEEP_SECONDS: float = 3600.0
+    REFILL_REMINDER_RETRY_SECONDS: float = 300.0
     GEMINI_API_KEY: str = ""
 
     @field_validator("DATABASE_URL", mode="before")
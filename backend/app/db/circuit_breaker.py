@@ -0,0 +1,98 @@
+"""
+Process-wide circuit breaker for the primary database.
+
+When Supabase is paused or unreachable every new connection attempt waits on
+a connect timeout. The breaker trips after a few consecutive connection
+failures and then rejects new connections immediately, so callers fall back
+to the local SQLite store and the in-memory catalog snapshot without waiting.
+After ``reset_timeout`` seconds one probe connection is let through; if it
+succeeds the breaker closes again.
+"""
+
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DatabaseCircuitOpen(ConnectionError):
+    """Raised instead of connecting while the database breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._cooldown_elapsed():
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while callers should skip the database entirely."""
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            if self._state == OPEN:
+                return not self._cooldown_elapsed()
+            return self._probe_pending()
+
+    def allow_request(self) -> bool:
+        """Reserve a connection attempt; lets a single probe through when half-open."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and not self._cooldown_elapsed():
+                return False
+            if self._probe_pending():
+                return False
+            self._state = HALF_OPEN
+            self._probe_in_flight = True
+            self._probe_started_at = time.monotonic()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == OPEN:
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+            }
+
+    def _cooldown_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def _probe_pending(self) -> bool:
+        # A probe that never reported back (e.g. cancelled request) must not
+        # keep the breaker half-open forever.
+        return self._probe_in_flight and time.monotonic() - self._probe_started_at < self.reset_timeout
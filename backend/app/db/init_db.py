@@ -1,10 +1,15 @@
+from sqlalchemy import text
+
 from app.db.base import Base
 from app.db.session import engine
 
 # Ensure all model tables are registered on metadata before create_all.
-from app.models import customer_history, medicine, order, user, delivery, notification, prescription_storage, medicine_refill_notification  # noqa: F401
+from app.models import customer_history, daily_revenue, demand_forecast, medicine, order, user, delivery, notification, prescription_storage, medicine_refill_notification, stock_reservation  # noqa: F401
 
 
 async def init_db() -> None:
     async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Required by the trigram index on medicines.name.
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,76 @@
+"""
+Apply the SQL files in app/db/migrations to an existing database.
+
+create_all() only creates missing tables, so indexes added to models later
+never reach a database that already has them. Each migration runs once and is
+recorded in schema_migrations. Statements run in autocommit mode so
+CREATE INDEX CONCURRENTLY does not lock the orders table.
+
+The API applies pending migrations on startup (app/main.py). To run them by
+hand (from backend/):
+    python -m app.db.migrate
+"""
+
+import asyncio
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+# Serialises concurrent runs, e.g. several workers starting at once.
+MIGRATION_LOCK_ID = 7_205_001
+
+
+def _split_statements(sql: str) -> list[str]:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements: list[str] = []
+    current: list[str] = []
+    # Semicolons inside $$-quoted function bodies do not end a statement.
+    for index, part in enumerate("\n".join(lines).split("$$")):
+        if index % 2:
+            current.append(f"$${part}$$")
+            continue
+        pieces = part.split(";")
+        current.append(pieces[0])
+        for piece in pieces[1:]:
+            statements.append("".join(current))
+            current = [piece]
+    statements.append("".join(current))
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+async def apply_migrations() -> list[str]:
+    applied: list[str] = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            await conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        name TEXT PRIMARY KEY,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    )
+                    """
+                )
+            )
+            done = set((await conn.execute(text("SELECT name FROM schema_migrations"))).scalars().all())
+
+            for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+                if path.name in done:
+                    continue
+                for statement in _split_statements(path.read_text(encoding="utf-8")):
+                    await conn.execute(text(statement))
+                await conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": path.name})
+                applied.append(path.name)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    return applied
+
+
+if __name__ == "__main__":
+    names = asyncio.run(apply_migrations())
+    print(f"Applied {len(names)} migration(s): {', '.join(names) or 'none'}")
@@ -0,0 +1,12 @@
+-- Composite indexes for the hot order listing queries.
+-- /orders/pending, /orders/approved: WHERE status IN (...) ORDER BY created_at
+-- /orders/my-orders:                 WHERE user_id = ? ORDER BY created_at DESC
+-- /orders/all:                       ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_status_created_at_id
+ON orders (status, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_user_id_created_at_id
+ON orders (user_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_created_at_id
+ON orders (created_at, id);
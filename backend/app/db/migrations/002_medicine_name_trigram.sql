@@ -0,0 +1,5 @@
+-- Medicine lookups use ILIKE '%name%', which a btree index cannot serve.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medicines_name_trgm
+ON medicines USING gin (name gin_trgm_ops);
@@ -0,0 +1,3 @@
+-- Prescription reuse checks look up (customer_id, medicine_name) together.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_prescription_storage_customer_medicine
+ON prescription_storage (customer_id, medicine_name);
@@ -0,0 +1,17 @@
+-- Stock held between checkout and payment (app/services/stock_reservation.py).
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    id SERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    medicine_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'held',
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_stock_reservations_held_order
+ON stock_reservations (order_id) WHERE status = 'held';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stock_reservations_status_expires_at
+ON stock_reservations (status, expires_at);
@@ -0,0 +1,40 @@
+-- Per-day revenue rollup read by /analytics/revenue, kept current by a trigger
+-- on orders. Re-run the backfill with: python -m app.services.revenue_rollup
+CREATE TABLE IF NOT EXISTS daily_revenue (
+    day DATE PRIMARY KEY,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    order_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION daily_revenue_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.created_at IS NOT NULL THEN
+        UPDATE daily_revenue
+        SET revenue = revenue - COALESCE(OLD.total_amount, 0),
+            order_count = order_count - 1
+        WHERE day = OLD.created_at::date;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.created_at IS NOT NULL THEN
+        INSERT INTO daily_revenue AS d (day, revenue, order_count)
+        VALUES (NEW.created_at::date, COALESCE(NEW.total_amount, 0), 1)
+        ON CONFLICT (day) DO UPDATE
+        SET revenue = d.revenue + EXCLUDED.revenue,
+            order_count = d.order_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_daily_revenue ON orders;
+
+CREATE TRIGGER orders_daily_revenue
+AFTER INSERT OR DELETE OR UPDATE OF total_amount, created_at ON orders
+FOR EACH ROW EXECUTE FUNCTION daily_revenue_apply();
+
+INSERT INTO daily_revenue (day, revenue, order_count)
+SELECT created_at::date, COALESCE(SUM(total_amount), 0), COUNT(*)
+FROM orders
+WHERE created_at IS NOT NULL
+GROUP BY created_at::date
+ON CONFLICT (day) DO UPDATE
+SET revenue = EXCLUDED.revenue, order_count = EXCLUDED.order_count;
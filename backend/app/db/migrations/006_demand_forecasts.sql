@@ -0,0 +1,15 @@
+-- Precomputed per-medicine forecasts read by /analytics/demand-forecast.
+CREATE TABLE IF NOT EXISTS demand_forecasts (
+    medicine_id INTEGER PRIMARY KEY,
+    medicine_name VARCHAR NOT NULL,
+    weekly_orders INTEGER NOT NULL DEFAULT 0,
+    previous_week_orders INTEGER NOT NULL DEFAULT 0,
+    daily_rate DOUBLE PRECISION NOT NULL DEFAULT 0,
+    forecast_next_week INTEGER NOT NULL DEFAULT 0,
+    method VARCHAR NOT NULL,
+    trend VARCHAR NOT NULL,
+    computed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_demand_forecasts_weekly_orders
+ON demand_forecasts (weekly_orders);
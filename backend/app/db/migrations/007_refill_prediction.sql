@@ -0,0 +1,21 @@
+-- Inputs and upsert target for the refill prediction job
+-- (app/services/refill_prediction.py).
+ALTER TABLE customer_history ADD COLUMN IF NOT EXISTS purchase_date DATE;
+ALTER TABLE customer_history ADD COLUMN IF NOT EXISTS dosage_frequency INTEGER;
+ALTER TABLE medicine_refill_notifications ADD COLUMN IF NOT EXISTS source_history_id INTEGER;
+
+-- Keep only the newest live reminder per (customer, medicine) before the
+-- unique index goes on.
+UPDATE medicine_refill_notifications n
+SET is_active = FALSE, updated_at = NOW()
+WHERE n.is_active
+  AND EXISTS (
+      SELECT 1 FROM medicine_refill_notifications newer
+      WHERE newer.is_active
+        AND newer.customer_id = n.customer_id
+        AND newer.medicine_name = n.medicine_name
+        AND newer.id > n.id
+  );
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_refill_notifications_active_customer_medicine
+ON medicine_refill_notifications (customer_id, medicine_name) WHERE is_active;
@@ -0,0 +1,4 @@
+-- Next unsent reminders by due date, read by the refill reminder scheduler
+-- (app/services/refill_scheduler.py).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_refill_notifications_due
+ON medicine_refill_notifications (is_active, notification_sent, refill_date);
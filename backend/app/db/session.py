@@ -1,5 +1,7 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.core.config import settings
+from app.db.circuit_breaker import CircuitBreaker, DatabaseCircuitOpen
 
 engine = create_async_engine(settings.DATABASE_URL, echo=False)
 
@@ -8,6 +10,47 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Shared by every session on this engine; routes consult it to skip the DB
+# entirely while Supabase is unreachable.
+db_breaker = CircuitBreaker(
+    failure_threshold=settings.DB_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.DB_BREAKER_RESET_SECONDS,
+)
+
+
+@event.listens_for(engine.sync_engine, "do_connect")
+def _connect_through_breaker(dialect, conn_rec, cargs, cparams):
+    if not db_breaker.allow_request():
+        raise DatabaseCircuitOpen("Database circuit breaker is open")
+    try:
+        return dialect.connect(*cargs, **cparams)
+    except Exception:
+        # Driver-level connect errors (refused, timeout) never reach handle_error.
+        db_breaker.record_failure()
+        raise
+
+
+# Handing out a pooled connection proves nothing about the server, so only a
+# freshly opened connection or a completed statement counts as a success.
+@event.listens_for(engine.sync_engine, "connect")
+def _record_connect(dbapi_connection, connection_record):
+    db_breaker.record_success()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    db_breaker.record_success()
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _record_connection_error(context):
+    if context.is_disconnect:
+        db_breaker.record_failure()
+
+
+def db_available() -> bool:
+    return not db_breaker.is_open
+
 
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -33,6 +33,9 @@ from app.routes.prescription_storage import router as prescription_storage_route
 from app.routes.refill_notifications import router as refill_notifications_router
 from app.core.config import settings
 from app.db.init_db import init_db
+from app.db.migrate import apply_migrations
+from app.db.session import engine
+from app.services import demand_forecast, invoice_renderer, razorpay_gateway, refill_scheduler, stock_alerts, stock_reservation
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -63,6 +66,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Custom response headers the frontend reads (pagination, idempotent replays).
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 app.include_router(admin_router)
@@ -111,11 +116,47 @@ def _verify_required_routes() -> None:
 @app.on_event("startup")
 async def startup_event() -> None:
     _verify_required_routes()
+    invoice_renderer.configure(
+        settings.INVOICE_RENDER_WORKERS,
+        settings.INVOICE_RENDER_CONCURRENCY,
+        write_to_disk=settings.INVOICE_PDF_WRITE_TO_DISK,
+        cache_max_bytes=settings.INVOICE_PDF_CACHE_MAX_BYTES,
+    )
     # Avoid blocking the entire API if DB is temporarily unreachable.
     try:
         await asyncio.wait_for(init_db(), timeout=10)
     except Exception as exc:
         logger.warning("DB init skipped during startup: %s", exc)
+    if engine.dialect.name == "postgresql":
+        # create_all() never adds triggers or partial indexes, and the revenue
+        # rollup and refill upsert depend on both. Not wrapped in a timeout:
+        # cancelling CREATE INDEX CONCURRENTLY leaves an invalid index behind.
+        try:
+            applied = await apply_migrations()
+            if applied:
+                logger.info("Applied migrations: %s", ", ".join(applied))
+        except Exception as exc:
+            logger.warning("Migrations skipped during startup: %s", exc)
+        stock_reservation.start_sweeper(settings.STOCK_HOLD_SWEEP_SECONDS)
+        demand_forecast.start_scheduler(
+            settings.DEMAND_FORECAST_INTERVAL_SECONDS,
+            settings.DEMAND_FORECAST_HISTORY_DAYS,
+        )
+        refill_scheduler.start_scheduler(
+            settings.REFILL_REMINDER_BATCH_SIZE,
+            settings.REFILL_REMINDER_MAX_SLEEP_SECONDS,
+            settings.REFILL_REMINDER_RETRY_SECONDS,
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    await stock_reservation.stop_sweeper()
+    await demand_forecast.stop_scheduler()
+    await refill_scheduler.stop_scheduler()
+    await stock_alerts.stop()
+    invoice_renderer.shutdown()
+    razorpay_gateway.shutdown()
 
 
 @app.get("/")
@@ -1,4 +1,6 @@
-from sqlalchemy import String, Integer
+from datetime import date
+
+from sqlalchemy import Date, String, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -9,4 +11,6 @@ class CustomerHistory(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     customer_id: Mapped[str] = mapped_column(String)
     medicine_name: Mapped[str] = mapped_column(String)
-    quantity: Mapped[int] = mapped_column(Integer)
\ No newline at end of file
+    quantity: Mapped[int] = mapped_column(Integer)
+    purchase_date: Mapped[date | None] = mapped_column(Date, nullable=True)
+    dosage_frequency: Mapped[int | None] = mapped_column(Integer, nullable=True)  # doses per day
@@ -0,0 +1,17 @@
+from datetime import date
+
+from sqlalchemy import Date, Integer, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class DailyRevenue(Base):
+    """
+    One row per calendar day of orders, maintained by the orders_daily_revenue
+    trigger (app/db/migrations/005_daily_revenue_rollup.sql).
+    """
+    __tablename__ = "daily_revenue"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    revenue: Mapped[float] = mapped_column(Numeric, nullable=False, default=0)
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
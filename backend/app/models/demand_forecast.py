@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class DemandForecast(Base):
+    """Latest demand forecast per medicine, written by app/services/demand_forecast.py."""
+    __tablename__ = "demand_forecasts"
+
+    medicine_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    medicine_name: Mapped[str] = mapped_column(String, nullable=False)
+    weekly_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0, index=True)
+    previous_week_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    daily_rate: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    forecast_next_week: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    method: Mapped[str] = mapped_column(String, nullable=False)  # ses, croston
+    trend: Mapped[str] = mapped_column(String, nullable=False)  # up, down, stable
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
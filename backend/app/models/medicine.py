@@ -1,10 +1,19 @@
-from sqlalchemy import String, Float, Integer
+from sqlalchemy import String, Float, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
 
 class Medicine(Base):
     __tablename__ = "medicines"
+    __table_args__ = (
+        # Trigram index backs the ILIKE '%name%' lookups used across routes.
+        Index(
+            "ix_medicines_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
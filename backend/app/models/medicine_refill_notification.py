@@ -3,7 +3,7 @@ Medicine Refill Notification Model
 Tracks medicine refill reminders and notifications for customers
 """
 
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -12,6 +12,20 @@ from app.db.base import Base
 class MedicineRefillNotification(Base):
     """Medicine refill reminder notifications"""
     __tablename__ = "medicine_refill_notifications"
+    __table_args__ = (
+        # One live reminder per customer and medicine; the refill prediction
+        # job upserts against it.
+        Index(
+            "ux_refill_notifications_active_customer_medicine",
+            "customer_id",
+            "medicine_name",
+            unique=True,
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active"),
+        ),
+        # Next unsent reminders by due date, for the refill scheduler.
+        Index("ix_refill_notifications_due", "is_active", "notification_sent", "refill_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(String(100), ForeignKey("customers.id"), nullable=False)
@@ -22,6 +36,8 @@ class MedicineRefillNotification(Base):
     notification_sent = Column(Boolean, default=False)
     notification_sent_date = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
+    # customer_history row the reminder was predicted from (NULL when created by hand)
+    source_history_id = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
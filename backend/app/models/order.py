@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, String, Boolean, Numeric, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, Numeric, DateTime, Index, func
 from app.db.base import Base  # adjust if your Base is imported differently
 
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Pharmacist/warehouse queues filter on status and page by created_at.
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        # /orders/my-orders: one customer's history, newest first.
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        # /orders/all: global listing, newest first.
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, nullable=False)
@@ -4,7 +4,7 @@ Stores prescription photos and details for repetitive orders
 """
 
 from datetime import datetime
-from sqlalchemy import String, DateTime, Integer, Boolean, ForeignKey, LargeBinary
+from sqlalchemy import String, DateTime, Integer, Boolean, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
@@ -15,6 +15,9 @@ class PrescriptionStorage(Base):
     Allows customers to upload once and reuse for similar medicines
     """
     __tablename__ = "prescription_storage"
+    __table_args__ = (
+        Index("ix_prescription_storage_customer_medicine", "customer_id", "medicine_name"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     customer_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
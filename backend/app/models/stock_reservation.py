@@ -0,0 +1,38 @@
+"""
+Stock Reservation Model
+Stock held for an order between checkout and payment
+"""
+
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class StockReservation(Base):
+    """
+    A hold takes stock off medicines.stock when checkout starts. Paying
+    converts it; an expired hold is released and the stock is put back.
+    """
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # At most one live hold per order.
+        Index(
+            "ux_stock_reservations_held_order",
+            "order_id",
+            unique=True,
+            postgresql_where=text("status = 'held'"),
+            sqlite_where=text("status = 'held'"),
+        ),
+        # The sweeper scans live holds by expiry.
+        Index("ix_stock_reservations_status_expires_at", "status", "expires_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    medicine_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="held")  # held, converted, released
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,41 +1,25 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import text
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import db_available, get_db
+from app.services import analytics_cache, demand_forecast, order_export, revenue_rollup
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 
 @router.get("/revenue")
 async def get_revenue_analytics(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        text(
-            """
-            SELECT
-                COALESCE(SUM(
-                    CASE
-                        WHEN DATE(o.created_at) = CURRENT_DATE THEN COALESCE(o.total_amount, 0)
-                        ELSE 0
-                    END
-                ), 0) AS daily_revenue,
-                COALESCE(SUM(
-                    CASE
-                        WHEN o.created_at >= DATE_TRUNC('month', CURRENT_DATE) THEN COALESCE(o.total_amount, 0)
-                        ELSE 0
-                    END
-                ), 0) AS monthly_revenue,
-                COUNT(*) AS total_orders
-            FROM public.orders o
-            """
-        )
+    # "Today" is part of the key so the daily figure resets at midnight.
+    return await analytics_cache.cached(
+        "revenue",
+        date.today(),
+        settings.ANALYTICS_CACHE_MAX_AGE_SECONDS,
+        lambda: revenue_rollup.get_revenue_summary(db),
     )
-    row = result.mappings().first() or {}
-    return {
-        "daily_revenue": float(row.get("daily_revenue") or 0),
-        "monthly_revenue": float(row.get("monthly_revenue") or 0),
-        "total_orders": int(row.get("total_orders") or 0),
-    }
 
 
 @router.get("/demand-forecast")
@@ -43,57 +27,47 @@ async def get_demand_forecast(
     limit: int = Query(default=10, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        text(
-            """
-            SELECT
-                m.name AS medicine_name,
-                COALESCE(SUM(
-                    CASE
-                        WHEN o.created_at >= NOW() - INTERVAL '7 days' THEN COALESCE(o.quantity, 0)
-                        ELSE 0
-                    END
-                ), 0) AS weekly_orders,
-                COALESCE(SUM(
-                    CASE
-                        WHEN o.created_at >= NOW() - INTERVAL '14 days'
-                         AND o.created_at < NOW() - INTERVAL '7 days' THEN COALESCE(o.quantity, 0)
-                        ELSE 0
-                    END
-                ), 0) AS previous_week_orders
-            FROM public.orders o
-            JOIN public.medicines m ON m.id = o.medicine_id
-            GROUP BY m.name
-            ORDER BY weekly_orders DESC, m.name ASC
-            LIMIT :limit
-            """
-        ),
-        {"limit": limit},
+    """Top medicines by last week's demand, from the precomputed forecasts."""
+
+    async def load() -> list[dict]:
+        forecasts = await demand_forecast.read_forecasts(db, limit)
+        if not forecasts:
+            # First call before the background job has run.
+            await demand_forecast.recompute_forecasts(db, settings.DEMAND_FORECAST_HISTORY_DAYS)
+            forecasts = await demand_forecast.read_forecasts(db, limit)
+        return forecasts
+
+    return await analytics_cache.cached(
+        demand_forecast.FORECAST_CACHE_ENDPOINT,
+        limit,
+        settings.ANALYTICS_CACHE_MAX_AGE_SECONDS,
+        load,
+    )
+
+
+EXPORT_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def _orders_export(export_format: str) -> StreamingResponse:
+    if not db_available():
+        raise HTTPException(status_code=503, detail="Order export needs the primary database")
+    return StreamingResponse(
+        order_export.stream_orders(export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="orders_{date.today().isoformat()}.{export_format}"'},
     )
-    rows = result.mappings().all()
-
-    payload = []
-    for row in rows:
-        weekly_orders = int(row.get("weekly_orders") or 0)
-        previous_week_orders = int(row.get("previous_week_orders") or 0)
-
-        if weekly_orders > previous_week_orders:
-            trend = "up"
-        elif weekly_orders < previous_week_orders:
-            trend = "down"
-        else:
-            trend = "stable"
-
-        delta = weekly_orders - previous_week_orders
-        forecast_next_week = max(0, int(round(weekly_orders + (delta * 0.5))))
-
-        payload.append(
-            {
-                "medicine_name": row.get("medicine_name"),
-                "weekly_orders": weekly_orders,
-                "trend": trend,
-                "forecast_next_week": forecast_next_week,
-            }
-        )
-
-    return payload
+
+
+@router.get("/export/orders.parquet")
+async def export_orders_parquet():
+    """Every order joined with its medicine, streamed as a Parquet file."""
+    return _orders_export("parquet")
+
+
+@router.get("/export/orders.arrow")
+async def export_orders_arrow():
+    """Same rows as orders.parquet, as an Arrow IPC file."""
+    return _orders_export("arrow")
@@ -175,19 +175,20 @@ async def receive_n8n_delivery_update(payload: dict, db: AsyncSession = Depends(
             }
         
         # Get delivery from database
-        delivery = DeliveryService.get_delivery_by_order(db, order_id)
+        order_id = str(order_id)
+        delivery = await DeliveryService.get_delivery_by_order(db, order_id)
         if not delivery:
             # Create new delivery record if doesn't exist
-            delivery = DeliveryService.create_delivery(
+            delivery = await DeliveryService.create_delivery(
                 db=db,
                 order_id=order_id,
                 tracking_number=f"TRK-{order_id}",
-                customer_id=payload.get("customer_id", order_id),
+                customer_id=str(payload.get("customer_id", order_id)),
                 stage=new_stage
             )
         else:
             # Update existing delivery
-            DeliveryService.update_delivery_stage(
+            await DeliveryService.update_delivery_stage(
                 db=db,
                 delivery_id=delivery.id,
                 new_stage=new_stage,
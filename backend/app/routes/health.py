@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
+from app.db.session import db_breaker
+
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy", "database": db_breaker.snapshot()}
\ No newline at end of file
@@ -2,17 +2,20 @@
 Notification routes - API endpoints for stock refill notifications
 """
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 from app.agents import notification_agent
 from app.db.session import get_db
-from app.services.notification_service import NotificationService, DEFAULT_TEMPLATES
+from app.services import notification_templates
+from app.services.notification_service import NotificationService
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
+MAX_BATCH_ACKS = 1000
+
 
 # Pydantic models for request/response
 class StockCheckRequest(BaseModel):
@@ -43,7 +46,20 @@ class SubscribeToAlertsRequest(BaseModel):
 class GetAlertsRequest(BaseModel):
     action: str = "get_alerts"
     customer_id: Optional[str] = None
+    medicine_id: Optional[int] = None
     medicine_name: Optional[str] = None
+    severity: Optional[str] = None  # "warning", "critical"
+
+
+class N8nAck(BaseModel):
+    notification_id: int
+    status: str = "success"
+    n8n_workflow_id: Optional[str] = None
+    n8n_execution_id: Optional[str] = None
+
+
+class N8nAckBatch(BaseModel):
+    acks: List[N8nAck] = Field(min_length=1, max_length=MAX_BATCH_ACKS)
 
 
 class NotificationResponse(BaseModel):
@@ -161,12 +177,16 @@ async def get_active_alerts(request: GetAlertsRequest):
     Get active stock refill alerts
     
     - **customer_id**: (optional) Filter by customer
+    - **medicine_id**: (optional) Filter by medicine ID
     - **medicine_name**: (optional) Filter by medicine
+    - **severity**: (optional) "warning" or "critical"
     """
     input_data = {
         "action": "get_alerts",
         "customer_id": request.customer_id,
-        "medicine_name": request.medicine_name
+        "medicine_id": request.medicine_id,
+        "medicine_name": request.medicine_name,
+        "severity": request.severity
     }
     
     result = await notification_agent.run(input_data)
@@ -194,7 +214,7 @@ async def receive_n8n_notification(payload: dict, db: AsyncSession = Depends(get
         
         if notification_id:
             # Mark notification as sent in database
-            NotificationService.mark_notification_sent(
+            await NotificationService.mark_notification_sent(
                 db=db,
                 notification_id=notification_id,
                 n8n_workflow_id=payload.get("n8n_workflow_id"),
@@ -214,28 +234,54 @@ async def receive_n8n_notification(payload: dict, db: AsyncSession = Depends(get
         }
 
 
+@router.post("/webhook/from-n8n/batch")
+async def receive_n8n_notifications_batch(
+    payload: Union[N8nAckBatch, List[N8nAck]],
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Receive many notification acknowledgements from n8n in one call
+
+    Body is {"acks": [...]} or a bare array of acks, each with
+    notification_id, status, n8n_workflow_id and n8n_execution_id. All acks
+    are applied in one statement; replays of an execution id already
+    recorded are ignored, so n8n can safely retry the whole batch.
+    """
+    acks = payload.acks if isinstance(payload, N8nAckBatch) else payload
+    if not acks or len(acks) > MAX_BATCH_ACKS:
+        raise HTTPException(status_code=422, detail=f"Send between 1 and {MAX_BATCH_ACKS} acks")
+
+    updated = await NotificationService.apply_n8n_acks(db, [ack.model_dump() for ack in acks])
+    return {
+        "status": "success",
+        "received": len(acks),
+        "updated": len(updated),
+        "skipped": len(acks) - len(updated),
+        "updated_ids": updated,
+    }
+
+
 @router.get("/templates")
-async def get_notification_templates():
+async def get_notification_templates(db: AsyncSession = Depends(get_db)):
     """Get available notification templates"""
+    await notification_templates.ensure_fresh(db)
     return {
         "templates": {name: {
-            "name": template.get("name"),
-            "notification_type": template.get("notification_type"),
-            "description": f"Template for {template.get('notification_type')}"
-        } for name, template in DEFAULT_TEMPLATES.items()}
+            "name": template.name,
+            "notification_type": template.notification_type,
+            "description": template.description or f"Template for {template.notification_type}"
+        } for name, template in notification_templates.all_templates().items()}
     }
 
 
 @router.get("/statistics")
 async def get_notification_statistics(db: AsyncSession = Depends(get_db)):
     """Get notification statistics"""
-    pending = len(NotificationService.get_pending_notifications(db))
-    active_alerts = len(NotificationService.get_active_alerts(db))
+    counts = await NotificationService.get_statistics(db)
     
     return {
         "status": "success",
-        "pending_notifications": pending,
-        "active_stock_alerts": active_alerts,
+        **counts,
         "timestamp": datetime.now().isoformat()
     }
 
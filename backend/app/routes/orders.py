@@ -1,28 +1,68 @@
 import re
 import csv
+import json
+import base64
 import logging
+from datetime import datetime
 from decimal import Decimal
 from pathlib import Path
 from types import SimpleNamespace
 from typing import Literal
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Query, Response
 
 logger = logging.getLogger(__name__)
 from pydantic import BaseModel, Field
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 
 from app.core.config import settings
-from app.db.session import AsyncSessionLocal
+from app.db.session import AsyncSessionLocal, db_available
 from app.models.medicine import Medicine
 from app.models.order import Order
 from app.models.user import User
-from app.services.local_order_fallback import create_fallback_order, list_fallback_orders_by_user
+from app.services import catalog_snapshot, stock_reservation
+from app.services.idempotency import IdempotencyStore
+from app.services.local_order_fallback import (
+    create_fallback_order,
+    list_fallback_orders,
+)
 from app.services.order_service import OrderService
 from app.services.webhook_service import trigger_n8n_webhook
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+ORDER_STATUSES = {
+    "pending",
+    "awaiting_pharmacist",
+    "approved",
+    "rejected",
+    "shipped",
+    "delivered",
+    "cancelled",
+    "paid",
+}
+
+# Target status -> statuses an order may be in for a bulk transition to apply.
+BULK_STATUS_TRANSITIONS: dict[str, set[str]] = {
+    "awaiting_pharmacist": {"pending"},
+    "approved": {"pending", "awaiting_pharmacist"},
+    "rejected": {"pending", "awaiting_pharmacist"},
+    "paid": {"pending", "awaiting_pharmacist", "approved"},
+    "shipped": {"approved", "paid"},
+    "delivered": {"shipped"},
+    "cancelled": {"pending", "awaiting_pharmacist", "approved", "paid"},
+}
+MAX_BULK_ORDERS = 1000
+# Transitions that end an order before payment give its held stock back.
+RELEASING_STATUSES = {"rejected", "cancelled"}
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Shared by every order creation route so a retry that lands on a different
+# legacy path still replays the original order.
+order_create_idempotency = IdempotencyStore()
 legacy_router = APIRouter(tags=["Orders"])
 
 
@@ -48,6 +88,16 @@ class OrderStatusUpdateRequest(BaseModel):
     status: str
 
 
+class BulkPharmacistDecisionRequest(BaseModel):
+    order_ids: list[str] = Field(min_length=1, max_length=MAX_BULK_ORDERS)
+    decision: Literal["approved", "rejected"]
+
+
+class BulkOrderStatusUpdateRequest(BaseModel):
+    order_ids: list[str] = Field(min_length=1, max_length=MAX_BULK_ORDERS)
+    status: str
+
+
 def _normalize_order_id(raw_order_id: str | int) -> int:
     text_order_id = str(raw_order_id).strip()
     if text_order_id.isdigit():
@@ -165,17 +215,18 @@ async def _resolve_medicine_id(order_data: dict) -> dict:
     if not medicine_name:
         return order_data
 
-    async with AsyncSessionLocal() as session:
-        try:
-            result = await session.execute(
-                select(Medicine).where(Medicine.name.ilike(f"%{medicine_name.strip()}%"))
-            )
-            medicine = result.scalar_one_or_none()
-            if medicine:
-                order_data["medicine_id"] = medicine.id
-                return order_data
-        except Exception:
-            pass
+    if db_available():
+        async with AsyncSessionLocal() as session:
+            try:
+                result = await session.execute(
+                    select(Medicine).where(Medicine.name.ilike(f"%{medicine_name.strip()}%"))
+                )
+                medicine = result.scalar_one_or_none()
+                if medicine:
+                    order_data["medicine_id"] = medicine.id
+                    return order_data
+            except Exception:
+                pass
 
     fallback_id = _lookup_medicine_id_from_csv(medicine_name)
     if fallback_id:
@@ -198,7 +249,16 @@ def _format_total_amount(value: Decimal | int | float | None):
     return float(value)
 
 
+def _isoformat(value):
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
 async def _create_order(order_data: dict):
+    if not db_available():
+        # Breaker is open: skip the connect timeout and go straight to the fallback store.
+        raise HTTPException(status_code=500, detail="Database circuit breaker is open")
     async with AsyncSessionLocal() as session:
         try:
             return await OrderService.create_order(session, order_data)
@@ -230,8 +290,8 @@ async def orders_index():
     return {"message": "Orders routes are active", "create_path": "/orders/create"}
 
 
-async def _create_order_and_trigger(order_data: dict):
-    order_data = await _resolve_medicine_id(order_data)
+async def _store_order(order_data: dict) -> tuple[SimpleNamespace, bool]:
+    order_data = await _resolve_medicine_id(dict(order_data))
     order_data.pop("medicine_name", None)
     fallback_used = False
     try:
@@ -239,19 +299,51 @@ async def _create_order_and_trigger(order_data: dict):
     except HTTPException as exc:
         if exc.status_code != 500:
             raise
-        fallback_order = create_fallback_order(order_data, str(exc.detail))
+        order = create_fallback_order(order_data, str(exc.detail))
         fallback_used = True
-        order = SimpleNamespace(
-            id=fallback_order["id"],
-            user_id=fallback_order["user_id"],
-            medicine_id=fallback_order["medicine_id"],
-            quantity=fallback_order["quantity"],
-            status=fallback_order["status"],
-            total_amount=fallback_order["total_amount"],
-        )
-        print(f"[orders] fallback_storage=sqlite local_id={order.id}")
+        logger.info("Order stored in local fallback (sqlite), local_id=%s", order["id"])
+    else:
+        order = {column: getattr(order, column) for column in ("id", "user_id", "medicine_id", "quantity", "status", "total_amount")}
+
+    return SimpleNamespace(
+        id=order["id"],
+        user_id=order["user_id"],
+        medicine_id=order["medicine_id"],
+        quantity=order["quantity"],
+        status=order["status"],
+        total_amount=order["total_amount"],
+    ), fallback_used
+
+
+def _order_idempotency_key(order_data: dict, idempotency_key: str | None) -> tuple[str, str, float]:
+    """
+    Explicit keys are honoured for a day; without one, identical payloads
+    are only coalesced for a short window so genuine repeat orders still go
+    through.
+    """
+    fingerprint = order_create_idempotency.fingerprint(order_data)
+    if idempotency_key and idempotency_key.strip():
+        return f"key:{idempotency_key.strip()}", fingerprint, settings.IDEMPOTENCY_KEY_TTL_SECONDS
+    return f"payload:{fingerprint}", fingerprint, settings.IDEMPOTENCY_PAYLOAD_TTL_SECONDS
+
+
+async def _create_order_and_trigger(
+    order_data: dict,
+    idempotency_key: str | None = None,
+    http_response: Response | None = None,
+):
+    key, fingerprint, ttl = _order_idempotency_key(order_data, idempotency_key)
+    (order, fallback_used), replayed = await order_create_idempotency.run(
+        key, fingerprint, ttl, lambda: _store_order(order_data)
+    )
+    # Tracked separately so a retry after a failed webhook re-sends it
+    # without inserting the order again.
+    await order_create_idempotency.run(
+        f"{key}:webhook", fingerprint, ttl, lambda: _ensure_webhook_triggered(order)
+    )
+    if replayed and http_response is not None:
+        http_response.headers[REPLAYED_HEADER] = "true"
 
-    await _ensure_webhook_triggered(order)
     response = {
         "id": order.id,
         "status": order.status,
@@ -263,7 +355,11 @@ async def _create_order_and_trigger(order_data: dict):
 
 
 @router.post("/create", operation_id="orders_create_order")
-async def create_order(payload: OrderCreateRequest):
+async def create_order(
+    payload: OrderCreateRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER),
+):
     order_data = _build_order_data(payload, payload.query)
 
     has_medicine_ref = bool(order_data.get("medicine_id") or order_data.get("medicine_name"))
@@ -274,11 +370,15 @@ async def create_order(payload: OrderCreateRequest):
         )
 
     # Production path: never fall back to dummy success.
-    return await _create_order_and_trigger(order_data)
+    return await _create_order_and_trigger(order_data, idempotency_key, response)
 
 
 @router.post("/test-create", operation_id="orders_test_create_order")
-async def test_create_order(payload: OrderCreateRequest):
+async def test_create_order(
+    payload: OrderCreateRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER),
+):
     order_data = _build_order_data(payload, payload.query)
 
     has_medicine_ref = bool(order_data.get("medicine_id") or order_data.get("medicine_name"))
@@ -288,13 +388,15 @@ async def test_create_order(payload: OrderCreateRequest):
             detail="Provide user_id/customer_id, medicine_id/medicine_name, quantity (direct fields or in query).",
         )
 
-    return await _create_order_and_trigger(order_data)
+    return await _create_order_and_trigger(order_data, idempotency_key, response)
 
 
 @router.post("/post/order", operation_id="orders_post_order")
 async def post_order(
     payload: OrderCreateRequest,
+    response: Response,
     query: str | None = Query(default=None, description="Optional order query text"),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER),
 ):
     order_data = _build_order_data(payload, query or payload.query)
 
@@ -305,17 +407,138 @@ async def post_order(
             detail="Provide user_id/customer_id, medicine_id/medicine_name, quantity (direct fields or in query).",
         )
 
-    return await _create_order_and_trigger(order_data)
+    return await _create_order_and_trigger(order_data, idempotency_key, response)
+
+
+def _fallback_medicine_name(medicine_id) -> str:
+    return catalog_snapshot.get_medicine_name(medicine_id) or f"Medicine-{medicine_id}"
+
+
+def _encode_cursor(created_at, order_id) -> str:
+    raw = json.dumps([_isoformat(created_at), int(order_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _paginate(stmt, cursor: str | None, limit: int, newest_first: bool):
+    """
+    Apply keyset pagination on (created_at, id). One extra row is fetched so
+    the caller can tell whether another page exists.
+    """
+    after = _decode_cursor(cursor)
+    key = tuple_(Order.created_at, Order.id)
+    if after is not None:
+        stmt = stmt.where(key < tuple_(*after) if newest_first else key > tuple_(*after))
+    if newest_first:
+        stmt = stmt.order_by(Order.created_at.desc(), Order.id.desc())
+    else:
+        stmt = stmt.order_by(Order.created_at.asc(), Order.id.asc())
+    return stmt.limit(limit + 1)
+
+
+def _finish_page(rows: list, limit: int, response: Response, order_of=lambda row: row[0]) -> list:
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    last = order_of(rows[-1])
+    response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(last.created_at, last.id)
+    return rows
+
+
+def _fallback_after(cursor: str | None) -> tuple[str, int] | None:
+    after = _decode_cursor(cursor)
+    if after is None:
+        return None
+    return after[0].isoformat(sep=" "), after[1]
+
+
+def _fallback_order_rows(
+    statuses: list[str] | None,
+    limit: int,
+    newest_first: bool,
+    cursor: str | None = None,
+    user_id: str | None = None,
+) -> list[tuple]:
+    """
+    Rows shaped like the (order, medicine_name, customer_email) DB results,
+    read from the local fallback store while the primary DB is unavailable.
+    Like _paginate, fetches one extra row.
+    """
+    return [
+        (SimpleNamespace(**order), _fallback_medicine_name(order.get("medicine_id")), None)
+        for order in list_fallback_orders(
+            statuses,
+            limit=limit + 1,
+            newest_first=newest_first,
+            user_id=user_id,
+            after=_fallback_after(cursor),
+        )
+    ]
+
+
+async def _release_stock_holds(session, order_ids: list[int]) -> None:
+    try:
+        await stock_reservation.release_orders(session, order_ids)
+    except Exception as exc:
+        # The sweeper releases the holds once they expire anyway.
+        await session.rollback()
+        logger.warning("Stock hold release failed for orders %s: %s", order_ids, exc)
+
+
+def _status_update_unavailable() -> HTTPException:
+    # Status changes are never acknowledged offline: nothing would replay them
+    # into the primary database, so the caller has to retry once it is back.
+    return HTTPException(
+        status_code=503,
+        detail="Database unavailable; status change not applied. Please retry shortly.",
+    )
+
+
+def _my_order_entries(rows: list[tuple]) -> list[dict]:
+    return [
+        {
+            "order_id": str(order.id),
+            "medicine": medicine_name or f"Medicine-{order.medicine_id}",
+            "quantity": int(order.quantity or 0),
+            "status": order.status or "pending",
+            "total": float(order.total_amount) if order.total_amount is not None else 0.0,
+            "created_date": _isoformat(order.created_at),
+        }
+        for order, medicine_name, _ in rows
+    ]
 
 
 @router.get("/my-orders", operation_id="orders_get_my_orders")
-async def get_my_orders(customer_id: str = Query(..., min_length=1)):
+async def get_my_orders(
+    response: Response,
+    customer_id: str = Query(..., min_length=1),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = Query(default=None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+):
+    """
+    A customer's orders, newest first. Pages are keyed on (created_at, id);
+    pass the previous response's X-Next-Cursor header as ``cursor``.
+    """
+    if not db_available():
+        rows = _fallback_order_rows(None, limit, True, cursor, user_id=customer_id)
+        return _my_order_entries(_finish_page(rows, limit, response))
+
     async with AsyncSessionLocal() as session:
         try:
             result = await session.execute(
-                select(Order).where(Order.user_id == customer_id).order_by(Order.created_at.desc())
+                _paginate(select(Order).where(Order.user_id == customer_id), cursor, limit, True)
             )
-            orders = result.scalars().all()
+            orders = _finish_page(list(result.scalars().all()), limit, response, order_of=lambda row: row)
             if not orders:
                 return []
 
@@ -326,125 +549,132 @@ async def get_my_orders(customer_id: str = Query(..., min_length=1)):
                 for med in meds_result.scalars().all():
                     medicine_map[med.id] = med.name
 
-            return [
-                {
-                    "order_id": str(order.id),
-                    "medicine": medicine_map.get(order.medicine_id, f"Medicine-{order.medicine_id}"),
-                    "quantity": order.quantity,
-                    "status": order.status,
-                    "total": float(order.total_amount) if order.total_amount is not None else 0.0,
-                    "created_date": order.created_at.isoformat() if order.created_at else None,
-                }
-                for order in orders
-            ]
+            return _my_order_entries([(order, medicine_map.get(order.medicine_id), None) for order in orders])
+        except HTTPException:
+            raise
         except Exception:
-            fallback_orders = list_fallback_orders_by_user(customer_id)
-            return [
-                {
-                    "order_id": str(order.get("id")),
-                    "medicine": f"Medicine-{order.get('medicine_id')}",
-                    "quantity": int(order.get("quantity") or 0),
-                    "status": order.get("status") or "pending",
-                    "total": float(order.get("total_amount") or 0),
-                    "created_date": order.get("created_at"),
-                }
-                for order in fallback_orders
-            ]
+            response.headers.pop(NEXT_CURSOR_HEADER, None)
+            rows = _fallback_order_rows(None, limit, True, cursor, user_id=customer_id)
+            return _my_order_entries(_finish_page(rows, limit, response))
 
 
 @router.get("/all", operation_id="orders_get_all")
-async def get_all_orders(limit: int = Query(default=200, ge=1, le=1000)):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Order, Medicine.name)
+async def get_all_orders(
+    response: Response,
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: str | None = Query(default=None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+):
+    rows = None
+    if db_available():
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    _paginate(
+                        select(Order, Medicine.name).outerjoin(Medicine, Medicine.id == Order.medicine_id),
+                        cursor,
+                        limit,
+                        True,
+                    )
+                )
+                rows = list(result.all())
+        except HTTPException:
+            raise
+        except Exception as exc:
+            logger.warning("Failed to fetch orders from DB, serving local fallback: %s", exc)
+    if rows is None:
+        rows = [(order, medicine_name) for order, medicine_name, _ in _fallback_order_rows(None, limit, True, cursor)]
+
+    return [
+        {
+            "order_id": f"ORD-{order.id}",
+            "medicine_name": medicine_name or f"Medicine-{order.medicine_id}",
+            "quantity": int(order.quantity or 0),
+            "status": order.status or "pending",
+            "total_amount": float(order.total_amount) if order.total_amount is not None else 0.0,
+            "created_at": _isoformat(order.created_at),
+        }
+        for order, medicine_name in _finish_page(rows, limit, response)
+    ]
+
+
+async def _fetch_queue_rows(statuses: list[str], limit: int, cursor: str | None) -> list[tuple]:
+    """
+    Oldest-first (order, medicine name, customer email) rows for a work queue.
+    Served from the local fallback store while the database is unreachable,
+    including requests that lose the breaker's single half-open probe.
+    """
+    if db_available():
+        query = (
+            select(Order, Medicine.name, User.email)
             .outerjoin(Medicine, Medicine.id == Order.medicine_id)
-            .order_by(Order.created_at.desc())
-            .limit(limit)
+            .outerjoin(User, User.id == Order.user_id)
+            .where(Order.status.in_(statuses))
         )
-        rows = result.all()
-
-        return [
-            {
-                "order_id": f"ORD-{order.id}",
-                "medicine_name": medicine_name or f"Medicine-{order.medicine_id}",
-                "quantity": int(order.quantity or 0),
-                "status": order.status or "pending",
-                "total_amount": float(order.total_amount) if order.total_amount is not None else 0.0,
-                "created_at": order.created_at.isoformat() if order.created_at else None,
-            }
-            for order, medicine_name in rows
-        ]
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(_paginate(query, cursor, limit, False))
+                return list(result.all())
+        except HTTPException:
+            raise
+        except Exception as exc:
+            logger.warning("Failed to fetch %s orders from DB, serving local fallback: %s", "/".join(statuses), exc)
+    return _fallback_order_rows(statuses, limit, False, cursor)
 
 
 @router.get("/pending", operation_id="orders_get_pending")
-async def get_pending_orders(limit: int = Query(default=200, ge=1, le=1000)):
+async def get_pending_orders(
+    response: Response,
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: str | None = Query(default=None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+):
     """
     Orders awaiting pharmacist validation and safety review.
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Order, Medicine.name, User.email)
-                .outerjoin(Medicine, Medicine.id == Order.medicine_id)
-                .outerjoin(User, User.id == Order.user_id)
-                .where(Order.status.in_(["pending", "awaiting_pharmacist"]))
-                .order_by(Order.created_at.asc())
-                .limit(limit)
-            )
-            rows = result.all()
-
-            pending_orders: list[dict] = []
-            for order, medicine_name, customer_email in rows:
-                safety_level = _infer_safety_level(order)
-                fraud_risk_level, fraud_flags = _infer_fraud_risk(order)
-                pending_orders.append(
-                    {
-                        "order_id": f"ORD-{order.id}",
-                        "customer_name": customer_email or order.user_id,
-                        "medicine": medicine_name or f"Medicine-{order.medicine_id}",
-                        "quantity": int(order.quantity or 0),
-                        "prescription_required": bool(order.requires_prescription),
-                        "safety_level": safety_level,
-                        "fraud_risk_level": fraud_risk_level,
-                        "fraud_flags": fraud_flags,
-                    }
-                )
-            return pending_orders
-    except Exception as exc:
-        logger.error("Failed to fetch pending orders from DB: %s", exc)
-        raise HTTPException(
-            status_code=503,
-            detail=f"Database unavailable: {exc}. Please ensure Supabase project is active (free-tier projects pause after inactivity).",
+    statuses = ["pending", "awaiting_pharmacist"]
+    rows = await _fetch_queue_rows(statuses, limit, cursor)
+
+    pending_orders: list[dict] = []
+    for order, medicine_name, customer_email in _finish_page(rows, limit, response):
+        safety_level = _infer_safety_level(order)
+        fraud_risk_level, fraud_flags = _infer_fraud_risk(order)
+        pending_orders.append(
+            {
+                "order_id": f"ORD-{order.id}",
+                "customer_name": customer_email or order.user_id,
+                "medicine": medicine_name or f"Medicine-{order.medicine_id}",
+                "quantity": int(order.quantity or 0),
+                "prescription_required": bool(order.requires_prescription),
+                "safety_level": safety_level,
+                "fraud_risk_level": fraud_risk_level,
+                "fraud_flags": fraud_flags,
+            }
         )
+    return pending_orders
 
 
 @router.get("/approved", operation_id="orders_get_approved")
-async def get_approved_orders(limit: int = Query(default=200, ge=1, le=1000)):
+async def get_approved_orders(
+    response: Response,
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: str | None = Query(default=None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+):
     """
     Orders that have been approved and are ready for warehouse shipment.
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Order, Medicine.name, User.email)
-            .outerjoin(Medicine, Medicine.id == Order.medicine_id)
-            .outerjoin(User, User.id == Order.user_id)
-            .where(Order.status.in_(["approved", "paid", "shipped"]))
-            .order_by(Order.created_at.asc())
-            .limit(limit)
+    statuses = ["approved", "paid", "shipped"]
+    rows = await _fetch_queue_rows(statuses, limit, cursor)
+
+    approved_orders: list[dict] = []
+    for order, medicine_name, customer_email in _finish_page(rows, limit, response):
+        approved_orders.append(
+            {
+                "order_id": f"ORD-{order.id}",
+                "customer_name": customer_email or order.user_id,
+                "medicine": medicine_name or f"Medicine-{order.medicine_id}",
+                "quantity": int(order.quantity or 0),
+            }
         )
-        rows = result.all()
-
-        approved_orders: list[dict] = []
-        for order, medicine_name, customer_email in rows:
-            approved_orders.append(
-                {
-                    "order_id": f"ORD-{order.id}",
-                    "customer_name": customer_email or order.user_id,
-                    "medicine": medicine_name or f"Medicine-{order.medicine_id}",
-                    "quantity": int(order.quantity or 0),
-                }
-            )
-        return approved_orders
+    return approved_orders
 
 
 @router.post("/pharmacist-decision", operation_id="orders_pharmacist_decision")
@@ -455,6 +685,9 @@ async def pharmacist_decision(payload: PharmacistDecisionRequest):
     normalized_order_id = _normalize_order_id(payload.order_id)
     new_status = "approved" if payload.decision == "approved" else "rejected"
 
+    if not db_available():
+        raise _status_update_unavailable()
+
     try:
         async with AsyncSessionLocal() as session:
             order = await OrderService.update_order_status(session, normalized_order_id, new_status)
@@ -465,20 +698,18 @@ async def pharmacist_decision(payload: PharmacistDecisionRequest):
                     "status": new_status,
                     "note": "Order not found in database; decision recorded locally.",
                 }
-            return {
+            response = {
                 "order_id": f"ORD-{order.id}",
                 "status": order.status,
             }
+            if new_status in RELEASING_STATUSES:
+                await _release_stock_holds(session, [order.id])
+            return response
     except HTTPException:
         raise
     except Exception as exc:
-        logger.warning("pharmacist_decision DB error (returning offline ack): %s", exc)
-        # DB offline — return a success-like ack so the UI can still proceed
-        return {
-            "order_id": payload.order_id,
-            "status": new_status,
-            "note": "Database unavailable; decision applied to local view only.",
-        }
+        logger.warning("pharmacist_decision DB error: %s", exc)
+        raise _status_update_unavailable() from exc
 
 
 @router.post("/update-status", operation_id="orders_update_status")
@@ -486,56 +717,143 @@ async def update_order_status(payload: OrderStatusUpdateRequest):
     """
     Generic order status update used by warehouse and internal flows.
     """
-    allowed_statuses = {
-        "pending",
-        "awaiting_pharmacist",
-        "approved",
-        "rejected",
-        "shipped",
-        "delivered",
-        "cancelled",
-        "paid",
-    }
     status = (payload.status or "").strip()
-    if status not in allowed_statuses:
+    if status not in ORDER_STATUSES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid status '{status}'. Allowed: {', '.join(sorted(allowed_statuses))}",
+            detail=f"Invalid status '{status}'. Allowed: {', '.join(sorted(ORDER_STATUSES))}",
         )
 
     normalized_order_id = _normalize_order_id(payload.order_id)
+    if not db_available():
+        raise _status_update_unavailable()
 
     async with AsyncSessionLocal() as session:
         order = await OrderService.update_order_status(session, normalized_order_id, status)
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
-
-        return {
+        response = {
             "order_id": f"ORD-{order.id}",
             "status": order.status,
         }
+        if status in RELEASING_STATUSES:
+            await _release_stock_holds(session, [order.id])
+        return response
+
+
+async def _trigger_status_batch_webhook(status: str, rows: list[dict]) -> None:
+    try:
+        await trigger_n8n_webhook(
+            settings.N8N_ORDER_WEBHOOK,
+            {
+                "event": "order_status_batch",
+                "status": status,
+                "count": len(rows),
+                "orders": [
+                    {
+                        "order_id": row["id"],
+                        "user_id": row["user_id"],
+                        "medicine_id": row["medicine_id"],
+                        "quantity": row["quantity"],
+                        "total_amount": _format_total_amount(row["total_amount"]),
+                    }
+                    for row in rows
+                ],
+            },
+        )
+    except Exception as exc:
+        logger.warning("order_status_batch webhook failed: %s", exc)
+
+
+async def _apply_bulk_transition(raw_order_ids: list[str], status: str, background_tasks: BackgroundTasks) -> dict:
+    """
+    Apply one status transition to many orders with a single UPDATE, then
+    emit one aggregated webhook for the orders that actually changed.
+    """
+    order_ids = list(dict.fromkeys(_normalize_order_id(raw_id) for raw_id in raw_order_ids))
+    from_statuses = BULK_STATUS_TRANSITIONS[status]
+
+    if not db_available():
+        raise _status_update_unavailable()
+
+    async with AsyncSessionLocal() as session:
+        rows = await OrderService.bulk_update_status(session, order_ids, status, sorted(from_statuses))
+        updated_ids = {row["id"] for row in rows}
+        if status in RELEASING_STATUSES and updated_ids:
+            await _release_stock_holds(session, sorted(updated_ids))
+        missing = [order_id for order_id in order_ids if order_id not in updated_ids]
+        # Only look up the leftovers to explain why they were skipped.
+        current = await OrderService.get_statuses(session, missing) if missing else {}
+
+    skipped = [
+        {
+            "order_id": f"ORD-{order_id}",
+            "reason": "invalid_transition" if order_id in current else "not_found",
+            "current_status": current.get(order_id),
+        }
+        for order_id in missing
+    ]
+    if rows:
+        background_tasks.add_task(_trigger_status_batch_webhook, status, rows)
+
+    return {
+        "status": status,
+        "updated": [f"ORD-{row['id']}" for row in rows],
+        "skipped": skipped,
+    }
+
+
+@router.post("/bulk/pharmacist-decision", operation_id="orders_bulk_pharmacist_decision")
+async def bulk_pharmacist_decision(payload: BulkPharmacistDecisionRequest, background_tasks: BackgroundTasks):
+    """
+    Approve or reject a batch of pending orders in one statement.
+    """
+    return await _apply_bulk_transition(payload.order_ids, payload.decision, background_tasks)
+
+
+@router.post("/bulk/update-status", operation_id="orders_bulk_update_status")
+async def bulk_update_order_status(payload: BulkOrderStatusUpdateRequest, background_tasks: BackgroundTasks):
+    """
+    Move a batch of orders (e.g. a warehouse shipping wave) to one status.
+    Orders not in a valid source status for the target are skipped.
+    """
+    status = (payload.status or "").strip()
+    if status not in BULK_STATUS_TRANSITIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid bulk status '{status}'. Allowed: {', '.join(sorted(BULK_STATUS_TRANSITIONS))}",
+        )
+    return await _apply_bulk_transition(payload.order_ids, status, background_tasks)
 
 
 @legacy_router.post("/order/test", operation_id="orders_order_test_create_legacy")
-async def legacy_test_create_order(payload: OrderCreateRequest):
-    return await test_create_order(payload)
+async def legacy_test_create_order(
+    payload: OrderCreateRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER),
+):
+    return await test_create_order(payload, response, idempotency_key)
 
 
 @legacy_router.post("/post/order", operation_id="orders_post_order_legacy")
 async def legacy_post_order(
     payload: OrderCreateRequest,
+    response: Response,
     query: str | None = Query(default=None, description="Optional order query text"),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER),
 ):
-    return await post_order(payload, query)
+    return await post_order(payload, response, query, idempotency_key)
 
 
 @legacy_router.post("/post/order/create", operation_id="orders_post_order_create_legacy")
 @legacy_router.post("/post/order/created", operation_id="orders_post_order_created_legacy")
 async def legacy_post_order_created(
     payload: OrderCreateRequest,
+    response: Response,
     query: str | None = Query(default=None, description="Optional order query text"),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_HEADER),
 ):
-    return await post_order(payload, query)
+    return await post_order(payload, response, query, idempotency_key)
 
 
 @router.get("/debug/webhook-url", operation_id="debug_webhook_url")
@@ -1,22 +1,22 @@
-import razorpay
-import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from types import SimpleNamespace
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-from app.db.session import get_db
+from sqlalchemy import func, select, text
+from app.db.session import AsyncSessionLocal, db_available, get_db
 from app.core.config import settings
+from app.services import razorpay_gateway, stock_reservation
 from app.services.local_order_fallback import get_fallback_order, update_fallback_order_status, create_fallback_order
-from app.routes.simple_billing import generate_invoice_pdf_file
+from app.routes.simple_billing import generate_invoice_pdf_bytes
+from app.services.order_service import SETTLED_STATUSES, OrderService
 from app.services.webhook_service import trigger_n8n_webhook
+from app.models.medicine import Medicine
 from datetime import datetime
 
 router = APIRouter(prefix="/payment", tags=["Payment"])
-
-client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
+logger = logging.getLogger(__name__)
 
 
 class PaymentCreateRequest(BaseModel):
@@ -39,6 +39,8 @@ class VerifySessionRequest(BaseModel):
     razorpay_payment_id: str
     razorpay_signature: str
     order_ids: List[int]
+    # Echo of create_checkout_session's "storage"; ids from the two stores overlap.
+    storage: Literal["primary", "local_fallback"] = "local_fallback"
     items: List[CheckoutItem]
     customer_email: str = "customer@pharmagenie.ai"
     customer_name: str = "PharmaGenie Customer"
@@ -56,9 +58,10 @@ def _normalize_order_id(raw_order_id: str | int) -> int:
 async def _create_payment_for_order(order_id: str, db: AsyncSession) -> dict:
     normalized_order_id = _normalize_order_id(order_id)
     order_total_amount = None
+    order = None
     try:
         result = await db.execute(
-            text("SELECT total_amount FROM orders WHERE id = :order_id"),
+            text("SELECT total_amount, medicine_id, quantity, status FROM orders WHERE id = :order_id"),
             {"order_id": normalized_order_id}
         )
         order = result.fetchone()
@@ -79,12 +82,15 @@ async def _create_payment_for_order(order_id: str, db: AsyncSession) -> dict:
     if amount_paise <= 0:
         raise HTTPException(status_code=400, detail="Order amount must be greater than 0")
 
+    if order is not None:
+        await _hold_stock_for_order(db, normalized_order_id, order)
+
     try:
-        razorpay_order = client.order.create({
-            "amount": amount_paise,
-            "currency": "INR",
-            "receipt": f"order_{normalized_order_id}"
-        })
+        razorpay_order = await razorpay_gateway.create_order(
+            amount_paise,
+            f"order_{normalized_order_id}",
+            app_order_id=normalized_order_id,
+        )
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Razorpay order creation failed: {exc}") from exc
 
@@ -96,6 +102,27 @@ async def _create_payment_for_order(order_id: str, db: AsyncSession) -> dict:
     }
 
 
+async def _hold_stock_for_order(db: AsyncSession, order_id: int, order) -> None:
+    """Set the order's stock aside for the payment window; 409 when it is gone."""
+    if order.status in SETTLED_STATUSES:
+        return
+    try:
+        hold = await stock_reservation.hold_stock(
+            db,
+            order_id,
+            int(order.medicine_id),
+            int(order.quantity),
+            settings.STOCK_HOLD_TTL_SECONDS,
+        )
+    except Exception as exc:
+        # Settlement still guards against oversell if the hold could not be made.
+        logger.warning("Stock hold failed for order %s: %s", order_id, exc)
+        await db.rollback()
+        return
+    if hold is None:
+        raise HTTPException(status_code=409, detail="Insufficient stock for this order")
+
+
 @router.post("/create/{order_id}")
 async def create_payment(order_id: str, db: AsyncSession = Depends(get_db)):
     return await _create_payment_for_order(order_id, db)
@@ -109,15 +136,20 @@ async def create_payment_from_body(payload: PaymentCreateRequest, db: AsyncSessi
     return await _create_payment_for_order(payload.order_id, db)
 
 @router.post("/verify")
-async def verify_payment(data: dict, db: AsyncSession = Depends(get_db)):
+async def verify_payment(
+    data: dict,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        client.utility.verify_payment_signature({
-            "razorpay_order_id": data["razorpay_order_id"],
-            "razorpay_payment_id": data["razorpay_payment_id"],
-            "razorpay_signature": data["razorpay_signature"]
-        })
+        await razorpay_gateway.verify_payment_signature(
+            data["razorpay_order_id"],
+            data["razorpay_payment_id"],
+            data["razorpay_signature"],
+        )
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid payment")
+    razorpay_gateway.forget_order(data["razorpay_order_id"])
 
     if "order_id" not in data:
         raise HTTPException(status_code=422, detail="order_id is required")
@@ -126,45 +158,26 @@ async def verify_payment(data: dict, db: AsyncSession = Depends(get_db)):
     order = None
     try:
         order_result = await db.execute(
-            text("SELECT id, medicine_id, quantity FROM orders WHERE id = :order_id"),
+            text("SELECT id, status FROM orders WHERE id = :order_id"),
             {"order_id": normalized_order_id},
         )
         order = order_result.fetchone()
     except Exception:
         order = None
     stock_deducted = False
+    order_status = "paid"
     invoice_pdf_url = f"/billing/{normalized_order_id}/pdf"
 
     if order:
-        try:
-            await db.execute(
-                text("UPDATE orders SET status='paid' WHERE id=:order_id"),
-                {"order_id": normalized_order_id}
-            )
-
-            await db.execute(
-                text(
-                    """
-                    UPDATE medicines
-                    SET stock = CASE
-                        WHEN stock - :quantity < 0 THEN 0
-                        ELSE stock - :quantity
-                    END
-                    WHERE id = :medicine_id
-                    """
-                ),
-                {"medicine_id": order.medicine_id, "quantity": int(order.quantity)},
-            )
-            await db.commit()
+        settlement = await _settle_primary_orders(db, [normalized_order_id])
+        if settlement["settled"]:
             stock_deducted = True
-        except Exception:
-            stock_deducted = False
+            # Warm the invoice cache so the first download is served from it.
+            background_tasks.add_task(_render_invoices, [normalized_order_id])
         else:
-            try:
-                # Eagerly generate invoice after successful payment and stock deduction.
-                await generate_invoice_pdf_file(normalized_order_id, db)
-            except Exception:
-                pass
+            # Already settled earlier (a retried verify); report what is stored.
+            order_status = order.status
+            stock_deducted = order.status == "paid"
     else:
         fallback = get_fallback_order(normalized_order_id)
         if not fallback:
@@ -174,22 +187,121 @@ async def verify_payment(data: dict, db: AsyncSession = Depends(get_db)):
 
     return {
         "status": "payment_verified",
-        "order_status": "paid",
+        "order_status": order_status,
         "stock_deducted": stock_deducted,
         "invoice_pdf_url": invoice_pdf_url,
     }
 
 
+async def _settle_primary_orders(db: AsyncSession, order_ids: list[int]) -> dict:
+    """
+    Settle orders in the primary DB; 409 when stock ran out and 503 when the
+    DB write failed (nothing is changed in either case).
+    """
+    try:
+        settlement = await OrderService.settle_orders(db, order_ids)
+    except Exception as exc:
+        logger.warning("Settlement in primary DB failed for orders %s: %s", order_ids, exc)
+        await db.rollback()
+        # The payment is captured but nothing was written; verifying again is safe.
+        raise HTTPException(
+            status_code=503,
+            detail="Payment verified but the order could not be settled. Please retry verification.",
+        ) from exc
+
+    if settlement["out_of_stock"]:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Insufficient stock to settle the order(s)",
+                "out_of_stock_medicine_ids": settlement["out_of_stock"],
+            },
+        )
+    return settlement
+
+
+async def _render_invoices(order_ids: list[int]) -> None:
+    async with AsyncSessionLocal() as session:
+        for order_id in order_ids:
+            try:
+                await generate_invoice_pdf_bytes(order_id, session)
+            except Exception as exc:
+                logger.warning("Invoice render failed for order %s: %s", order_id, exc)
+
+
+async def _after_checkout_settlement(order_ids: list[int], notification: dict) -> None:
+    """Background job for one checkout session: render invoices, then notify n8n."""
+    await _render_invoices(order_ids)
+    try:
+        await trigger_n8n_webhook(settings.N8N_ORDER_WEBHOOK, notification)
+    except Exception as exc:
+        # Never let a notification failure surface after payment.
+        logger.warning("order_created webhook failed for %s: %s", notification.get("invoice_number"), exc)
+
+
+async def _create_primary_checkout_orders(db: AsyncSession, payload: CheckoutSessionRequest) -> list[int] | None:
+    """
+    One primary order per cart item, each holding its stock for the payment
+    window. Returns None when the cart has to go to the local store instead
+    (DB unavailable, or an item that is not in the catalog).
+    """
+    if not db_available():
+        return None
+    names = {item.name.strip().lower() for item in payload.items}
+    try:
+        result = await db.execute(
+            select(Medicine.id, Medicine.name).where(func.lower(Medicine.name).in_(names))
+        )
+        medicine_ids = {name.strip().lower(): medicine_id for medicine_id, name in result.all()}
+        if not names <= medicine_ids.keys():
+            return None
+        orders = await OrderService.create_orders(
+            db,
+            [
+                {
+                    "user_id": payload.user_id,
+                    "medicine_id": medicine_ids[item.name.strip().lower()],
+                    "quantity": item.quantity,
+                    "status": "pending_payment",
+                    "total_amount": round(item.price * item.quantity * 1.18, 2),
+                    "requires_prescription": False,
+                }
+                for item in payload.items
+            ],
+        )
+    except Exception as exc:
+        logger.warning("Checkout session could not create primary orders: %s", exc)
+        await db.rollback()
+        return None
+
+    # Plain copies: a rollback inside the hold would expire the ORM objects.
+    holds = [
+        SimpleNamespace(id=order.id, medicine_id=order.medicine_id, quantity=order.quantity, status=order.status)
+        for order in orders
+    ]
+    order_ids = [hold.id for hold in holds]
+    try:
+        for hold in holds:
+            await _hold_stock_for_order(db, hold.id, hold)
+    except HTTPException:
+        # Give back what this session already holds and void its orders.
+        await stock_reservation.release_orders(db, order_ids)
+        await OrderService.bulk_update_status(db, order_ids, "cancelled", ["pending_payment"])
+        raise
+    return order_ids
+
+
 # ─────────────────────────────────────────────
 #  Multi-item cart checkout endpoints
 # ─────────────────────────────────────────────
 
 @router.post("/checkout-session")
-async def create_checkout_session(payload: CheckoutSessionRequest):
+async def create_checkout_session(payload: CheckoutSessionRequest, db: AsyncSession = Depends(get_db)):
     """
     Create orders for all cart items, then create a single Razorpay order
     for the combined total (including 18% GST).
-    Returns Razorpay order details + fallback order IDs.
+    Returns Razorpay order details, the order IDs and the store they live in
+    ("primary" or "local_fallback"), which /verify-session needs back.
     """
     if not payload.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
@@ -202,35 +314,39 @@ async def create_checkout_session(payload: CheckoutSessionRequest):
     if amount_paise <= 0:
         raise HTTPException(status_code=400, detail="Total must be greater than 0")
 
-    # Create a local fallback order per item so we have record IDs
-    order_ids: list[int] = []
-    for item in payload.items:
-        fallback = create_fallback_order(
-            order_data={
-                "user_id": payload.user_id,
-                "medicine_id": 0,
-                "quantity": item.quantity,
-                "status": "pending_payment",
-                "total_amount": round(item.price * item.quantity * 1.18, 2),
-                "requires_prescription": False,
-            },
-            fallback_reason=f"cart_checkout:{item.name}",
-        )
-        order_ids.append(fallback["id"])
+    order_ids = await _create_primary_checkout_orders(db, payload)
+    storage = "primary"
+    if order_ids is None:
+        # Local fallback orders carry no medicine, so they take no stock hold.
+        storage = "local_fallback"
+        order_ids = []
+        for item in payload.items:
+            fallback = create_fallback_order(
+                order_data={
+                    "user_id": payload.user_id,
+                    "medicine_id": 0,
+                    "quantity": item.quantity,
+                    "status": "pending_payment",
+                    "total_amount": round(item.price * item.quantity * 1.18, 2),
+                    "requires_prescription": False,
+                },
+                fallback_reason=f"cart_checkout:{item.name}",
+            )
+            order_ids.append(fallback["id"])
 
     # Create Razorpay order for the combined total
     try:
-        rzp_order = client.order.create({
-            "amount": amount_paise,
-            "currency": "INR",
-            "receipt": f"cart_{payload.user_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
-        })
+        rzp_order = await razorpay_gateway.create_order(
+            amount_paise,
+            f"cart_{payload.user_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
+        )
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Razorpay order creation failed: {exc}") from exc
 
     return {
         "razorpay_order_id": rzp_order["id"],
         "order_ids": order_ids,
+        "storage": storage,
         "amount": rzp_order["amount"],
         "currency": "INR",
         "key_id": settings.RAZORPAY_KEY_ID,
@@ -241,23 +357,37 @@ async def create_checkout_session(payload: CheckoutSessionRequest):
 
 
 @router.post("/verify-session")
-async def verify_checkout_session(data: VerifySessionRequest):
+async def verify_checkout_session(
+    data: VerifySessionRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
     """
     Verify Razorpay payment signature for multi-item cart checkout.
-    Marks all fallback orders as paid and returns structured invoice data.
+    Settles the whole session in one statement and returns structured invoice
+    data. Invoice rendering and the order-created notification run as one
+    background job.
     """
     try:
-        client.utility.verify_payment_signature({
-            "razorpay_order_id": data.razorpay_order_id,
-            "razorpay_payment_id": data.razorpay_payment_id,
-            "razorpay_signature": data.razorpay_signature,
-        })
+        await razorpay_gateway.verify_payment_signature(
+            data.razorpay_order_id,
+            data.razorpay_payment_id,
+            data.razorpay_signature,
+        )
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid payment signature")
 
-    # Mark all orders as paid
-    for oid in data.order_ids:
-        update_fallback_order_status(oid, "paid")
+    razorpay_gateway.forget_order(data.razorpay_order_id)
+
+    settled_ids: list[int] = []
+    if data.storage == "primary":
+        settlement = await _settle_primary_orders(db, data.order_ids)
+        settled_ids = [row["id"] for row in settlement["settled"]]
+    else:
+        # Local ids overlap primary ones, so they never touch the orders table.
+        for oid in data.order_ids:
+            if get_fallback_order(oid):
+                update_fallback_order_status(oid, "paid")
 
     # Build invoice from cart items
     subtotal = round(sum(item.price * item.quantity for item in data.items), 2)
@@ -275,30 +405,28 @@ async def verify_checkout_session(data: VerifySessionRequest):
         for item in data.items
     ]
 
-    # Fire n8n order-created webhook (best-effort — email failure must not block payment)
-    try:
-        asyncio.create_task(trigger_n8n_webhook(settings.N8N_ORDER_WEBHOOK, {
-            "event": "order_created",
-            "customer_name": data.customer_name,
-            "customer_email": data.customer_email,
-            "invoice_number": invoice_number,
-            "payment_id": data.razorpay_payment_id,
-            "order_ids": data.order_ids,
-            "items": invoice_items,
-            "subtotal": subtotal,
-            "tax": tax,
-            "grand_total": grand_total,
-            "invoice_date": datetime.utcnow().strftime("%d %b %Y"),
-            "currency": "INR",
-        }))
-    except Exception:
-        pass  # Never block the payment response for a notification failure
+    # Runs after the response is sent; email failure must not block payment.
+    background_tasks.add_task(_after_checkout_settlement, settled_ids, {
+        "event": "order_created",
+        "customer_name": data.customer_name,
+        "customer_email": data.customer_email,
+        "invoice_number": invoice_number,
+        "payment_id": data.razorpay_payment_id,
+        "order_ids": data.order_ids,
+        "items": invoice_items,
+        "subtotal": subtotal,
+        "tax": tax,
+        "grand_total": grand_total,
+        "invoice_date": datetime.utcnow().strftime("%d %b %Y"),
+        "currency": "INR",
+    })
 
     return {
         "status": "payment_verified",
         "payment_id": data.razorpay_payment_id,
         "razorpay_order_id": data.razorpay_order_id,
         "order_ids": data.order_ids,
+        "storage": data.storage,
         "invoice_number": invoice_number,
         "invoice_date": datetime.utcnow().strftime("%d %b %Y"),
         "items": invoice_items,
@@ -4,7 +4,7 @@ Endpoints for managing medicine refill reminders
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -12,8 +12,8 @@ import os
 import httpx
 
 from app.db.session import get_db
-from app.models.medicine_refill_notification import MedicineRefillNotification
 from app.services.medicine_refill_service import MedicineRefillService
+from app.services.refill_prediction import run_refill_prediction
 
 
 router = APIRouter(prefix="/api/refill-notifications", tags=["refill-notifications"])
@@ -78,7 +78,7 @@ class RefillCreateRequest(BaseModel):
 @router.post("/create")
 async def create_refill_notification(
     body: RefillCreateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new medicine refill notification"""
     customer_id = body.customer_id
@@ -87,7 +87,7 @@ async def create_refill_notification(
     quantity = body.quantity
     refill_days = body.refill_days
     try:
-        notification = MedicineRefillService.create_refill_notification(
+        notification = await MedicineRefillService.create_refill_notification(
             db=db,
             customer_id=customer_id,
             medicine_name=medicine_name,
@@ -107,14 +107,24 @@ async def create_refill_notification(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/predict")
+async def predict_refill_notifications(db: AsyncSession = Depends(get_db)):
+    """Create or refresh reminders for every purchase added since the last run"""
+    try:
+        upserted = await run_refill_prediction(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "upserted": upserted}
+
+
 @router.get("/pending")
 async def get_pending_notifications(
     customer_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get pending refill notifications for customer"""
     try:
-        notifications = MedicineRefillService.get_pending_notifications(
+        notifications = await MedicineRefillService.get_pending_notifications(
             db=db,
             customer_id=customer_id
         )
@@ -142,11 +152,11 @@ async def get_pending_notifications(
 async def get_upcoming_notifications(
     customer_id: str,
     days_ahead: int = Query(7),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get upcoming refill notifications within specified days"""
     try:
-        notifications = MedicineRefillService.get_upcoming_notifications(
+        notifications = await MedicineRefillService.get_upcoming_notifications(
             db=db,
             customer_id=customer_id,
             days_ahead=days_ahead
@@ -174,11 +184,11 @@ async def get_upcoming_notifications(
 @router.put("/{notification_id}/mark-sent")
 async def mark_notification_sent(
     notification_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark notification as sent"""
     try:
-        notification = MedicineRefillService.mark_notification_sent(
+        notification = await MedicineRefillService.mark_notification_sent(
             db=db,
             notification_id=notification_id
         )
@@ -191,6 +201,8 @@ async def mark_notification_sent(
             "notification_id": notification.id,
             "message": "Notification marked as sent"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -198,11 +210,11 @@ async def mark_notification_sent(
 @router.delete("/{notification_id}")
 async def deactivate_notification(
     notification_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Deactivate a refill notification"""
     try:
-        notification = MedicineRefillService.deactivate_notification(
+        notification = await MedicineRefillService.deactivate_notification(
             db=db,
             notification_id=notification_id
         )
@@ -215,6 +227,8 @@ async def deactivate_notification(
             "notification_id": notification.id,
             "message": "Refill notification deactivated"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -222,11 +236,11 @@ async def deactivate_notification(
 @router.get("/all")
 async def get_all_notifications(
     customer_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all refill notifications for customer"""
     try:
-        notifications = MedicineRefillService.get_all_notifications(
+        notifications = await MedicineRefillService.get_all_notifications(
             db=db,
             customer_id=customer_id
         )
@@ -253,13 +267,11 @@ async def get_all_notifications(
 @router.post("/{notification_id}/trigger-n8n")
 async def trigger_n8n_refill_webhook(
     notification_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Trigger the N8N refill workflow webhook for a specific notification (for testing)"""
     try:
-        notification = db.query(MedicineRefillNotification).filter(
-            MedicineRefillNotification.id == notification_id
-        ).first()
+        notification = await MedicineRefillService.get_notification(db, notification_id)
         if not notification:
             raise HTTPException(status_code=404, detail="Notification not found")
 
@@ -1,25 +1,50 @@
+import asyncio
 import csv
+import zipfile
+from collections import deque
 from pathlib import Path
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import datetime
-
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal, db_available, get_db
+from app.services import invoice_renderer
 from app.services.local_order_fallback import get_fallback_order
 from app.services.simple_billing import generate_simple_invoice
+from app.services.stream_sink import ChunkSink
 from app.models.order import Order
 
 router = APIRouter(prefix="/billing", tags=["Billing"])
 
+# Invoices rendered ahead of the one currently being written to the archive.
+EXPORT_RENDER_WINDOW = 8
+# A combined PDF is built in one piece, so keep it to a sane size.
+MAX_COMBINED_PDF_ORDERS = 500
+
+INVOICE_SELECT = """
+    SELECT
+        o.id AS order_id,
+        COALESCE(u.full_name, 'N/A') AS full_name,
+        COALESCE(u.phone, 'N/A') AS phone,
+        COALESCE(u.email, 'N/A') AS email,
+        COALESCE(CAST(u.age AS TEXT), 'N/A') AS age,
+        COALESCE(m.name, CONCAT('Medicine-', CAST(o.medicine_id AS TEXT))) AS medicine_name,
+        'N/A' AS expiry_date,
+        COALESCE(m.price, 0) AS price,
+        o.quantity,
+        o.created_at
+    FROM public.orders o
+    LEFT JOIN public.users u ON CAST(u.id AS TEXT) = o.user_id
+    LEFT JOIN public.medicines m ON m.id = o.medicine_id
+"""
+
+
 @router.post("/generate/{order_id}")
 async def generate_invoice(order_id: str, db: AsyncSession = Depends(get_db)):
 
@@ -33,6 +58,55 @@ async def generate_invoice(order_id: str, db: AsyncSession = Depends(get_db)):
     return invoice
 
 
+@router.get("/export")
+async def export_invoices(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    format: Literal["zip", "pdf"] = "zip",
+):
+    """
+    Invoices for every order created between `from` and `to` (inclusive).
+    zip streams one PDF per order as it is rendered; pdf returns a single
+    combined document and is capped at MAX_COMBINED_PDF_ORDERS orders.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if not db_available():
+        raise HTTPException(status_code=503, detail="Billing export needs the primary database")
+
+    start = datetime.combine(from_date, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(to_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    filename = f"invoices_{from_date.isoformat()}_{to_date.isoformat()}"
+
+    if format == "pdf":
+        contexts = []
+        async for _, context in _iter_invoice_contexts(start, end):
+            if len(contexts) == MAX_COMBINED_PDF_ORDERS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"More than {MAX_COMBINED_PDF_ORDERS} invoices in range; use format=zip",
+                )
+            contexts.append(context)
+        if not contexts:
+            raise HTTPException(status_code=404, detail="No orders in the requested range")
+
+        pdf = await invoice_renderer.render_combined(contexts)
+        return StreamingResponse(
+            _iter_chunks(pdf),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}.pdf"',
+                "Content-Length": str(len(pdf)),
+            },
+        )
+
+    return StreamingResponse(
+        _stream_invoice_zip(start, end),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+    )
+
+
 @router.get("/{order_id}")
 async def get_billing_order(order_id: str, db: AsyncSession = Depends(get_db)):
     try:
@@ -77,144 +151,86 @@ async def download_bill(order_id: str, db: AsyncSession = Depends(get_db)):
     if not order_id.isdigit():
         raise HTTPException(status_code=400, detail="order_id must be numeric")
 
-    file_path = await generate_invoice_pdf_file(int(order_id), db)
+    pdf = await generate_invoice_pdf_bytes(int(order_id), db)
     invoice_filename = f"invoice_{order_id}.pdf"
 
-    return FileResponse(
-        path=str(file_path),
+    return StreamingResponse(
+        _iter_chunks(pdf),
         media_type="application/pdf",
-        filename=invoice_filename,
+        headers={
+            "Content-Disposition": f'attachment; filename="{invoice_filename}"',
+            "Content-Length": str(len(pdf)),
+        },
     )
 
 
-async def generate_invoice_pdf_file(order_id: int, db: AsyncSession) -> str:
+def _iter_chunks(data: bytes, chunk_size: int = 64 * 1024):
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+async def _iter_invoice_contexts(start: datetime, end: datetime):
+    """Yield (order_id, invoice context) for the range off a server-side cursor."""
+    query = text(
+        INVOICE_SELECT
+        + """
+        WHERE o.created_at >= :start AND o.created_at < :end
+        ORDER BY o.created_at, o.id
+        """
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query, {"start": start, "end": end})
+        async for row in result.mappings():
+            order_id = int(row["order_id"])
+            yield order_id, invoice_renderer.build_invoice_context(order_id, row)
+
+
+async def _stream_invoice_zip(start: datetime, end: datetime):
+    # Renders run ahead in a fixed window so at most EXPORT_RENDER_WINDOW PDFs
+    # are held in memory, and entries still land in created_at order.
+    sink = ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    pending: deque[tuple[int, asyncio.Task]] = deque()
+
+    async def write_oldest() -> bytes:
+        order_id, task = pending.popleft()
+        archive.writestr(f"invoice_{order_id}.pdf", await task)
+        return sink.drain()
+
+    try:
+        async for order_id, context in _iter_invoice_contexts(start, end):
+            pending.append(
+                (order_id, asyncio.create_task(invoice_renderer.render_for_export(order_id, context)))
+            )
+            if len(pending) >= EXPORT_RENDER_WINDOW:
+                yield await write_oldest()
+        while pending:
+            yield await write_oldest()
+        archive.close()
+        yield sink.drain()
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+async def generate_invoice_pdf_bytes(order_id: int, db: AsyncSession) -> bytes:
     row = await _fetch_invoice_row(order_id, db)
     if not row:
         raise HTTPException(status_code=404, detail="Order or related billing data not found")
 
-    quantity = int(row["quantity"])
-    unit_price = Decimal(str(row["price"]))
-    subtotal = (unit_price * Decimal(quantity)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    gst = (subtotal * Decimal("0.18")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    total = (subtotal + gst).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    context = invoice_renderer.build_invoice_context(order_id, row)
+    return await invoice_renderer.get_invoice_pdf(order_id, context)
 
-    invoice_number = f"INV-{order_id:04d}"
-    invoice_date = str(row["created_at"])
-    invoice_filename = f"invoice_{order_id}.pdf"
-    invoices_dir = Path("invoices")
-    invoices_dir.mkdir(parents=True, exist_ok=True)
-    file_path = invoices_dir / invoice_filename
-
-    styles = getSampleStyleSheet()
-    doc = SimpleDocTemplate(str(file_path), pagesize=(8.27 * inch, 11.69 * inch))
-    elements = []
-
-    elements.append(Paragraph("PharmaGenie", styles["Title"]))
-    elements.append(Paragraph("TAX INVOICE", styles["Heading2"]))
-    elements.append(Spacer(1, 0.2 * inch))
-    elements.append(Paragraph(f"Invoice Number: {invoice_number}", styles["Normal"]))
-    elements.append(Paragraph(f"Invoice Date: {invoice_date}", styles["Normal"]))
-    elements.append(Spacer(1, 0.25 * inch))
-
-    elements.append(Paragraph("Customer Details", styles["Heading3"]))
-    customer_table = Table(
-        [
-            ["Name", str(row["full_name"])],
-            ["Phone", str(row["phone"])],
-            ["Email", str(row["email"])],
-            ["Age", str(row["age"])],
-        ],
-        colWidths=[1.5 * inch, 5.8 * inch],
-    )
-    customer_table.setStyle(
-        TableStyle(
-            [
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("LEFTPADDING", (0, 0), (-1, -1), 6),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-            ]
-        )
-    )
-    elements.append(customer_table)
-    elements.append(Spacer(1, 0.25 * inch))
-
-    elements.append(Paragraph("Medicine Details", styles["Heading3"]))
-    medicine_table = Table(
-        [
-            ["Medicine", "Expiry", "Qty", "Unit Price", "Subtotal"],
-            [
-                str(row["medicine_name"]),
-                str(row["expiry_date"]),
-                str(quantity),
-                f"{unit_price:.2f}",
-                f"{subtotal:.2f}",
-            ],
-        ],
-        colWidths=[2.2 * inch, 1.4 * inch, 0.7 * inch, 1.2 * inch, 1.2 * inch],
-    )
-    medicine_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2F4F4F")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("ALIGN", (2, 0), (-1, -1), "RIGHT"),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ]
-        )
-    )
-    elements.append(medicine_table)
-    elements.append(Spacer(1, 0.25 * inch))
-
-    summary_table = Table(
-        [
-            ["Subtotal", f"{subtotal:.2f}"],
-            ["GST (18%)", f"{gst:.2f}"],
-            ["Grand Total", f"{total:.2f}"],
-        ],
-        colWidths=[2.5 * inch, 1.5 * inch],
-        hAlign="RIGHT",
-    )
-    summary_table.setStyle(
-        TableStyle(
-            [
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-                ("BACKGROUND", (0, 2), (-1, 2), colors.lightgrey),
-                ("ALIGN", (1, 0), (1, -1), "RIGHT"),
-                ("LEFTPADDING", (0, 0), (-1, -1), 6),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-            ]
-        )
-    )
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.5 * inch))
-    elements.append(Paragraph("Authorized Pharmacist Signature", styles["Normal"]))
 
-    doc.build(elements)
-    return str(file_path.resolve())
+async def generate_invoice_pdf_file(order_id: int, db: AsyncSession) -> str:
+    """Render (or reuse) the invoice and persist it under invoices/."""
+    pdf = await generate_invoice_pdf_bytes(order_id, db)
+    return await invoice_renderer.save_invoice_pdf(order_id, pdf)
 
 
 async def _fetch_invoice_row(order_id: int, db: AsyncSession):
-    invoice_query = text(
-        """
-        SELECT
-            COALESCE(u.full_name, 'N/A') AS full_name,
-            COALESCE(u.phone, 'N/A') AS phone,
-            COALESCE(u.email, 'N/A') AS email,
-            COALESCE(CAST(u.age AS TEXT), 'N/A') AS age,
-            COALESCE(m.name, CONCAT('Medicine-', CAST(o.medicine_id AS TEXT))) AS medicine_name,
-            'N/A' AS expiry_date,
-            COALESCE(m.price, 0) AS price,
-            o.quantity,
-            o.created_at
-        FROM public.orders o
-        LEFT JOIN public.users u ON CAST(u.id AS TEXT) = o.user_id
-        LEFT JOIN public.medicines m ON m.id = o.medicine_id
-        WHERE o.id = :order_id
-        """
-    )
+    invoice_query = text(INVOICE_SELECT + " WHERE o.id = :order_id")
 
     try:
         result = await db.execute(invoice_query, {"order_id": order_id})
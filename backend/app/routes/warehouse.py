@@ -3,10 +3,9 @@ from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import db_available, get_db
 from app.models.medicine import Medicine
-from app.services.webhook_service import trigger_n8n_webhook
+from app.services import catalog_snapshot, stock_alerts
 
 router = APIRouter(prefix="/warehouse", tags=["Warehouse"])
 
@@ -18,27 +17,34 @@ class StockUpdateRequest(BaseModel):
     quantity_change: int
 
 
-def _status_from_stock(stock: int, threshold: int) -> str:
-    if stock <= 0:
-        return "critical"
-    if stock < threshold:
-        return "low"
-    return "ok"
+async def _load_catalog(db: AsyncSession) -> list[dict]:
+    """
+    Read the catalogue from the DB and refresh the in-memory snapshot, or serve
+    the snapshot directly while the DB circuit breaker is open.
+    """
+    if not db_available():
+        return catalog_snapshot.list_medicines()
+    try:
+        result = await db.execute(select(Medicine).order_by(Medicine.name.asc()))
+        medicines = result.scalars().all()
+    except Exception:
+        return catalog_snapshot.list_medicines()
+    catalog_snapshot.refresh(medicines)
+    return catalog_snapshot.list_medicines()
 
 
 @router.get("/medicines")
 async def get_medicines(db: AsyncSession = Depends(get_db)):
     """Return full medicine catalogue including price and category for the customer shop."""
-    result = await db.execute(select(Medicine).order_by(Medicine.name.asc()))
-    medicines = result.scalars().all()
+    medicines = await _load_catalog(db)
 
     return [
         {
-            "id": medicine.id,
-            "name": medicine.name,
-            "category": medicine.category or "General",
-            "price": float(medicine.price or 0),
-            "stock": int(medicine.stock or 0),
+            "id": medicine["id"],
+            "name": medicine["name"],
+            "category": medicine["category"],
+            "price": medicine["price"],
+            "stock": medicine["stock"],
             "requires_prescription": False,
         }
         for medicine in medicines
@@ -47,15 +53,14 @@ async def get_medicines(db: AsyncSession = Depends(get_db)):
 
 @router.get("/stock")
 async def get_warehouse_stock(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Medicine).order_by(Medicine.name.asc()))
-    medicines = result.scalars().all()
+    medicines = await _load_catalog(db)
 
     return [
         {
-            "medicine_name": medicine.name,
-            "stock": int(medicine.stock or 0),
+            "medicine_name": medicine["name"],
+            "stock": medicine["stock"],
             "threshold": DEFAULT_STOCK_THRESHOLD,
-            "status": _status_from_stock(int(medicine.stock or 0), DEFAULT_STOCK_THRESHOLD),
+            "status": stock_alerts.stock_status(medicine["stock"], DEFAULT_STOCK_THRESHOLD),
         }
         for medicine in medicines
     ]
@@ -63,6 +68,8 @@ async def get_warehouse_stock(db: AsyncSession = Depends(get_db)):
 
 @router.post("/update-stock")
 async def update_warehouse_stock(payload: StockUpdateRequest, db: AsyncSession = Depends(get_db)):
+    if not db_available():
+        raise HTTPException(status_code=503, detail="Database unavailable; stock updates are paused.")
     medicine_query = await db.execute(
         select(Medicine).where(Medicine.name.ilike(f"%{payload.medicine_name.strip()}%"))
     )
@@ -79,23 +86,10 @@ async def update_warehouse_stock(payload: StockUpdateRequest, db: AsyncSession =
     await db.commit()
     await db.refresh(medicine)
 
-    webhook_triggered = False
-    webhook_error = None
-    if updated_stock < DEFAULT_STOCK_THRESHOLD:
-        try:
-            await trigger_n8n_webhook(
-                settings.N8N_ORDER_WEBHOOK,
-                {
-                    "event": "low_stock_alert",
-                    "medicine_id": medicine.id,
-                    "medicine_name": medicine.name,
-                    "stock": updated_stock,
-                    "threshold": DEFAULT_STOCK_THRESHOLD,
-                },
-            )
-            webhook_triggered = True
-        except Exception as exc:
-            webhook_error = str(exc)
+    # Alerts are coalesced per medicine and sent once per window.
+    alert_queued = stock_alerts.record_stock_change(
+        medicine.id, medicine.name, previous_stock, updated_stock, DEFAULT_STOCK_THRESHOLD
+    )
 
     return {
         "medicine_id": medicine.id,
@@ -103,7 +97,6 @@ async def update_warehouse_stock(payload: StockUpdateRequest, db: AsyncSession =
         "previous_stock": previous_stock,
         "updated_stock": updated_stock,
         "threshold": DEFAULT_STOCK_THRESHOLD,
-        "status": _status_from_stock(updated_stock, DEFAULT_STOCK_THRESHOLD),
-        "webhook_triggered": webhook_triggered,
-        "webhook_error": webhook_error,
+        "status": stock_alerts.stock_status(updated_stock, DEFAULT_STOCK_THRESHOLD),
+        "alert_queued": alert_queued,
     }
@@ -0,0 +1,162 @@
+"""
+In-memory view of active stock alerts for /notifications/alerts.
+
+Active, unresolved stock_alerts rows are loaded once and indexed by id,
+medicine and severity, so filtered reads cost O(result) and never touch the
+database. Writers in this process keep the view current incrementally
+(upsert() when an alert is raised or refreshed, resolve_*() when it is
+resolved); a full reload every REFRESH_SECONDS picks up writes made by
+other processes.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal
+from app.models.notification import StockAlert
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = 60.0
+
+# alert id -> alert
+_alerts: dict[int, dict] = {}
+# medicine_id -> alert ids
+_by_medicine: dict[int, set[int]] = {}
+# lower-cased medicine name -> alert ids
+_by_name: dict[str, set[int]] = {}
+# severity -> alert ids
+_by_severity: dict[str, set[int]] = {}
+_loaded_at: float | None = None
+_lock = asyncio.Lock()
+
+
+def _as_view(alert: StockAlert) -> dict:
+    return {
+        "id": alert.id,
+        "medicine_id": alert.medicine_id,
+        "medicine_name": alert.medicine_name,
+        "level": alert.alert_level,
+        "severity": alert.severity or alert.alert_level,
+        "current_stock": alert.current_stock,
+        "threshold": alert.total_stock,
+        "stock_percentage": round(alert.stock_percentage or 0.0, 2),
+        "refill_quantity": alert.refill_quantity,
+        "created_at": alert.created_at.isoformat() if alert.created_at else None,
+    }
+
+
+def _index(view: dict) -> None:
+    alert_id = view["id"]
+    _alerts[alert_id] = view
+    _by_medicine.setdefault(view["medicine_id"], set()).add(alert_id)
+    _by_name.setdefault(view["medicine_name"].lower(), set()).add(alert_id)
+    _by_severity.setdefault(view["severity"], set()).add(alert_id)
+
+
+def _unindex(alert_id: int) -> None:
+    view = _alerts.pop(alert_id, None)
+    if view is None:
+        return
+    for index, key in (
+        (_by_medicine, view["medicine_id"]),
+        (_by_name, view["medicine_name"].lower()),
+        (_by_severity, view["severity"]),
+    ):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(alert_id)
+            if not ids:
+                del index[key]
+
+
+def upsert(alerts: Iterable[StockAlert]) -> None:
+    """Add or refresh alerts after their rows were committed."""
+    for alert in alerts:
+        _unindex(alert.id)
+        if alert.is_active and not alert.is_resolved:
+            _index(_as_view(alert))
+
+
+def resolve_alerts(alert_ids: Iterable[int]) -> None:
+    for alert_id in alert_ids:
+        _unindex(alert_id)
+
+
+def resolve_medicines(medicine_ids: Iterable[int]) -> None:
+    for medicine_id in medicine_ids:
+        for alert_id in list(_by_medicine.get(medicine_id, ())):
+            _unindex(alert_id)
+
+
+async def load() -> int:
+    """Rebuild the view from stock_alerts."""
+    global _loaded_at
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(StockAlert)
+            .where(StockAlert.is_active.is_(True), StockAlert.is_resolved.is_(False))
+            .order_by(StockAlert.created_at.desc(), StockAlert.id.desc())
+        )
+        rows = result.scalars().all()
+    for index in (_alerts, _by_medicine, _by_name, _by_severity):
+        index.clear()
+    for alert in rows:
+        _index(_as_view(alert))
+    _loaded_at = time.monotonic()
+    return len(rows)
+
+
+async def ensure_loaded(max_age: float = REFRESH_SECONDS) -> None:
+    if _loaded_at is not None and time.monotonic() - _loaded_at < max_age:
+        return
+    async with _lock:
+        if _loaded_at is not None and time.monotonic() - _loaded_at < max_age:
+            return
+        try:
+            await load()
+        except Exception as exc:
+            # Serve the last known view while the DB is unreachable.
+            logger.warning("Active alert view reload failed: %s", exc)
+
+
+def query(
+    medicine_id: Optional[int] = None,
+    medicine_name: Optional[str] = None,
+    severity: Optional[str] = None,
+) -> list[dict]:
+    """
+    Active alerts matching every given filter, newest first. medicine_id,
+    exact names and severity are index lookups; a partial name scans the
+    distinct medicine names only.
+    """
+    candidates: Optional[set[int]] = None
+    if medicine_id is not None:
+        candidates = set(_by_medicine.get(medicine_id, ()))
+    if medicine_name:
+        needle = medicine_name.strip().lower()
+        named = _by_name.get(needle)
+        if named is None:
+            named = set()
+            for name, ids in _by_name.items():
+                if needle in name:
+                    named |= ids
+        candidates = named if candidates is None else candidates & named
+    if severity:
+        graded = _by_severity.get(severity, set())
+        candidates = set(graded) if candidates is None else candidates & graded
+
+    if candidates is None:
+        views = list(_alerts.values())
+    else:
+        views = [_alerts[alert_id] for alert_id in candidates]
+    views.sort(key=lambda view: (view["created_at"] or "", view["id"]), reverse=True)
+    return views
+
+
+def counts() -> dict[str, int]:
+    return {severity: len(ids) for severity, ids in _by_severity.items()}
@@ -0,0 +1,64 @@
+"""
+Result cache for the analytics endpoints.
+
+Entries are keyed by endpoint and parameters and tagged with the order
+version current when they were computed. OrderService bumps the version on
+every order create, status change and payment, which invalidates everything
+at once; while nothing changes, dashboard polls are served without touching
+the database.
+
+The version is per process, so a write handled by another worker is only
+picked up when the entry reaches max_age. max_age also covers inputs that
+change without an order write (the date rolling over, the forecast job).
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+_order_version = 0
+# (endpoint, params) -> (order_version, expires_at, result)
+_entries: dict[tuple[str, Hashable], tuple[int, float, Any]] = {}
+_in_flight: dict[tuple[str, Hashable], asyncio.Future] = {}
+
+
+def bump_order_version() -> None:
+    global _order_version
+    _order_version += 1
+
+
+def order_version() -> int:
+    return _order_version
+
+
+def invalidate(endpoint: str) -> None:
+    for key in [key for key in _entries if key[0] == endpoint]:
+        del _entries[key]
+
+
+async def cached(
+    endpoint: str,
+    params: Hashable,
+    max_age: float,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    key = (endpoint, params)
+    entry = _entries.get(key)
+    if entry is not None and entry[0] == _order_version and entry[1] > time.monotonic():
+        return entry[2]
+
+    # Concurrent polls for the same key share one query.
+    pending = _in_flight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    # Taken before the query: a write landing mid-query leaves the entry stale.
+    version = _order_version
+    future = asyncio.ensure_future(compute())
+    _in_flight[key] = future
+    try:
+        result = await asyncio.shield(future)
+    finally:
+        _in_flight.pop(key, None)
+    _entries[key] = (version, time.monotonic() + max_age, result)
+    return result
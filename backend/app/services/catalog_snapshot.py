@@ -0,0 +1,69 @@
+import csv
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+
+CSV_PATH = Path(__file__).resolve().parents[2] / "medicine_master.csv"
+
+_lock = threading.Lock()
+_medicines: dict[int, dict[str, Any]] = {}
+_seeded = False
+
+
+def _seed_from_csv() -> None:
+    global _seeded
+    _seeded = True
+    if _medicines or not CSV_PATH.exists():
+        return
+    try:
+        with open(CSV_PATH, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                raw_id = (row.get("medicine_id") or "").strip()
+                if not raw_id.isdigit():
+                    continue
+                stock = (row.get("stock_quantity") or "").strip()
+                _medicines[int(raw_id)] = {
+                    "id": int(raw_id),
+                    "name": (row.get("medicine_name") or "").strip(),
+                    "category": (row.get("category") or "").strip() or "General",
+                    "price": 0.0,
+                    "stock": int(stock) if stock.isdigit() else 0,
+                }
+    except Exception:
+        return
+
+
+def refresh(medicines: Iterable[Any]) -> None:
+    """Replace the snapshot with rows freshly read from the primary DB."""
+    entries = {
+        int(medicine.id): {
+            "id": int(medicine.id),
+            "name": medicine.name,
+            "category": medicine.category or "General",
+            "price": float(medicine.price or 0),
+            "stock": int(medicine.stock or 0),
+        }
+        for medicine in medicines
+    }
+    global _medicines, _seeded
+    with _lock:
+        _medicines = entries
+        _seeded = True
+
+
+def list_medicines() -> list[dict[str, Any]]:
+    with _lock:
+        if not _seeded:
+            _seed_from_csv()
+        return sorted((dict(entry) for entry in _medicines.values()), key=lambda entry: entry["name"])
+
+
+def get_medicine_name(medicine_id: int | None) -> str | None:
+    if medicine_id is None:
+        return None
+    with _lock:
+        if not _seeded:
+            _seed_from_csv()
+        entry = _medicines.get(int(medicine_id))
+        return entry["name"] if entry else None
@@ -38,6 +38,8 @@ async def load_customer_history_from_csv(path: str):
                 customer_id=str(row.get("customer_id", "")),
                 medicine_name=str(row.get("medicine_name", "")),
                 quantity=int(row.get("quantity") or 0),
+                purchase_date=pd.to_datetime(row["purchase_date"]).date() if pd.notna(row.get("purchase_date")) else None,
+                dosage_frequency=int(row["dosage_frequency"]) if pd.notna(row.get("dosage_frequency")) else None,
             )
             session.add(history)
 
@@ -1,20 +1,29 @@
 """
 Delivery Service - Business logic for delivery tracking
 """
-from typing import Optional, List
-from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from typing import Optional, List, Dict, Iterable
+from datetime import datetime, timezone
+from sqlalchemy import desc, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.delivery import Delivery, DeliveryHistory, DeliveryNotification
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class DeliveryService:
-    """Service for managing deliveries"""
+    """
+    Service for managing deliveries.
+
+    Every method takes the request's AsyncSession and commits at most once;
+    stage changes and their history rows go out in the same transaction.
+    """
     
     @staticmethod
-    def create_delivery(
-        db: Session,
+    async def create_delivery(
+        db: AsyncSession,
         order_id: str,
         tracking_number: str,
         customer_id: str,
@@ -32,41 +41,46 @@ class DeliveryService:
             current_stage=stage
         )
         db.add(delivery)
-        db.commit()
-        db.refresh(delivery)
+        await db.commit()
+        await db.refresh(delivery)
         return delivery
     
     @staticmethod
-    def get_delivery_by_order(db: Session, order_id: str) -> Optional[Delivery]:
+    async def get_delivery_by_order(db: AsyncSession, order_id: str) -> Optional[Delivery]:
         """Get delivery record by order ID"""
-        return db.query(Delivery).filter(Delivery.order_id == order_id).first()
+        result = await db.execute(select(Delivery).where(Delivery.order_id == order_id))
+        return result.scalars().first()
+    
+    @staticmethod
+    async def get_deliveries_by_orders(db: AsyncSession, order_ids: Iterable[str]) -> Dict[str, Delivery]:
+        """Delivery records for several orders in one query, keyed by order_id"""
+        result = await db.execute(select(Delivery).where(Delivery.order_id.in_(list(order_ids))))
+        return {delivery.order_id: delivery for delivery in result.scalars().all()}
     
     @staticmethod
-    def get_delivery_by_tracking(db: Session, tracking_number: str) -> Optional[Delivery]:
+    async def get_delivery_by_tracking(db: AsyncSession, tracking_number: str) -> Optional[Delivery]:
         """Get delivery record by tracking number"""
-        return db.query(Delivery).filter(Delivery.tracking_number == tracking_number).first()
+        result = await db.execute(select(Delivery).where(Delivery.tracking_number == tracking_number))
+        return result.scalars().first()
     
     @staticmethod
-    def get_deliveries_by_customer(db: Session, customer_id: str) -> List[Delivery]:
+    async def get_deliveries_by_customer(db: AsyncSession, customer_id: str) -> List[Delivery]:
         """Get all deliveries for a customer"""
-        return db.query(Delivery).filter(Delivery.customer_id == customer_id).all()
+        result = await db.execute(select(Delivery).where(Delivery.customer_id == customer_id))
+        return list(result.scalars().all())
     
     @staticmethod
-    def update_delivery_stage(
-        db: Session,
-        delivery_id: int,
+    def _apply_stage(
+        db: AsyncSession,
+        delivery: Delivery,
         new_stage: str,
         location: Optional[dict] = None,
         notes: Optional[str] = None
-    ) -> Delivery:
-        """Update delivery stage and create history record"""
-        delivery = db.query(Delivery).filter(Delivery.id == delivery_id).first()
-        if not delivery:
-            raise ValueError(f"Delivery not found: {delivery_id}")
-        
+    ) -> DeliveryHistory:
+        now = _utcnow()
         old_stage = delivery.current_stage
         delivery.current_stage = new_stage
-        delivery.updated_at = datetime.utcnow()
+        delivery.updated_at = now
         
         # Update location if provided
         if location:
@@ -77,37 +91,74 @@ class DeliveryService:
         # Mark as delivered if final stage
         if new_stage == "delivered":
             delivery.is_delivered = True
-            delivery.delivered_at = datetime.utcnow()
+            delivery.delivered_at = now
         
         if new_stage == "failed":
-            delivery.delivery_attempts += 1
-        
-        db.add(delivery)
-        db.commit()
+            delivery.delivery_attempts = (delivery.delivery_attempts or 0) + 1
         
-        # Create history record
-        DeliveryService.create_history_record(
+        return DeliveryService.create_history_record(
             db=db,
-            delivery_id=delivery_id,
+            delivery_id=delivery.id,
             old_stage=old_stage,
             new_stage=new_stage,
             location=location,
             notes=notes
         )
+    
+    @staticmethod
+    async def update_delivery_stage(
+        db: AsyncSession,
+        delivery_id: int,
+        new_stage: str,
+        location: Optional[dict] = None,
+        notes: Optional[str] = None
+    ) -> Delivery:
+        """Update delivery stage and create history record"""
+        delivery = await db.get(Delivery, delivery_id)
+        if not delivery:
+            raise ValueError(f"Delivery not found: {delivery_id}")
         
-        db.refresh(delivery)
+        DeliveryService._apply_stage(db, delivery, new_stage, location, notes)
+        await db.commit()
+        await db.refresh(delivery)
         return delivery
     
+    @staticmethod
+    async def update_delivery_stages(db: AsyncSession, updates: List[dict]) -> List[Delivery]:
+        """
+        Apply several stage changes ({"delivery_id", "new_stage", "location",
+        "notes"}). The deliveries are loaded in one query and all changes and
+        history rows are committed together; unknown ids raise before anything
+        is written.
+        """
+        ids = {item["delivery_id"] for item in updates}
+        result = await db.execute(select(Delivery).where(Delivery.id.in_(ids)))
+        deliveries = {delivery.id: delivery for delivery in result.scalars().all()}
+        missing = sorted(ids - deliveries.keys())
+        if missing:
+            raise ValueError(f"Delivery not found: {missing}")
+        
+        for item in updates:
+            DeliveryService._apply_stage(
+                db,
+                deliveries[item["delivery_id"]],
+                item["new_stage"],
+                item.get("location"),
+                item.get("notes")
+            )
+        await db.commit()
+        return list(deliveries.values())
+    
     @staticmethod
     def create_history_record(
-        db: Session,
+        db: AsyncSession,
         delivery_id: int,
         old_stage: str,
         new_stage: str,
         location: Optional[dict] = None,
         notes: Optional[str] = None
     ) -> DeliveryHistory:
-        """Create a delivery history record"""
+        """Add a delivery history record; it is written with the caller's commit"""
         history = DeliveryHistory(
             delivery_id=delivery_id,
             old_stage=old_stage,
@@ -116,24 +167,24 @@ class DeliveryService:
             longitude=location.get("longitude") if location else None,
             location_description=location.get("address") if location else None,
             description=notes,
-            timestamp=datetime.utcnow()
+            timestamp=_utcnow()
         )
         db.add(history)
-        db.commit()
-        db.refresh(history)
         return history
     
     @staticmethod
-    def get_delivery_history(db: Session, delivery_id: int) -> List[DeliveryHistory]:
+    async def get_delivery_history(db: AsyncSession, delivery_id: int) -> List[DeliveryHistory]:
         """Get all history records for a delivery"""
-        return db.query(DeliveryHistory)\
-            .filter(DeliveryHistory.delivery_id == delivery_id)\
-            .order_by(desc(DeliveryHistory.timestamp))\
-            .all()
+        result = await db.execute(
+            select(DeliveryHistory)
+            .where(DeliveryHistory.delivery_id == delivery_id)
+            .order_by(desc(DeliveryHistory.timestamp))
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def create_notification(
-        db: Session,
+    async def create_notification(
+        db: AsyncSession,
         delivery_id: int,
         notification_type: str,
         message: str,
@@ -153,51 +204,71 @@ class DeliveryService:
             notification_method=notification_method
         )
         db.add(notification)
-        db.commit()
-        db.refresh(notification)
+        await db.commit()
+        await db.refresh(notification)
         return notification
     
     @staticmethod
-    def mark_notification_sent(
-        db: Session,
+    async def mark_notification_sent(
+        db: AsyncSession,
         notification_id: int,
         n8n_workflow_id: Optional[str] = None,
         n8n_execution_id: Optional[str] = None
     ) -> DeliveryNotification:
         """Mark notification as sent"""
-        notification = db.query(DeliveryNotification)\
-            .filter(DeliveryNotification.id == notification_id)\
-            .first()
+        notification = await db.get(DeliveryNotification, notification_id)
         
         if not notification:
             raise ValueError(f"Notification not found: {notification_id}")
         
         notification.is_sent = True
-        notification.sent_at = datetime.utcnow()
+        notification.sent_at = _utcnow()
         if n8n_workflow_id:
             notification.n8n_workflow_id = n8n_workflow_id
         if n8n_execution_id:
             notification.n8n_execution_id = n8n_execution_id
         
-        db.add(notification)
-        db.commit()
-        db.refresh(notification)
+        await db.commit()
+        await db.refresh(notification)
         return notification
     
     @staticmethod
-    def get_pending_notifications(db: Session) -> List[DeliveryNotification]:
+    async def mark_notifications_sent(
+        db: AsyncSession,
+        notification_ids: List[int],
+        n8n_workflow_id: Optional[str] = None
+    ) -> int:
+        """Mark several notifications sent with one UPDATE; returns how many changed"""
+        if not notification_ids:
+            return 0
+        values = {"is_sent": True, "sent_at": func.now()}
+        if n8n_workflow_id:
+            values["n8n_workflow_id"] = n8n_workflow_id
+        result = await db.execute(
+            update(DeliveryNotification)
+            .where(DeliveryNotification.id.in_(notification_ids))
+            .values(**values)
+        )
+        await db.commit()
+        return result.rowcount
+    
+    @staticmethod
+    async def get_pending_notifications(db: AsyncSession) -> List[DeliveryNotification]:
         """Get all pending notifications"""
-        return db.query(DeliveryNotification)\
-            .filter(DeliveryNotification.is_sent == False)\
-            .order_by(DeliveryNotification.created_at)\
-            .all()
+        result = await db.execute(
+            select(DeliveryNotification)
+            .where(DeliveryNotification.is_sent.is_(False))
+            .order_by(DeliveryNotification.created_at)
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_failed_deliveries(db: Session, max_attempts: int = 3) -> List[Delivery]:
+    async def get_failed_deliveries(db: AsyncSession, max_attempts: int = 3) -> List[Delivery]:
         """Get deliveries that have failed"""
-        return db.query(Delivery)\
-            .filter(and_(
-                Delivery.is_delivered == False,
+        result = await db.execute(
+            select(Delivery).where(
+                Delivery.is_delivered.is_(False),
                 Delivery.delivery_attempts >= max_attempts
-            ))\
-            .all()
+            )
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,216 @@
+"""
+Per-medicine demand forecasting for /analytics/demand-forecast.
+
+Daily order quantities for every medicine are loaded into one
+(medicines x days) NumPy matrix and all series are fitted at once: simple
+exponential smoothing for regularly sold medicines, Croston's method for
+intermittent ones (average demand interval above 1.32 days, the usual
+Syntetos-Boylan cut-off). A background job writes the results to
+demand_forecasts; the endpoint only reads that table.
+
+Recompute by hand (from backend/):
+    python -m app.services.demand_forecast
+"""
+
+import asyncio
+import logging
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services import analytics_cache
+
+logger = logging.getLogger(__name__)
+
+SES_ALPHA = 0.3
+CROSTON_ALPHA = 0.1
+INTERMITTENT_ADI = 1.32
+FORECAST_CACHE_ENDPOINT = "demand-forecast"
+
+_scheduler: asyncio.Task | None = None
+
+
+def build_demand_matrix(rows, days: int) -> tuple[list[int], list[str], np.ndarray]:
+    """
+    rows: (medicine_id, medicine_name, age_in_days, quantity), where age 0 is
+    today. Returns ids, names and a matrix with the oldest day in column 0.
+    """
+    index: dict[int, int] = {}
+    names: list[str] = []
+    positions, columns, quantities = [], [], []
+    for medicine_id, medicine_name, age, quantity in rows:
+        if medicine_id not in index:
+            index[medicine_id] = len(index)
+            names.append(medicine_name)
+        positions.append(index[medicine_id])
+        columns.append(days - 1 - int(age))
+        quantities.append(float(quantity or 0))
+
+    matrix = np.zeros((len(index), days))
+    if positions:
+        np.add.at(matrix, (np.array(positions), np.array(columns)), np.array(quantities))
+    return list(index), names, matrix
+
+
+def simple_exponential_smoothing(matrix: np.ndarray, alpha: float = SES_ALPHA) -> np.ndarray:
+    """Smoothed level after the last day, per row."""
+    level = matrix[:, 0].copy()
+    for t in range(1, matrix.shape[1]):
+        level = alpha * matrix[:, t] + (1 - alpha) * level
+    return level
+
+
+def croston(matrix: np.ndarray, alpha: float = CROSTON_ALPHA) -> np.ndarray:
+    """Croston's per-day demand rate (smoothed size / smoothed interval), per row."""
+    rows = matrix.shape[0]
+    size = np.zeros(rows)
+    interval = np.ones(rows)
+    since_last = np.ones(rows)
+    seen = np.zeros(rows, dtype=bool)
+    for t in range(matrix.shape[1]):
+        demand = matrix[:, t]
+        hit = demand > 0
+        first = hit & ~seen
+        update = hit & seen
+        size = np.where(first, demand, np.where(update, alpha * demand + (1 - alpha) * size, size))
+        interval = np.where(first, since_last, np.where(update, alpha * since_last + (1 - alpha) * interval, interval))
+        seen |= hit
+        since_last = np.where(hit, 1, since_last + 1)
+    return np.where(seen, size / interval, 0.0)
+
+
+def forecast(matrix: np.ndarray) -> dict[str, np.ndarray]:
+    days = matrix.shape[1]
+    nonzero_days = np.count_nonzero(matrix, axis=1)
+    adi = np.where(nonzero_days > 0, days / np.maximum(nonzero_days, 1), np.inf)
+    intermittent = adi > INTERMITTENT_ADI
+
+    daily_rate = np.where(intermittent, croston(matrix), simple_exponential_smoothing(matrix))
+    weekly = matrix[:, -7:].sum(axis=1)
+    previous_week = matrix[:, -14:-7].sum(axis=1)
+    return {
+        "daily_rate": daily_rate,
+        "forecast_next_week": np.rint(daily_rate * 7).astype(int),
+        "weekly_orders": weekly.astype(int),
+        "previous_week_orders": previous_week.astype(int),
+        "intermittent": intermittent,
+    }
+
+
+async def recompute_forecasts(session: AsyncSession, history_days: int) -> int:
+    result = await session.execute(
+        text(
+            """
+            SELECT
+                m.id AS medicine_id,
+                m.name AS medicine_name,
+                CURRENT_DATE - o.created_at::date AS age,
+                SUM(COALESCE(o.quantity, 0)) AS quantity
+            FROM public.orders o
+            JOIN public.medicines m ON m.id = o.medicine_id
+            WHERE o.created_at >= CURRENT_DATE - CAST(:days_back AS INTEGER)
+              AND o.created_at < CURRENT_DATE + 1
+            GROUP BY m.id, m.name, o.created_at::date
+            """
+        ),
+        {"days_back": history_days - 1},
+    )
+    medicine_ids, names, matrix = build_demand_matrix(result.all(), history_days)
+    fitted = forecast(matrix)
+
+    records = []
+    for i, medicine_id in enumerate(medicine_ids):
+        weekly = int(fitted["weekly_orders"][i])
+        previous = int(fitted["previous_week_orders"][i])
+        records.append(
+            {
+                "medicine_id": medicine_id,
+                "medicine_name": names[i],
+                "weekly_orders": weekly,
+                "previous_week_orders": previous,
+                "daily_rate": float(fitted["daily_rate"][i]),
+                "forecast_next_week": int(fitted["forecast_next_week"][i]),
+                "method": "croston" if fitted["intermittent"][i] else "ses",
+                "trend": "up" if weekly > previous else "down" if weekly < previous else "stable",
+            }
+        )
+
+    # Replace the whole table in one transaction so readers never see a mix.
+    await session.execute(text("DELETE FROM public.demand_forecasts"))
+    if records:
+        await session.execute(
+            text(
+                """
+                INSERT INTO public.demand_forecasts (
+                    medicine_id, medicine_name, weekly_orders, previous_week_orders,
+                    daily_rate, forecast_next_week, method, trend, computed_at
+                )
+                VALUES (
+                    :medicine_id, :medicine_name, :weekly_orders, :previous_week_orders,
+                    :daily_rate, :forecast_next_week, :method, :trend, NOW()
+                )
+                """
+            ),
+            records,
+        )
+    await session.commit()
+    analytics_cache.invalidate(FORECAST_CACHE_ENDPOINT)
+    return len(records)
+
+
+async def read_forecasts(session: AsyncSession, limit: int) -> list[dict]:
+    result = await session.execute(
+        text(
+            """
+            SELECT medicine_name, weekly_orders, trend, forecast_next_week
+            FROM public.demand_forecasts
+            ORDER BY weekly_orders DESC, medicine_name ASC
+            LIMIT :limit
+            """
+        ),
+        {"limit": limit},
+    )
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def _recompute_forever(interval_seconds: float, history_days: int) -> None:
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                count = await recompute_forecasts(session, history_days)
+            logger.info("Demand forecasts recomputed for %s medicine(s)", count)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Demand forecast job failed: %s", exc)
+        await asyncio.sleep(interval_seconds)
+
+
+def start_scheduler(interval_seconds: float, history_days: int) -> None:
+    global _scheduler
+    if _scheduler is None or _scheduler.done():
+        _scheduler = asyncio.create_task(_recompute_forever(interval_seconds, history_days))
+
+
+async def stop_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        try:
+            await _scheduler
+        except asyncio.CancelledError:
+            pass
+        _scheduler = None
+
+
+async def _main() -> None:
+    async with AsyncSessionLocal() as session:
+        count = await recompute_forecasts(session, settings.DEMAND_FORECAST_HISTORY_DAYS)
+    print(f"Recomputed demand forecasts for {count} medicine(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,110 @@
+"""
+In-process idempotency layer for retried write requests.
+
+The first request for a key runs normally and its response is kept in a
+bounded LRU with a TTL; retries replay that response. Concurrent duplicates
+arriving while the first is still running wait on the same future instead of
+executing again. Failed requests are not cached, so a retry after an error
+runs for real.
+
+State is per process: with several uvicorn workers, a retry routed to a
+different worker is not deduplicated.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        # key -> (expires_at, fingerprint, response)
+        self._completed: OrderedDict[str, tuple[float, str, Any]] = OrderedDict()
+        self._in_flight: dict[str, tuple[str, asyncio.Future]] = {}
+
+    @staticmethod
+    def fingerprint(payload: Any) -> str:
+        canonical = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> tuple[str, Any] | None:
+        entry = self._completed.get(key)
+        if entry is None:
+            return None
+        expires_at, fingerprint, response = entry
+        if expires_at <= time.monotonic():
+            del self._completed[key]
+            return None
+        self._completed.move_to_end(key)
+        return fingerprint, response
+
+    def _store(self, key: str, fingerprint: str, response: Any, ttl: float) -> None:
+        self._completed[key] = (time.monotonic() + ttl, fingerprint, response)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        ttl: float,
+        handler: Callable[[], Awaitable[Any]],
+    ) -> tuple[Any, bool]:
+        """
+        Run ``handler`` once per key. Returns (response, replayed).
+        Reusing a key with a different payload fingerprint is rejected with 422.
+        """
+        while True:
+            cached = self._lookup(key)
+            if cached is not None:
+                self._check_fingerprint(cached[0], fingerprint)
+                return cached[1], True
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            self._check_fingerprint(in_flight[0], fingerprint)
+            try:
+                return await asyncio.shield(in_flight[1]), True
+            except asyncio.CancelledError:
+                if not in_flight[1].cancelled():
+                    raise
+                # The original request was dropped mid-flight; take over.
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            response = await handler()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so an un-awaited future does not log a warning.
+            future.exception()
+            raise
+        else:
+            self._store(key, fingerprint, response, ttl)
+            future.set_result(response)
+            return response, False
+        finally:
+            self._in_flight.pop(key, None)
+
+    def forget(self, key: str) -> None:
+        """Drop a completed response so the next request for the key runs again."""
+        self._completed.pop(key, None)
+
+    @staticmethod
+    def _check_fingerprint(stored: str, incoming: str) -> None:
+        if stored != incoming:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request payload",
+            )
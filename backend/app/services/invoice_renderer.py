@@ -0,0 +1,294 @@
+"""
+Invoice PDF rendering off the event loop.
+
+reportlab is CPU-bound and synchronous, so PDFs are built in a small process
+pool behind a concurrency cap, straight into an in-memory buffer. Rendered
+bytes are cached per order and keyed by a hash of the invoice content: repeat
+downloads reuse them until the order's billing data changes. Writing the PDF
+to invoices/ is optional (INVOICE_PDF_WRITE_TO_DISK), since Render's disk is
+ephemeral anyway.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from pathlib import Path
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import PageBreak, SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+INVOICES_DIR = Path(__file__).resolve().parents[2] / "invoices"
+GST_RATE = Decimal("0.18")
+PAGE_SIZE = (8.27 * inch, 11.69 * inch)
+
+# Built once per process (each pool worker gets its own copy on import).
+STYLES = getSampleStyleSheet()
+CUSTOMER_TABLE_STYLE = TableStyle(
+    [
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+        ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 6),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+    ]
+)
+MEDICINE_TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2F4F4F")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (2, 0), (-1, -1), "RIGHT"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+)
+SUMMARY_TABLE_STYLE = TableStyle(
+    [
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("BACKGROUND", (0, 2), (-1, 2), colors.lightgrey),
+        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 6),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+    ]
+)
+CUSTOMER_COL_WIDTHS = [1.5 * inch, 5.8 * inch]
+MEDICINE_COL_WIDTHS = [2.2 * inch, 1.4 * inch, 0.7 * inch, 1.2 * inch, 1.2 * inch]
+SUMMARY_COL_WIDTHS = [2.5 * inch, 1.5 * inch]
+MEDICINE_HEADER = ["Medicine", "Expiry", "Qty", "Unit Price", "Subtotal"]
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 2
+_render_slots: asyncio.Semaphore | None = None
+_render_concurrency = 4
+_write_to_disk = False
+_cache_max_bytes = 64 * 1024 * 1024
+
+# order_id -> (content_hash, pdf bytes), least recently used first
+_cache: OrderedDict[int, tuple[str, bytes]] = OrderedDict()
+_cache_bytes = 0
+# (order_id, content_hash) -> render in progress
+_in_flight: dict[tuple[int, str], asyncio.Future] = {}
+
+
+def configure(workers: int, concurrency: int, write_to_disk: bool = False, cache_max_bytes: int | None = None) -> None:
+    global _pool_workers, _render_concurrency, _write_to_disk, _cache_max_bytes
+    _pool_workers = max(1, workers)
+    _render_concurrency = max(1, concurrency)
+    _write_to_disk = write_to_disk
+    if cache_max_bytes is not None:
+        _cache_max_bytes = max(0, cache_max_bytes)
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def build_invoice_context(order_id: int, row) -> dict:
+    """Turn a billing row into plain, picklable values for the worker process."""
+    quantity = int(row["quantity"])
+    unit_price = Decimal(str(row["price"]))
+    subtotal = _money(unit_price * Decimal(quantity))
+    gst = _money(subtotal * GST_RATE)
+    return {
+        "order_id": order_id,
+        "invoice_number": f"INV-{order_id:04d}",
+        "invoice_date": str(row["created_at"]),
+        "full_name": str(row["full_name"]),
+        "phone": str(row["phone"]),
+        "email": str(row["email"]),
+        "age": str(row["age"]),
+        "medicine_name": str(row["medicine_name"]),
+        "expiry_date": str(row["expiry_date"]),
+        "quantity": quantity,
+        "unit_price": f"{unit_price:.2f}",
+        "subtotal": f"{subtotal:.2f}",
+        "gst": f"{gst:.2f}",
+        "total": f"{_money(subtotal + gst):.2f}",
+    }
+
+
+def content_hash(context: dict) -> str:
+    canonical = json.dumps(context, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _invoice_elements(context: dict) -> list:
+    elements = []
+
+    elements.append(Paragraph("PharmaGenie", STYLES["Title"]))
+    elements.append(Paragraph("TAX INVOICE", STYLES["Heading2"]))
+    elements.append(Spacer(1, 0.2 * inch))
+    elements.append(Paragraph(f"Invoice Number: {context['invoice_number']}", STYLES["Normal"]))
+    elements.append(Paragraph(f"Invoice Date: {context['invoice_date']}", STYLES["Normal"]))
+    elements.append(Spacer(1, 0.25 * inch))
+
+    elements.append(Paragraph("Customer Details", STYLES["Heading3"]))
+    customer_table = Table(
+        [
+            ["Name", context["full_name"]],
+            ["Phone", context["phone"]],
+            ["Email", context["email"]],
+            ["Age", context["age"]],
+        ],
+        colWidths=CUSTOMER_COL_WIDTHS,
+    )
+    customer_table.setStyle(CUSTOMER_TABLE_STYLE)
+    elements.append(customer_table)
+    elements.append(Spacer(1, 0.25 * inch))
+
+    elements.append(Paragraph("Medicine Details", STYLES["Heading3"]))
+    medicine_table = Table(
+        [
+            MEDICINE_HEADER,
+            [
+                context["medicine_name"],
+                context["expiry_date"],
+                str(context["quantity"]),
+                context["unit_price"],
+                context["subtotal"],
+            ],
+        ],
+        colWidths=MEDICINE_COL_WIDTHS,
+    )
+    medicine_table.setStyle(MEDICINE_TABLE_STYLE)
+    elements.append(medicine_table)
+    elements.append(Spacer(1, 0.25 * inch))
+
+    summary_table = Table(
+        [
+            ["Subtotal", context["subtotal"]],
+            ["GST (18%)", context["gst"]],
+            ["Grand Total", context["total"]],
+        ],
+        colWidths=SUMMARY_COL_WIDTHS,
+        hAlign="RIGHT",
+    )
+    summary_table.setStyle(SUMMARY_TABLE_STYLE)
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.5 * inch))
+    elements.append(Paragraph("Authorized Pharmacist Signature", STYLES["Normal"]))
+    return elements
+
+
+def render_invoice_pdf(context: dict) -> bytes:
+    """Build the invoice PDF in memory. Runs inside a worker process."""
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=PAGE_SIZE).build(_invoice_elements(context))
+    return buffer.getvalue()
+
+
+def render_combined_pdf(contexts: list[dict]) -> bytes:
+    """One multi-page PDF with each invoice starting on a new page."""
+    elements: list = []
+    for index, context in enumerate(contexts):
+        if index:
+            elements.append(PageBreak())
+        elements.extend(_invoice_elements(context))
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=PAGE_SIZE).build(elements)
+    return buffer.getvalue()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_pool_workers)
+    return _pool
+
+
+def _get_render_slots() -> asyncio.Semaphore:
+    global _render_slots
+    if _render_slots is None:
+        _render_slots = asyncio.Semaphore(_render_concurrency)
+    return _render_slots
+
+
+def invoice_path(order_id: int) -> Path:
+    return INVOICES_DIR / f"invoice_{order_id}.pdf"
+
+
+def _write_file(order_id: int, pdf: bytes) -> str:
+    INVOICES_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = invoice_path(order_id)
+    tmp_path = file_path.with_suffix(".pdf.tmp")
+    tmp_path.write_bytes(pdf)
+    tmp_path.replace(file_path)
+    return str(file_path)
+
+
+async def save_invoice_pdf(order_id: int, pdf: bytes) -> str:
+    return await asyncio.to_thread(_write_file, order_id, pdf)
+
+
+def _remember(order_id: int, digest: str, pdf: bytes) -> None:
+    global _cache_bytes
+    previous = _cache.pop(order_id, None)
+    if previous is not None:
+        _cache_bytes -= len(previous[1])
+    if len(pdf) > _cache_max_bytes:
+        return
+    _cache[order_id] = (digest, pdf)
+    _cache_bytes += len(pdf)
+    while _cache_bytes > _cache_max_bytes:
+        _, (_, evicted) = _cache.popitem(last=False)
+        _cache_bytes -= len(evicted)
+
+
+async def _render(order_id: int, digest: str, context: dict) -> bytes:
+    async with _get_render_slots():
+        loop = asyncio.get_running_loop()
+        pdf = await loop.run_in_executor(_get_pool(), render_invoice_pdf, context)
+    _remember(order_id, digest, pdf)
+    if _write_to_disk:
+        await save_invoice_pdf(order_id, pdf)
+    return pdf
+
+
+async def get_invoice_pdf(order_id: int, context: dict) -> bytes:
+    """Return the invoice PDF bytes, rendering only when the content changed."""
+    digest = content_hash(context)
+    cached = _cache.get(order_id)
+    if cached and cached[0] == digest:
+        _cache.move_to_end(order_id)
+        return cached[1]
+
+    key = (order_id, digest)
+    pending = _in_flight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.ensure_future(_render(order_id, digest, context))
+    _in_flight[key] = future
+    future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(future)
+
+
+async def render_for_export(order_id: int, context: dict) -> bytes:
+    """
+    Like get_invoice_pdf, but never stores the result: a bulk export would
+    otherwise evict every hot invoice from the cache.
+    """
+    cached = _cache.get(order_id)
+    if cached and cached[0] == content_hash(context):
+        return cached[1]
+    async with _get_render_slots():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), render_invoice_pdf, context)
+
+
+async def render_combined(contexts: list[dict]) -> bytes:
+    async with _get_render_slots():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), render_combined_pdf, contexts)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -87,3 +87,37 @@ def update_fallback_order_status(order_id: int, status: str) -> bool:
         )
         conn.commit()
         return cursor.rowcount > 0
+
+
+def list_fallback_orders(
+    statuses: list[str] | None = None,
+    limit: int = 200,
+    newest_first: bool = True,
+    user_id: str | None = None,
+    after: tuple[str, int] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Keyset-paged listing ordered by (created_at, id). ``after`` is the
+    (created_at, id) of the last row of the previous page.
+    """
+    direction = "DESC" if newest_first else "ASC"
+    conditions: list[str] = []
+    params: list[Any] = []
+    if statuses:
+        conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if user_id is not None:
+        conditions.append("user_id = ?")
+        params.append(user_id)
+    if after is not None:
+        comparison = "<" if newest_first else ">"
+        conditions.append(f"(datetime(created_at), id) {comparison} (datetime(?), ?)")
+        params.extend(after)
+    query = "SELECT * FROM fallback_orders"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY datetime(created_at) {direction}, id {direction} LIMIT ?"
+    params.append(limit)
+    with _connect() as conn:
+        _init_table(conn)
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
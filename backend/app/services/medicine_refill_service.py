@@ -4,18 +4,19 @@ Manages creation, retrieval, and status updates for refill notifications
 """
 
 from datetime import datetime, timedelta
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.medicine_refill_notification import MedicineRefillNotification
-from typing import Optional, List
+from app.services import refill_scheduler
+from typing import Iterable, Optional, List
 
 
 class MedicineRefillService:
     """Service for managing medicine refill notifications"""
     
     @staticmethod
-    def create_refill_notification(
-        db: Session,
+    async def create_refill_notification(
+        db: AsyncSession,
         customer_id: str,
         medicine_name: str,
         dosage: Optional[str] = None,
@@ -23,89 +24,192 @@ class MedicineRefillService:
         refill_days: int = 7
     ) -> MedicineRefillNotification:
         """Create a new refill notification"""
-        refill_date = datetime.utcnow() + timedelta(days=refill_days)
-        
-        notification = MedicineRefillNotification(
-            customer_id=customer_id,
-            medicine_name=medicine_name,
-            dosage=dosage,
-            quantity=quantity,
-            refill_date=refill_date
+        notifications = await MedicineRefillService.create_refill_notifications(
+            db,
+            [
+                {
+                    "customer_id": customer_id,
+                    "medicine_name": medicine_name,
+                    "dosage": dosage,
+                    "quantity": quantity,
+                    "refill_days": refill_days,
+                }
+            ]
         )
-        db.add(notification)
-        db.commit()
-        db.refresh(notification)
-        return notification
+        return notifications[0]
     
     @staticmethod
-    def get_pending_notifications(
-        db: Session,
+    async def create_refill_notifications(
+        db: AsyncSession,
+        items: Iterable[dict]
+    ) -> List[MedicineRefillNotification]:
+        """
+        Create several reminders (create_refill_notification keyword dicts).
+        The live reminders they replace are deactivated with one UPDATE and
+        everything is committed once.
+        """
+        now = datetime.utcnow()
+        latest = {}
+        for item in items:
+            # A later entry for the same customer and medicine wins.
+            latest[(item["customer_id"], item["medicine_name"])] = item
+        if not latest:
+            return []
+
+        # Only one live reminder per customer and medicine; the new one replaces it.
+        await db.execute(
+            update(MedicineRefillNotification)
+            .where(
+                tuple_(MedicineRefillNotification.customer_id, MedicineRefillNotification.medicine_name).in_(list(latest)),
+                MedicineRefillNotification.is_active.is_(True)
+            )
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+        # The deactivation must reach the database before the inserts, or the
+        # partial unique index on live reminders rejects them.
+        await db.flush()
+
+        notifications = [
+            MedicineRefillNotification(
+                customer_id=item["customer_id"],
+                medicine_name=item["medicine_name"],
+                dosage=item.get("dosage"),
+                quantity=item.get("quantity", 0),
+                refill_date=now + timedelta(days=item.get("refill_days", 7))
+            )
+            for item in latest.values()
+        ]
+        db.add_all(notifications)
+        await db.commit()
+        for notification in notifications:
+            refill_scheduler.schedule(notification.id, notification.refill_date)
+        return notifications
+    
+    @staticmethod
+    async def get_pending_notifications(
+        db: AsyncSession,
         customer_id: str
     ) -> List[MedicineRefillNotification]:
         """Get pending notifications for a customer"""
-        return db.query(MedicineRefillNotification).filter(
-            MedicineRefillNotification.customer_id == customer_id,
-            MedicineRefillNotification.is_active == True,
-            MedicineRefillNotification.notification_sent == False,
-            MedicineRefillNotification.refill_date <= datetime.utcnow()
-        ).order_by(desc(MedicineRefillNotification.refill_date)).all()
+        result = await db.execute(
+            select(MedicineRefillNotification).where(
+                MedicineRefillNotification.customer_id == customer_id,
+                MedicineRefillNotification.is_active.is_(True),
+                MedicineRefillNotification.notification_sent.is_(False),
+                MedicineRefillNotification.refill_date <= datetime.utcnow()
+            ).order_by(desc(MedicineRefillNotification.refill_date))
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_upcoming_notifications(
-        db: Session,
+    async def get_upcoming_notifications(
+        db: AsyncSession,
         customer_id: str,
         days_ahead: int = 7
     ) -> List[MedicineRefillNotification]:
         """Get upcoming refill notifications (within days_ahead)"""
-        future_date = datetime.utcnow() + timedelta(days=days_ahead)
-        return db.query(MedicineRefillNotification).filter(
-            MedicineRefillNotification.customer_id == customer_id,
-            MedicineRefillNotification.is_active == True,
-            MedicineRefillNotification.refill_date <= future_date,
-            MedicineRefillNotification.refill_date >= datetime.utcnow()
-        ).order_by(MedicineRefillNotification.refill_date).all()
+        now = datetime.utcnow()
+        future_date = now + timedelta(days=days_ahead)
+        result = await db.execute(
+            select(MedicineRefillNotification).where(
+                MedicineRefillNotification.customer_id == customer_id,
+                MedicineRefillNotification.is_active.is_(True),
+                MedicineRefillNotification.refill_date <= future_date,
+                MedicineRefillNotification.refill_date >= now
+            ).order_by(MedicineRefillNotification.refill_date)
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def mark_notification_sent(
-        db: Session,
+    async def get_notification(
+        db: AsyncSession,
         notification_id: int
-    ) -> MedicineRefillNotification:
+    ) -> Optional[MedicineRefillNotification]:
+        return await db.get(MedicineRefillNotification, notification_id)
+    
+    @staticmethod
+    async def mark_notification_sent(
+        db: AsyncSession,
+        notification_id: int
+    ) -> Optional[MedicineRefillNotification]:
         """Mark notification as sent"""
-        notification = db.query(MedicineRefillNotification).filter(
-            MedicineRefillNotification.id == notification_id
-        ).first()
+        notification = await db.get(MedicineRefillNotification, notification_id)
         
         if notification:
             notification.notification_sent = True
             notification.notification_sent_date = datetime.utcnow()
-            db.commit()
-            db.refresh(notification)
+            await db.commit()
+            await db.refresh(notification)
         
         return notification
     
     @staticmethod
-    def deactivate_notification(
-        db: Session,
+    async def mark_notifications_sent(
+        db: AsyncSession,
+        notification_ids: List[int]
+    ) -> List[int]:
+        """Mark several notifications sent with one UPDATE; returns the ids that changed"""
+        if not notification_ids:
+            return []
+        result = await db.execute(
+            update(MedicineRefillNotification)
+            .where(
+                MedicineRefillNotification.id.in_(notification_ids),
+                MedicineRefillNotification.notification_sent.is_(False)
+            )
+            .values(notification_sent=True, notification_sent_date=datetime.utcnow())
+            .returning(MedicineRefillNotification.id)
+        )
+        marked = list(result.scalars().all())
+        await db.commit()
+        return marked
+    
+    @staticmethod
+    async def deactivate_notification(
+        db: AsyncSession,
         notification_id: int
-    ) -> MedicineRefillNotification:
+    ) -> Optional[MedicineRefillNotification]:
         """Deactivate a refill notification"""
-        notification = db.query(MedicineRefillNotification).filter(
-            MedicineRefillNotification.id == notification_id
-        ).first()
+        notification = await db.get(MedicineRefillNotification, notification_id)
         
         if notification:
             notification.is_active = False
-            db.commit()
-            db.refresh(notification)
+            await db.commit()
+            await db.refresh(notification)
         
         return notification
     
     @staticmethod
-    def get_all_notifications(
-        db: Session,
+    async def deactivate_notifications(
+        db: AsyncSession,
+        notification_ids: List[int]
+    ) -> List[int]:
+        """Deactivate several reminders with one UPDATE; returns the ids that changed"""
+        if not notification_ids:
+            return []
+        result = await db.execute(
+            update(MedicineRefillNotification)
+            .where(
+                MedicineRefillNotification.id.in_(notification_ids),
+                MedicineRefillNotification.is_active.is_(True)
+            )
+            .values(is_active=False, updated_at=datetime.utcnow())
+            .returning(MedicineRefillNotification.id)
+        )
+        deactivated = list(result.scalars().all())
+        await db.commit()
+        return deactivated
+    
+    @staticmethod
+    async def get_all_notifications(
+        db: AsyncSession,
         customer_id: str
     ) -> List[MedicineRefillNotification]:
         """Get all notifications for customer"""
-        return db.query(MedicineRefillNotification).filter(
-            MedicineRefillNotification.customer_id == customer_id
-        ).order_by(desc(MedicineRefillNotification.created_at)).all()
+        result = await db.execute(
+            select(MedicineRefillNotification).where(
+                MedicineRefillNotification.customer_id == customer_id
+            ).order_by(desc(MedicineRefillNotification.created_at))
+        )
+        return list(result.scalars().all())
@@ -1,11 +1,12 @@
 """
 Notification Service - Business logic for stock refill notifications
 """
-from typing import Optional, List
-from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from typing import Optional, List, Dict, Iterable
+from datetime import datetime, timezone
+from sqlalchemy import desc, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services import active_alerts
 from app.models.notification import (
     StockAlert, 
     NotificationSubscription, 
@@ -14,12 +15,42 @@ from app.models.notification import (
 )
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _stock_alert(
+    medicine_id: int,
+    medicine_name: str,
+    current_stock: int,
+    total_stock: int,
+    alert_level: str,
+    refill_quantity: Optional[int] = None
+) -> StockAlert:
+    return StockAlert(
+        medicine_id=medicine_id,
+        medicine_name=medicine_name,
+        current_stock=current_stock,
+        total_stock=total_stock,
+        stock_percentage=(current_stock / total_stock) * 100,
+        alert_level=alert_level,
+        severity="critical" if alert_level == "critical" else "warning",
+        needs_refill=True,
+        refill_quantity=refill_quantity or int(total_stock * 0.5)
+    )
+
+
 class NotificationService:
-    """Service for managing notifications"""
+    """
+    Service for managing notifications.
+
+    Every method takes the request's AsyncSession and commits at most once;
+    the *_many / batch variants load or write all rows in a single statement.
+    """
     
     @staticmethod
-    def create_stock_alert(
-        db: Session,
+    async def create_stock_alert(
+        db: AsyncSession,
         medicine_id: int,
         medicine_name: str,
         current_stock: int,
@@ -28,62 +59,77 @@ class NotificationService:
         refill_quantity: Optional[int] = None
     ) -> StockAlert:
         """Create a stock alert"""
-        stock_percentage = (current_stock / total_stock) * 100
-        
-        alert = StockAlert(
-            medicine_id=medicine_id,
-            medicine_name=medicine_name,
-            current_stock=current_stock,
-            total_stock=total_stock,
-            stock_percentage=stock_percentage,
-            alert_level=alert_level,
-            severity="critical" if alert_level == "critical" else "warning",
-            needs_refill=True,
-            refill_quantity=refill_quantity or int(total_stock * 0.5)
-        )
+        alert = _stock_alert(medicine_id, medicine_name, current_stock, total_stock, alert_level, refill_quantity)
         db.add(alert)
-        db.commit()
-        db.refresh(alert)
+        await db.commit()
+        await db.refresh(alert)
+        active_alerts.upsert([alert])
         return alert
     
     @staticmethod
-    def get_active_alerts(db: Session) -> List[StockAlert]:
+    async def create_stock_alerts(db: AsyncSession, alerts: Iterable[dict]) -> List[StockAlert]:
+        """Create several stock alerts (create_stock_alert keyword dicts) in one commit"""
+        rows = [_stock_alert(**alert) for alert in alerts]
+        if not rows:
+            return []
+        db.add_all(rows)
+        await db.commit()
+        active_alerts.upsert(rows)
+        return rows
+    
+    @staticmethod
+    async def get_active_alerts(db: AsyncSession) -> List[StockAlert]:
         """Get all active stock alerts"""
-        return db.query(StockAlert)\
-            .filter(and_(
-                StockAlert.is_active == True,
-                StockAlert.is_resolved == False
-            ))\
-            .order_by(desc(StockAlert.created_at))\
-            .all()
+        result = await db.execute(
+            select(StockAlert)
+            .where(StockAlert.is_active.is_(True), StockAlert.is_resolved.is_(False))
+            .order_by(desc(StockAlert.created_at))
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_alerts_by_medicine(db: Session, medicine_id: int) -> List[StockAlert]:
+    async def get_alerts_by_medicine(db: AsyncSession, medicine_id: int) -> List[StockAlert]:
         """Get alerts for a specific medicine"""
-        return db.query(StockAlert)\
-            .filter(StockAlert.medicine_id == medicine_id)\
-            .order_by(desc(StockAlert.created_at))\
-            .all()
+        result = await db.execute(
+            select(StockAlert)
+            .where(StockAlert.medicine_id == medicine_id)
+            .order_by(desc(StockAlert.created_at))
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def resolve_alert(db: Session, alert_id: int) -> StockAlert:
+    async def resolve_alert(db: AsyncSession, alert_id: int) -> StockAlert:
         """Resolve a stock alert"""
-        alert = db.query(StockAlert).filter(StockAlert.id == alert_id).first()
+        alert = await db.get(StockAlert, alert_id)
         if not alert:
             raise ValueError(f"Alert not found: {alert_id}")
         
         alert.is_resolved = True
         alert.is_active = False
-        alert.resolved_at = datetime.utcnow()
+        alert.resolved_at = _utcnow()
         
-        db.add(alert)
-        db.commit()
-        db.refresh(alert)
+        await db.commit()
+        await db.refresh(alert)
+        active_alerts.resolve_alerts([alert.id])
         return alert
     
     @staticmethod
-    def subscribe_to_alerts(
-        db: Session,
+    async def resolve_alerts(db: AsyncSession, alert_ids: List[int]) -> int:
+        """Resolve several stock alerts with one UPDATE; returns how many changed"""
+        if not alert_ids:
+            return 0
+        result = await db.execute(
+            update(StockAlert)
+            .where(StockAlert.id.in_(alert_ids), StockAlert.is_resolved.is_(False))
+            .values(is_resolved=True, is_active=False, resolved_at=func.now())
+        )
+        await db.commit()
+        active_alerts.resolve_alerts(alert_ids)
+        return result.rowcount
+    
+    @staticmethod
+    async def subscribe_to_alerts(
+        db: AsyncSession,
         customer_id: str,
         medicine_id: int,
         medicine_name: str,
@@ -92,77 +138,115 @@ class NotificationService:
         alert_type: str = "both"
     ) -> NotificationSubscription:
         """Subscribe customer to medicine stock alerts"""
-        
-        # Check if subscription already exists
-        existing = db.query(NotificationSubscription).filter(and_(
-            NotificationSubscription.customer_id == customer_id,
-            NotificationSubscription.medicine_id == medicine_id
-        )).first()
-        
-        if existing:
-            # Update existing subscription
-            existing.alert_type = alert_type
-            existing.is_active = True
-            existing.updated_at = datetime.utcnow()
-            db.add(existing)
-            db.commit()
-            db.refresh(existing)
-            return existing
-        
-        subscription = NotificationSubscription(
-            customer_id=customer_id,
-            medicine_id=medicine_id,
-            medicine_name=medicine_name,
+        subscriptions = await NotificationService.subscribe_to_many(
+            db,
+            customer_id,
+            {medicine_id: medicine_name},
             customer_phone=customer_phone,
             customer_email=customer_email,
             alert_type=alert_type
         )
-        db.add(subscription)
-        db.commit()
-        db.refresh(subscription)
-        return subscription
+        return subscriptions[0]
     
     @staticmethod
-    def get_subscriptions_by_customer(db: Session, customer_id: str) -> List[NotificationSubscription]:
+    async def subscribe_to_many(
+        db: AsyncSession,
+        customer_id: str,
+        medicines: Dict[int, str],
+        customer_phone: Optional[str] = None,
+        customer_email: Optional[str] = None,
+        alert_type: str = "both"
+    ) -> List[NotificationSubscription]:
+        """
+        Subscribe a customer to several medicines ({medicine_id: name}).
+        Existing subscriptions are loaded in one query and re-activated;
+        everything is committed once.
+        """
+        result = await db.execute(
+            select(NotificationSubscription).where(
+                NotificationSubscription.customer_id == customer_id,
+                NotificationSubscription.medicine_id.in_(list(medicines))
+            )
+        )
+        existing = {subscription.medicine_id: subscription for subscription in result.scalars().all()}
+        
+        subscriptions = []
+        now = _utcnow()
+        for medicine_id, medicine_name in medicines.items():
+            subscription = existing.get(medicine_id)
+            if subscription:
+                subscription.alert_type = alert_type
+                subscription.is_active = True
+                subscription.updated_at = now
+            else:
+                subscription = NotificationSubscription(
+                    customer_id=customer_id,
+                    medicine_id=medicine_id,
+                    medicine_name=medicine_name,
+                    customer_phone=customer_phone,
+                    customer_email=customer_email,
+                    alert_type=alert_type
+                )
+                db.add(subscription)
+            subscriptions.append(subscription)
+        
+        await db.commit()
+        return subscriptions
+    
+    @staticmethod
+    async def get_subscriptions_by_customer(db: AsyncSession, customer_id: str) -> List[NotificationSubscription]:
         """Get all subscriptions for a customer"""
-        return db.query(NotificationSubscription)\
-            .filter(and_(
+        result = await db.execute(
+            select(NotificationSubscription).where(
                 NotificationSubscription.customer_id == customer_id,
-                NotificationSubscription.is_active == True
-            ))\
-            .all()
+                NotificationSubscription.is_active.is_(True)
+            )
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_subscriptions_by_medicine(db: Session, medicine_id: int) -> List[NotificationSubscription]:
+    async def get_subscriptions_by_medicine(db: AsyncSession, medicine_id: int) -> List[NotificationSubscription]:
         """Get all subscriptions for a medicine"""
-        return db.query(NotificationSubscription)\
-            .filter(and_(
-                NotificationSubscription.medicine_id == medicine_id,
-                NotificationSubscription.is_active == True
-            ))\
-            .all()
+        by_medicine = await NotificationService.get_subscriptions_by_medicines(db, [medicine_id])
+        return by_medicine.get(medicine_id, [])
+    
+    @staticmethod
+    async def get_subscriptions_by_medicines(
+        db: AsyncSession,
+        medicine_ids: Iterable[int]
+    ) -> Dict[int, List[NotificationSubscription]]:
+        """Active subscriptions for several medicines in one query, grouped by medicine_id"""
+        result = await db.execute(
+            select(NotificationSubscription)
+            .where(
+                NotificationSubscription.medicine_id.in_(list(medicine_ids)),
+                NotificationSubscription.is_active.is_(True)
+            )
+            .order_by(NotificationSubscription.medicine_id, NotificationSubscription.id)
+        )
+        grouped: Dict[int, List[NotificationSubscription]] = {}
+        for subscription in result.scalars().all():
+            grouped.setdefault(subscription.medicine_id, []).append(subscription)
+        return grouped
     
     @staticmethod
-    def unsubscribe(db: Session, subscription_id: int) -> NotificationSubscription:
+    async def unsubscribe(db: AsyncSession, subscription_id: int) -> NotificationSubscription:
         """Unsubscribe from alerts"""
-        subscription = db.query(NotificationSubscription)\
-            .filter(NotificationSubscription.id == subscription_id)\
-            .first()
+        subscription = await db.get(NotificationSubscription, subscription_id)
         
         if not subscription:
             raise ValueError(f"Subscription not found: {subscription_id}")
         
         subscription.is_active = False
-        subscription.updated_at = datetime.utcnow()
+        subscription.updated_at = _utcnow()
         
-        db.add(subscription)
-        db.commit()
-        db.refresh(subscription)
+        await db.commit()
+        await db.refresh(subscription)
         return subscription
     
     @staticmethod
-    def create_notification_log(
-        db: Session,
+    async def create_notification_log(
+        db: AsyncSession,
         customer_id: str,
         medicine_id: int,
         medicine_name: str,
@@ -187,28 +271,36 @@ class NotificationService:
             delivery_status="pending"
         )
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.commit()
+        await db.refresh(log)
         return log
     
     @staticmethod
-    def mark_notification_sent(
-        db: Session,
+    async def create_notification_logs(db: AsyncSession, entries: Iterable[dict]) -> List[NotificationLog]:
+        """Create several log entries (create_notification_log keyword dicts) in one commit"""
+        logs = [NotificationLog(delivery_status="pending", **entry) for entry in entries]
+        if not logs:
+            return []
+        db.add_all(logs)
+        await db.commit()
+        return logs
+    
+    @staticmethod
+    async def mark_notification_sent(
+        db: AsyncSession,
         notification_id: int,
         n8n_workflow_id: Optional[str] = None,
         n8n_execution_id: Optional[str] = None,
         n8n_status: str = "success"
     ) -> NotificationLog:
         """Mark notification as sent"""
-        notification = db.query(NotificationLog)\
-            .filter(NotificationLog.id == notification_id)\
-            .first()
+        notification = await db.get(NotificationLog, notification_id)
         
         if not notification:
             raise ValueError(f"Notification not found: {notification_id}")
         
         notification.is_sent = True
-        notification.sent_at = datetime.utcnow()
+        notification.sent_at = _utcnow()
         notification.delivery_status = "sent" if n8n_status == "success" else "failed"
         if n8n_workflow_id:
             notification.n8n_workflow_id = n8n_workflow_id
@@ -217,39 +309,139 @@ class NotificationService:
         if n8n_status:
             notification.n8n_status = n8n_status
         
-        db.add(notification)
-        db.commit()
-        db.refresh(notification)
+        await db.commit()
+        await db.refresh(notification)
         return notification
     
     @staticmethod
-    def get_pending_notifications(db: Session) -> List[NotificationLog]:
+    async def mark_notifications_sent(
+        db: AsyncSession,
+        notification_ids: List[int],
+        n8n_workflow_id: Optional[str] = None,
+        n8n_status: str = "success"
+    ) -> int:
+        """Mark several notifications sent with one UPDATE; returns how many changed"""
+        if not notification_ids:
+            return 0
+        values = {
+            "is_sent": True,
+            "sent_at": func.now(),
+            "delivery_status": "sent" if n8n_status == "success" else "failed",
+            "n8n_status": n8n_status,
+        }
+        if n8n_workflow_id:
+            values["n8n_workflow_id"] = n8n_workflow_id
+        result = await db.execute(
+            update(NotificationLog)
+            .where(NotificationLog.id.in_(notification_ids))
+            .values(**values)
+        )
+        await db.commit()
+        return result.rowcount
+    
+    @staticmethod
+    async def apply_n8n_acks(db: AsyncSession, acks: List[dict]) -> List[int]:
+        """
+        Apply n8n delivery acknowledgements ({"notification_id", "status",
+        "n8n_workflow_id", "n8n_execution_id"}) with one UPDATE ... FROM
+        (VALUES ...). An ack whose execution id is already recorded on the
+        row is a replay and changes nothing. Returns the ids that changed.
+        """
+        # One row per notification (the last ack wins): UPDATE ... FROM
+        # would otherwise pick an arbitrary match.
+        latest = {int(ack["notification_id"]): ack for ack in acks}
+        if not latest:
+            return []
+
+        rows, params = [], {}
+        for i, (notification_id, ack) in enumerate(latest.items()):
+            rows.append(
+                f"(CAST(:id_{i} AS INTEGER), CAST(:status_{i} AS VARCHAR), "
+                f"CAST(:workflow_{i} AS VARCHAR), CAST(:execution_{i} AS VARCHAR))"
+            )
+            params[f"id_{i}"] = notification_id
+            params[f"status_{i}"] = ack.get("status") or "success"
+            params[f"workflow_{i}"] = ack.get("n8n_workflow_id")
+            params[f"execution_{i}"] = ack.get("n8n_execution_id")
+
+        result = await db.execute(
+            text(
+                f"""
+                WITH a(id, status, workflow_id, execution_id) AS (
+                    VALUES {", ".join(rows)}
+                )
+                UPDATE notification_logs
+                SET is_sent = TRUE,
+                    sent_at = COALESCE(notification_logs.sent_at, CURRENT_TIMESTAMP),
+                    delivery_status = CASE WHEN a.status = 'success' THEN 'sent' ELSE 'failed' END,
+                    n8n_status = a.status,
+                    n8n_workflow_id = COALESCE(a.workflow_id, notification_logs.n8n_workflow_id),
+                    n8n_execution_id = COALESCE(a.execution_id, notification_logs.n8n_execution_id),
+                    updated_at = CURRENT_TIMESTAMP
+                FROM a
+                WHERE notification_logs.id = a.id
+                  AND (
+                      a.execution_id IS NULL
+                      OR notification_logs.n8n_execution_id IS DISTINCT FROM a.execution_id
+                  )
+                RETURNING notification_logs.id
+                """
+            ),
+            params,
+        )
+        updated = list(result.scalars().all())
+        await db.commit()
+        return updated
+    
+    @staticmethod
+    async def get_pending_notifications(db: AsyncSession) -> List[NotificationLog]:
         """Get all pending notifications"""
-        return db.query(NotificationLog)\
-            .filter(NotificationLog.is_sent == False)\
-            .order_by(NotificationLog.created_at)\
-            .all()
+        result = await db.execute(
+            select(NotificationLog)
+            .where(NotificationLog.is_sent.is_(False))
+            .order_by(NotificationLog.created_at)
+        )
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_notification_history(
-        db: Session,
+    async def get_statistics(db: AsyncSession) -> Dict[str, int]:
+        """Pending notification and active alert counts in one round trip"""
+        pending = (
+            select(func.count())
+            .select_from(NotificationLog)
+            .where(NotificationLog.is_sent.is_(False))
+            .scalar_subquery()
+        )
+        active_count = (
+            select(func.count())
+            .select_from(StockAlert)
+            .where(StockAlert.is_active.is_(True), StockAlert.is_resolved.is_(False))
+            .scalar_subquery()
+        )
+        row = (await db.execute(select(pending, active_count))).one()
+        return {"pending_notifications": row[0], "active_stock_alerts": row[1]}
+    
+    @staticmethod
+    async def get_notification_history(
+        db: AsyncSession,
         customer_id: Optional[str] = None,
         medicine_id: Optional[int] = None,
         limit: int = 50
     ) -> List[NotificationLog]:
         """Get notification history"""
-        query = db.query(NotificationLog)
+        query = select(NotificationLog)
         
         if customer_id:
-            query = query.filter(NotificationLog.customer_id == customer_id)
+            query = query.where(NotificationLog.customer_id == customer_id)
         if medicine_id:
-            query = query.filter(NotificationLog.medicine_id == medicine_id)
+            query = query.where(NotificationLog.medicine_id == medicine_id)
         
-        return query.order_by(desc(NotificationLog.created_at)).limit(limit).all()
+        result = await db.execute(query.order_by(desc(NotificationLog.created_at)).limit(limit))
+        return list(result.scalars().all())
     
     @staticmethod
-    def get_or_create_template(
-        db: Session,
+    async def get_or_create_template(
+        db: AsyncSession,
         name: str,
         notification_type: str,
         sms_template: Optional[str] = None,
@@ -257,9 +449,7 @@ class NotificationService:
         email_template: Optional[str] = None
     ) -> NotificationTemplate:
         """Get or create a notification template"""
-        template = db.query(NotificationTemplate)\
-            .filter(NotificationTemplate.name == name)\
-            .first()
+        template = await NotificationService.get_template_by_name(db, name)
         
         if template:
             return template
@@ -272,16 +462,17 @@ class NotificationService:
             email_template=email_template
         )
         db.add(template)
-        db.commit()
-        db.refresh(template)
+        await db.commit()
+        await db.refresh(template)
         return template
     
     @staticmethod
-    def get_template_by_name(db: Session, name: str) -> Optional[NotificationTemplate]:
+    async def get_template_by_name(db: AsyncSession, name: str) -> Optional[NotificationTemplate]:
         """Get a notification template by name"""
-        return db.query(NotificationTemplate)\
-            .filter(NotificationTemplate.name == name)\
-            .first()
+        result = await db.execute(
+            select(NotificationTemplate).where(NotificationTemplate.name == name)
+        )
+        return result.scalars().first()
 
 
 # Default notification templates
@@ -0,0 +1,176 @@
+"""
+In-memory registry of compiled notification templates.
+
+Every channel of a template (sms, email subject/body, push title/body) is
+parsed once into a render function, so rendering a message is a dict
+lookup plus one C-level %-format instead of str.format re-parsing the
+template. The registry starts from DEFAULT_TEMPLATES; active rows in
+notification_templates override them by name. ORM writes to that table in
+this process mark the registry stale; writes from elsewhere are picked up
+by the periodic refresh in ensure_fresh().
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from operator import itemgetter
+from string import Formatter
+from typing import Callable, Iterable, Mapping, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.notification import NotificationTemplate
+from app.services.notification_service import DEFAULT_TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("sms_template", "email_subject", "email_template", "push_title", "push_body")
+REFRESH_SECONDS = 300.0
+
+Renderer = Callable[[Mapping], str]
+
+
+def compile_template(source: str) -> Renderer:
+    """
+    Turn a str.format template into a render function taking a mapping.
+    Same output as ``source.format_map(values)``, including KeyError for a
+    missing field.
+    """
+    literals, fields = [], []
+    for literal, field_name, spec, conversion in Formatter().parse(source):
+        literals.append(literal.replace("%", "%%"))
+        if field_name is None:
+            continue
+        if spec or conversion or not field_name.isidentifier():
+            # Rare in practice; keep exact str.format semantics for these.
+            return source.format_map
+        literals.append("%s")
+        fields.append(field_name)
+
+    pattern = "".join(literals)
+    if not fields:
+        constant = pattern.replace("%%", "%")
+        return lambda values: constant
+    if len(fields) == 1:
+        only = fields[0]
+        return lambda values: pattern % (values[only],)
+    getter = itemgetter(*fields)
+    return lambda values: pattern % getter(values)
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    name: str
+    notification_type: str
+    description: Optional[str] = None
+    renderers: dict[str, Renderer] = field(default_factory=dict)
+
+    def render(self, channel: str, values: Mapping) -> str:
+        renderer = self.renderers.get(channel)
+        if renderer is None:
+            raise KeyError(f"Template {self.name!r} has no {channel}")
+        return renderer(values)
+
+    def render_many(self, channel: str, rows: Iterable[Mapping]) -> list[str]:
+        renderer = self.renderers.get(channel)
+        if renderer is None:
+            raise KeyError(f"Template {self.name!r} has no {channel}")
+        return [renderer(values) for values in rows]
+
+
+def _compile(source: Mapping) -> CompiledTemplate:
+    return CompiledTemplate(
+        name=source["name"],
+        notification_type=source["notification_type"],
+        description=source.get("description"),
+        renderers={channel: compile_template(source[channel]) for channel in CHANNELS if source.get(channel)},
+    )
+
+
+_DEFAULTS: dict[str, CompiledTemplate] = {name: _compile(source) for name, source in DEFAULT_TEMPLATES.items()}
+_registry: dict[str, CompiledTemplate] = dict(_DEFAULTS)
+_stale = True
+_loaded_at = 0.0
+_lock = asyncio.Lock()
+
+
+def get(name: str) -> CompiledTemplate:
+    """Compiled template by name; never touches the database."""
+    return _registry[name]
+
+
+def all_templates() -> dict[str, CompiledTemplate]:
+    return dict(_registry)
+
+
+def render(name: str, channel: str, values: Mapping) -> str:
+    return _registry[name].render(channel, values)
+
+
+def render_or_default(name: str, channel: str, values: Mapping) -> str:
+    """
+    Like render(), but falls back to the built-in template when an override
+    from the database cannot render these values (missing channel, unknown
+    placeholder).
+    """
+    try:
+        return render(name, channel, values)
+    except (KeyError, IndexError, ValueError) as exc:
+        default = _DEFAULTS.get(name)
+        if default is None or _registry.get(name) is default:
+            raise
+        logger.warning("Notification template %r failed to render %s, using the default: %s", name, channel, exc)
+        return default.render(channel, values)
+
+
+def invalidate() -> None:
+    global _stale
+    _stale = True
+
+
+async def load(session: AsyncSession) -> int:
+    """Rebuild the registry from DEFAULT_TEMPLATES plus the active rows."""
+    global _registry, _stale, _loaded_at
+    result = await session.execute(select(NotificationTemplate).where(NotificationTemplate.is_active.is_(True)))
+    registry = dict(_DEFAULTS)
+    for row in result.scalars().all():
+        try:
+            registry[row.name] = _compile(
+                {
+                    "name": row.name,
+                    "notification_type": row.notification_type,
+                    "description": row.description,
+                    **{channel: getattr(row, channel) for channel in CHANNELS},
+                }
+            )
+        except ValueError as exc:
+            # A malformed row must not take the built-in templates down with it.
+            logger.warning("Skipping notification template %r: %s", row.name, exc)
+    # Swap in one assignment so concurrent renders see the old or the new set.
+    _registry = registry
+    _stale = False
+    _loaded_at = time.monotonic()
+    return len(registry)
+
+
+async def ensure_fresh(session: AsyncSession, max_age: float = REFRESH_SECONDS) -> None:
+    """Reload if a template changed here or the last load is older than max_age."""
+    if not _stale and time.monotonic() - _loaded_at < max_age:
+        return
+    async with _lock:
+        if _stale or time.monotonic() - _loaded_at >= max_age:
+            try:
+                await load(session)
+            except Exception as exc:
+                # Keep serving the last good registry while the DB is unreachable.
+                await session.rollback()
+                logger.warning("Notification template reload failed: %s", exc)
+
+
+@event.listens_for(NotificationTemplate, "after_insert")
+@event.listens_for(NotificationTemplate, "after_update")
+@event.listens_for(NotificationTemplate, "after_delete")
+def _template_changed(mapper, connection, target) -> None:
+    invalidate()
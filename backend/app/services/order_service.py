@@ -1,6 +1,11 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.order import Order
+from app.services import analytics_cache
+
+# Orders in these states have already been paid for (or never will be).
+SETTLED_STATUSES = ["paid", "shipped", "delivered", "cancelled", "rejected"]
 
 
 class OrderService:
@@ -10,9 +15,19 @@ class OrderService:
         order = Order(**order_data)
         session.add(order)
         await session.commit()
+        analytics_cache.bump_order_version()
         await session.refresh(order)
         return order
 
+    @staticmethod
+    async def create_orders(session: AsyncSession, orders_data: list[dict]) -> list[Order]:
+        """Insert several orders (one checkout session) in a single commit."""
+        orders = [Order(**order_data) for order_data in orders_data]
+        session.add_all(orders)
+        await session.commit()
+        analytics_cache.bump_order_version()
+        return orders
+
     @staticmethod
     async def update_order_status(session: AsyncSession, order_id: int, status: str):
         result = await session.execute(
@@ -25,9 +40,148 @@ class OrderService:
 
         order.status = status
         await session.commit()
+        analytics_cache.bump_order_version()
         await session.refresh(order)
         return order
 
+    @staticmethod
+    async def bulk_update_status(
+        session: AsyncSession,
+        order_ids: list[int],
+        status: str,
+        from_statuses: list[str],
+    ) -> list[dict]:
+        """
+        Move every order in ``order_ids`` whose current status is one of
+        ``from_statuses`` to ``status`` in a single statement. Returns the
+        updated rows; ids that are missing or not in a valid source status
+        are left untouched.
+        """
+        result = await session.execute(
+            text(
+                """
+                UPDATE orders
+                SET status = :status, updated_at = NOW()
+                WHERE id = ANY(:order_ids) AND status = ANY(:from_statuses)
+                RETURNING id, user_id, medicine_id, quantity, total_amount, status
+                """
+            ),
+            {"status": status, "order_ids": order_ids, "from_statuses": from_statuses},
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+        await session.commit()
+        if rows:
+            analytics_cache.bump_order_version()
+        return rows
+
+    @staticmethod
+    async def settle_orders(session: AsyncSession, order_ids: list[int]) -> dict:
+        """
+        Mark a checkout session's orders paid and take their stock in one
+        statement. Orders with a live stock hold convert it; for the rest,
+        stock is only decremented where enough is left. If any medicine
+        falls short the whole settlement is rolled back.
+
+        Returns {"settled": [...rows], "out_of_stock": [medicine ids]}; ids
+        that are missing or already settled do not appear in "settled".
+        """
+        result = await session.execute(
+            text(
+                """
+                WITH target AS (
+                    SELECT id, medicine_id, quantity
+                    FROM orders
+                    WHERE id = ANY(:order_ids) AND status <> ALL(:settled_statuses)
+                    FOR UPDATE
+                ),
+                held AS (
+                    SELECT id, order_id
+                    FROM stock_reservations
+                    WHERE order_id IN (SELECT id FROM target) AND status = 'held'
+                    FOR UPDATE
+                ),
+                converted AS (
+                    UPDATE stock_reservations r
+                    SET status = 'converted', updated_at = NOW()
+                    FROM held h
+                    WHERE r.id = h.id
+                    RETURNING r.order_id
+                ),
+                demand AS (
+                    SELECT t.medicine_id, SUM(t.quantity) AS quantity
+                    FROM target t
+                    JOIN medicines m ON m.id = t.medicine_id
+                    WHERE t.id NOT IN (SELECT order_id FROM held)
+                    GROUP BY t.medicine_id
+                ),
+                stock_taken AS (
+                    UPDATE medicines m
+                    SET stock = m.stock - d.quantity
+                    FROM demand d
+                    WHERE m.id = d.medicine_id AND m.stock >= d.quantity
+                    RETURNING m.id, m.stock
+                ),
+                paid AS (
+                    UPDATE orders o
+                    SET status = 'paid', updated_at = NOW()
+                    FROM target t
+                    WHERE o.id = t.id
+                      AND NOT EXISTS (
+                          SELECT 1 FROM demand d
+                          WHERE d.medicine_id NOT IN (SELECT id FROM stock_taken)
+                      )
+                    RETURNING o.id, o.user_id, o.medicine_id, o.quantity, o.total_amount, o.status
+                )
+                SELECT
+                    t.id AS order_id,
+                    t.medicine_id,
+                    p.id IS NOT NULL AS settled,
+                    p.user_id,
+                    p.quantity,
+                    p.total_amount,
+                    s.stock AS remaining_stock,
+                    (t.medicine_id IN (SELECT medicine_id FROM demand) AND s.id IS NULL) AS out_of_stock
+                FROM target t
+                LEFT JOIN paid p ON p.id = t.id
+                LEFT JOIN stock_taken s ON s.id = t.medicine_id
+                ORDER BY t.id
+                """
+            ),
+            {"order_ids": order_ids, "settled_statuses": SETTLED_STATUSES},
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+        out_of_stock = sorted({row["medicine_id"] for row in rows if row["out_of_stock"]})
+        if out_of_stock:
+            # Some medicines were already decremented by the same statement.
+            await session.rollback()
+            return {"settled": [], "out_of_stock": out_of_stock}
+
+        await session.commit()
+        if any(row["settled"] for row in rows):
+            analytics_cache.bump_order_version()
+        return {
+            "settled": [
+                {
+                    "id": row["order_id"],
+                    "user_id": row["user_id"],
+                    "medicine_id": row["medicine_id"],
+                    "quantity": row["quantity"],
+                    "total_amount": row["total_amount"],
+                    "remaining_stock": row["remaining_stock"],
+                }
+                for row in rows
+                if row["settled"]
+            ],
+            "out_of_stock": [],
+        }
+
+    @staticmethod
+    async def get_statuses(session: AsyncSession, order_ids: list[int]) -> dict[int, str]:
+        result = await session.execute(
+            select(Order.id, Order.status).where(Order.id.in_(order_ids))
+        )
+        return {order_id: status for order_id, status in result.all()}
+
     @staticmethod
     async def get_order(session: AsyncSession, order_id: int):
         result = await session.execute(
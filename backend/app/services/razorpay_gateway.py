@@ -0,0 +1,76 @@
+"""
+Razorpay calls without blocking the event loop.
+
+The Razorpay SDK is synchronous (requests under the hood), so every call runs
+on a small dedicated thread pool. Razorpay orders created for an app order
+are reused for the same amount: a retried "create payment" returns the order
+the customer may already have opened instead of minting a new one.
+"""
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import razorpay
+
+from app.core.config import settings
+from app.services.idempotency import IdempotencyStore
+
+client = razorpay.Client(
+    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.RAZORPAY_MAX_WORKERS),
+    thread_name_prefix="razorpay",
+)
+_orders = IdempotencyStore()
+# razorpay order id -> reuse key, so a verified payment can retire its order
+_reuse_keys: OrderedDict[str, str] = OrderedDict()
+
+
+async def _call(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def create_order(amount_paise: int, receipt: str, app_order_id: int | None = None) -> dict:
+    """Create a Razorpay order, reusing the one already made for (app order, amount)."""
+    payload = {"amount": amount_paise, "currency": "INR", "receipt": receipt}
+    if app_order_id is None:
+        return await _call(client.order.create, payload)
+
+    key = f"{app_order_id}:{amount_paise}"
+
+    async def create() -> dict:
+        razorpay_order = await _call(client.order.create, payload)
+        _reuse_keys[razorpay_order["id"]] = key
+        while len(_reuse_keys) > _orders.max_entries:
+            _reuse_keys.popitem(last=False)
+        return razorpay_order
+
+    razorpay_order, _ = await _orders.run(key, key, settings.RAZORPAY_ORDER_REUSE_SECONDS, create)
+    return razorpay_order
+
+
+def forget_order(razorpay_order_id: str) -> None:
+    """Stop reusing a Razorpay order once it has been paid."""
+    key = _reuse_keys.pop(razorpay_order_id, None)
+    if key is not None:
+        _orders.forget(key)
+
+
+async def verify_payment_signature(razorpay_order_id: str, razorpay_payment_id: str, razorpay_signature: str) -> None:
+    """Raises razorpay.errors.SignatureVerificationError on a bad signature."""
+    await _call(
+        client.utility.verify_payment_signature,
+        {
+            "razorpay_order_id": razorpay_order_id,
+            "razorpay_payment_id": razorpay_payment_id,
+            "razorpay_signature": razorpay_signature,
+        },
+    )
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,112 @@
+"""
+Bulk refill-date prediction from customer_history.
+
+For each (customer, medicine) the latest purchase runs out after
+quantity / doses-per-day days. New purchases are read incrementally (rows
+with an id above the newest source_history_id already turned into a
+reminder) and every resulting reminder is upserted in one statement.
+
+Run by hand (from backend/):
+    python -m app.services.refill_prediction
+"""
+
+import asyncio
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.services import refill_scheduler
+
+HISTORY_COLUMNS = ["id", "customer_id", "medicine_name", "quantity", "purchase_date", "dosage_frequency"]
+
+
+def predict_refill_dates(history: pd.DataFrame) -> pd.DataFrame:
+    """Latest purchase per (customer, medicine) with its run-out date."""
+    history = history.dropna(subset=["customer_id", "medicine_name", "purchase_date"])
+    history = history[(history["quantity"] > 0) & (history["dosage_frequency"] > 0)]
+    if history.empty:
+        return history.assign(refill_date=pd.Series(dtype="datetime64[ns]"))
+
+    latest = (
+        history.sort_values(["purchase_date", "id"])
+        .drop_duplicates(["customer_id", "medicine_name"], keep="last")
+        .copy()
+    )
+    supply_days = latest["quantity"].astype(int) // latest["dosage_frequency"].astype(int)
+    latest["refill_date"] = pd.to_datetime(latest["purchase_date"]) + pd.to_timedelta(supply_days, unit="D")
+    return latest
+
+
+async def run_refill_prediction(session: AsyncSession) -> int:
+    """Predict reminders for purchases not seen yet. Returns the number upserted."""
+    result = await session.execute(
+        text(
+            """
+            SELECT id, customer_id, medicine_name, quantity, purchase_date, dosage_frequency
+            FROM customer_history
+            WHERE id > (
+                SELECT COALESCE(MAX(source_history_id), 0)
+                FROM medicine_refill_notifications
+            )
+            """
+        )
+    )
+    history = pd.DataFrame(result.all(), columns=HISTORY_COLUMNS)
+    predicted = predict_refill_dates(history)
+    if predicted.empty:
+        return 0
+
+    # An older purchase never overrides a reminder built from a newer one.
+    await session.execute(
+        text(
+            """
+            INSERT INTO medicine_refill_notifications (
+                customer_id, medicine_name, dosage, quantity, refill_date,
+                notification_sent, is_active, source_history_id, created_at, updated_at
+            )
+            SELECT customer_id, medicine_name, dosage, quantity, refill_date,
+                   FALSE, TRUE, source_history_id, NOW(), NOW()
+            FROM unnest(
+                CAST(:customer_ids AS VARCHAR[]),
+                CAST(:medicine_names AS VARCHAR[]),
+                CAST(:dosages AS VARCHAR[]),
+                CAST(:quantities AS INTEGER[]),
+                CAST(:refill_dates AS TIMESTAMP[]),
+                CAST(:source_ids AS INTEGER[])
+            ) AS p(customer_id, medicine_name, dosage, quantity, refill_date, source_history_id)
+            ON CONFLICT (customer_id, medicine_name) WHERE is_active
+            DO UPDATE SET
+                dosage = EXCLUDED.dosage,
+                quantity = EXCLUDED.quantity,
+                refill_date = EXCLUDED.refill_date,
+                notification_sent = FALSE,
+                notification_sent_date = NULL,
+                source_history_id = EXCLUDED.source_history_id,
+                updated_at = NOW()
+            WHERE medicine_refill_notifications.refill_date < EXCLUDED.refill_date
+            """
+        ),
+        {
+            "customer_ids": predicted["customer_id"].astype(str).tolist(),
+            "medicine_names": predicted["medicine_name"].astype(str).tolist(),
+            "dosages": [f"{int(n)} per day" for n in predicted["dosage_frequency"]],
+            "quantities": predicted["quantity"].astype(int).tolist(),
+            "refill_dates": predicted["refill_date"].dt.to_pydatetime().tolist(),
+            "source_ids": predicted["id"].astype(int).tolist(),
+        },
+    )
+    await session.commit()
+    refill_scheduler.reload()
+    return len(predicted)
+
+
+async def _main() -> None:
+    async with AsyncSessionLocal() as session:
+        count = await run_refill_prediction(session)
+    print(f"Upserted {count} refill reminder(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,206 @@
+"""
+Background dispatch of due refill reminders to n8n.
+
+The next unsent reminders are kept in a min-heap of (refill_date, id),
+loaded from ix_refill_notifications_due. The loop sleeps until the head of
+the heap is due (or until something new is scheduled), then claims every
+due reminder in batches: the rows are locked with SKIP LOCKED, sent to n8n
+as one webhook call per batch and marked sent with a single UPDATE in the
+same transaction. Nothing lives only in memory: after a restart the heap is
+rebuilt from the table and anything that fell due meanwhile goes out first.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services.webhook_service import trigger_n8n_webhook
+
+logger = logging.getLogger(__name__)
+
+HEAP_WINDOW = 5000
+
+_heap: list[tuple[datetime, int]] = []
+# Latest refill_date covered by the last load when it hit HEAP_WINDOW;
+# reminders after it are picked up by the next load instead.
+_horizon: datetime | None = None
+_reload = True
+_loaded_at = 0.0
+_wakeup = asyncio.Event()
+_task: asyncio.Task | None = None
+
+
+def schedule(notification_id: int, refill_date: datetime) -> None:
+    """Tell the scheduler about a new or moved reminder."""
+    if _task is None or (_horizon is not None and refill_date > _horizon):
+        return
+    heapq.heappush(_heap, (refill_date, notification_id))
+    if _heap[0][1] == notification_id:
+        _wakeup.set()
+
+
+def reload() -> None:
+    """Rebuild the heap from the table, e.g. after a bulk upsert."""
+    global _reload
+    _reload = True
+    _wakeup.set()
+
+
+async def _load(session: AsyncSession) -> None:
+    global _horizon, _loaded_at
+    result = await session.execute(
+        text(
+            """
+            SELECT refill_date, id
+            FROM medicine_refill_notifications
+            WHERE is_active = TRUE AND notification_sent = FALSE
+            ORDER BY refill_date, id
+            LIMIT :limit
+            """
+        ),
+        {"limit": HEAP_WINDOW},
+    )
+    entries = [(refill_date, notification_id) for refill_date, notification_id in result.all()]
+    await session.commit()
+    _heap[:] = entries
+    heapq.heapify(_heap)
+    _horizon = entries[-1][0] if len(entries) == HEAP_WINDOW else None
+    _loaded_at = time.monotonic()
+
+
+async def dispatch_batch(session: AsyncSession, notification_ids: list[int], webhook_url: str) -> list[int]:
+    """
+    Send the still-due reminders among ``notification_ids`` to n8n in one
+    call and mark them sent. Returns the ids that were sent; the rest were
+    deactivated, already sent, moved to a later date or claimed by another
+    worker.
+    """
+    now = datetime.utcnow()
+    result = await session.execute(
+        text(
+            """
+            SELECT id, customer_id, medicine_name, dosage, quantity, refill_date
+            FROM medicine_refill_notifications
+            WHERE id = ANY(:ids)
+              AND is_active = TRUE
+              AND notification_sent = FALSE
+              AND refill_date <= :now
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            """
+        ),
+        {"ids": notification_ids, "now": now},
+    )
+    reminders = [dict(row) for row in result.mappings().all()]
+    if not reminders:
+        await session.commit()
+        return []
+
+    try:
+        await trigger_n8n_webhook(
+            webhook_url,
+            {
+                "event": "refill_reminders",
+                "reminders": [
+                    {
+                        "notification_id": reminder["id"],
+                        "customer_id": reminder["customer_id"],
+                        "medicine_name": reminder["medicine_name"],
+                        "dosage": reminder["dosage"],
+                        "quantity": reminder["quantity"],
+                        "refill_date": reminder["refill_date"].isoformat(),
+                    }
+                    for reminder in reminders
+                ],
+                "triggered_at": now.isoformat(),
+            },
+        )
+    except Exception:
+        await session.rollback()
+        raise
+
+    sent_ids = [reminder["id"] for reminder in reminders]
+    await session.execute(
+        text(
+            """
+            UPDATE medicine_refill_notifications
+            SET notification_sent = TRUE, notification_sent_date = :now, updated_at = :now
+            WHERE id = ANY(:ids)
+            """
+        ),
+        {"ids": sent_ids, "now": now},
+    )
+    await session.commit()
+    return sent_ids
+
+
+def _pop_due(now: datetime, limit: int) -> list[int]:
+    due = []
+    while _heap and _heap[0][0] <= now and len(due) < limit:
+        due.append(heapq.heappop(_heap)[1])
+    return due
+
+
+async def _run(batch_size: int, max_sleep_seconds: float, retry_seconds: float) -> None:
+    global _reload
+    while True:
+        delay = max_sleep_seconds
+        # Cleared before the work, so a schedule() during dispatch still wakes us.
+        _wakeup.clear()
+        try:
+            async with AsyncSessionLocal() as session:
+                # The periodic reload picks up rows written by other processes.
+                stale = time.monotonic() - _loaded_at >= max_sleep_seconds
+                if _reload or stale or (not _heap and _horizon is not None):
+                    _reload = False
+                    await _load(session)
+
+                while due := _pop_due(datetime.utcnow(), batch_size):
+                    try:
+                        sent = await dispatch_batch(session, due, settings.N8N_ORDER_WEBHOOK)
+                    except Exception as exc:
+                        logger.warning("Refill reminder dispatch failed, retrying in %ss: %s", retry_seconds, exc)
+                        retry_at = datetime.utcnow() + timedelta(seconds=retry_seconds)
+                        for notification_id in due:
+                            heapq.heappush(_heap, (retry_at, notification_id))
+                        break
+                    if sent:
+                        logger.info("Sent %s refill reminder(s) to n8n", len(sent))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Refill reminder scheduler failed: %s", exc)
+            _reload = True
+            delay = retry_seconds
+
+        if _heap:
+            delay = min(delay, max(0.0, (_heap[0][0] - datetime.utcnow()).total_seconds()))
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_scheduler(batch_size: int, max_sleep_seconds: float, retry_seconds: float) -> None:
+    global _task, _reload
+    if _task is None or _task.done():
+        _reload = True
+        _task = asyncio.create_task(_run(batch_size, max_sleep_seconds, retry_seconds))
+
+
+async def stop_scheduler() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,67 @@
+"""
+Daily revenue rollup behind /analytics/revenue.
+
+The orders_daily_revenue trigger (migration 005, applied on startup) keeps one
+daily_revenue row per day, so the dashboard sums a few hundred rows instead of
+every order. Revenue counts every order regardless of status, as the endpoint
+always has, so status changes need no rollup work.
+
+Rebuild the rollup from orders (from backend/):
+    python -m app.services.revenue_rollup
+"""
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+
+
+async def backfill(session: AsyncSession) -> int:
+    """Recompute every day from orders. Blocks order writes while it runs."""
+    await session.execute(text("LOCK TABLE orders IN SHARE MODE"))
+    await session.execute(text("DELETE FROM daily_revenue"))
+    result = await session.execute(
+        text(
+            """
+            INSERT INTO daily_revenue (day, revenue, order_count)
+            SELECT created_at::date, COALESCE(SUM(total_amount), 0), COUNT(*)
+            FROM orders
+            WHERE created_at IS NOT NULL
+            GROUP BY created_at::date
+            """
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def get_revenue_summary(session: AsyncSession) -> dict:
+    result = await session.execute(
+        text(
+            """
+            SELECT
+                COALESCE(SUM(revenue) FILTER (WHERE day = CURRENT_DATE), 0) AS daily_revenue,
+                COALESCE(SUM(revenue) FILTER (WHERE day >= DATE_TRUNC('month', CURRENT_DATE)), 0) AS monthly_revenue,
+                COALESCE(SUM(order_count), 0) AS total_orders
+            FROM public.daily_revenue
+            """
+        )
+    )
+    row = result.mappings().first() or {}
+    return {
+        "daily_revenue": float(row.get("daily_revenue") or 0),
+        "monthly_revenue": float(row.get("monthly_revenue") or 0),
+        "total_orders": int(row.get("total_orders") or 0),
+    }
+
+
+async def _main() -> None:
+    async with AsyncSessionLocal() as session:
+        days = await backfill(session)
+    print(f"Rebuilt daily_revenue: {days} day(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,302 @@
+"""
+Debounced low-stock alerts for /warehouse/update-stock.
+
+Stock updates only record threshold crossings (ok -> low, anything ->
+critical, and recoveries back to ok) in a per-medicine pending map, so a
+burst of adjustments to one medicine collapses into its latest state. When
+the window closes, one flush upserts the stock_alerts rows, loads every
+active subscriber of the affected medicines in one query, bulk-inserts
+their notification_logs and sends the whole window to n8n in one webhook
+call. Coalescing is per process.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.notification import NotificationLog, NotificationSubscription, StockAlert
+from app.services import active_alerts, notification_templates
+from app.services.notification_service import NotificationService
+from app.services.webhook_service import trigger_n8n_webhook
+
+logger = logging.getLogger(__name__)
+
+STATUS_RANK = {"ok": 0, "low": 1, "critical": 2}
+ALERT_LEVELS = {"low": "warning", "critical": "critical"}
+TEMPLATE_FOR_LEVEL = {"warning": "stock_refill_alert", "critical": "critical_stock_alert"}
+# A window that keeps failing is dropped after this many flushes.
+MAX_FLUSH_ATTEMPTS = 5
+
+# medicine_id -> latest crossing in the current window
+_pending: dict[int, dict] = {}
+_flush_task: asyncio.Task | None = None
+
+
+def stock_status(stock: int, threshold: int) -> str:
+    if stock <= 0:
+        return "critical"
+    if stock < threshold:
+        return "low"
+    return "ok"
+
+
+def record_stock_change(
+    medicine_id: int,
+    medicine_name: str,
+    previous_stock: int,
+    updated_stock: int,
+    threshold: int,
+    window_seconds: float | None = None,
+) -> bool:
+    """
+    Queue an alert if this update crossed a threshold. Returns True when the
+    medicine has an alert waiting for the current window.
+    """
+    previous = stock_status(previous_stock, threshold)
+    current = stock_status(updated_stock, threshold)
+    if current == previous and medicine_id not in _pending:
+        return False
+
+    queued = _pending.get(medicine_id)
+    # Status the medicine had when this window opened, i.e. what stock_alerts
+    # still reflects.
+    window_start = queued["window_start"] if queued is not None else previous
+    entry = {
+        "medicine_id": medicine_id,
+        "medicine_name": medicine_name,
+        "stock": updated_stock,
+        "threshold": threshold,
+        "status": current,
+        "window_start": window_start,
+    }
+    if current == "ok":
+        if window_start == "ok":
+            # Dropped and recovered within one window: nobody needs to hear about it.
+            _pending.pop(medicine_id, None)
+            return False
+        _pending[medicine_id] = entry
+        _ensure_flush(window_seconds)
+        return False
+
+    if queued is None and STATUS_RANK[current] <= STATUS_RANK[previous]:
+        return False
+    _pending[medicine_id] = entry
+    _ensure_flush(window_seconds)
+    return True
+
+
+def _ensure_flush(window_seconds: float | None) -> None:
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        delay = settings.STOCK_ALERT_WINDOW_SECONDS if window_seconds is None else window_seconds
+        _flush_task = asyncio.create_task(_flush_after(delay))
+
+
+async def _flush_after(delay: float) -> None:
+    global _flush_task
+    await asyncio.sleep(delay)
+    # Let changes arriving during the flush (or a retry) open the next window.
+    _flush_task = None
+    await flush()
+
+
+async def flush() -> int:
+    """Send everything queued so far; returns the number of notifications logged."""
+    events = list(_pending.values())
+    _pending.clear()
+    if not events:
+        return 0
+    try:
+        async with AsyncSessionLocal() as session:
+            return await _dispatch(session, events)
+    except Exception as exc:
+        logger.warning("Stock alert flush failed for %s medicine(s), retrying next window: %s", len(events), exc)
+        for event in events:
+            event["attempts"] = event.get("attempts", 0) + 1
+            if event["attempts"] >= MAX_FLUSH_ATTEMPTS:
+                logger.error(
+                    "Dropping stock alert for medicine %s after %s failed flushes", event["medicine_id"], event["attempts"]
+                )
+                continue
+            newer = _pending.get(event["medicine_id"])
+            if newer is None:
+                _pending[event["medicine_id"]] = event
+            elif newer["status"] == "ok" and event["window_start"] == "ok":
+                # The failed event never reached stock_alerts, so there is nothing to resolve.
+                del _pending[event["medicine_id"]]
+            else:
+                newer["window_start"] = event["window_start"]
+        if _pending:
+            _ensure_flush(None)
+        return 0
+
+
+async def _dispatch(session: AsyncSession, events: list[dict]) -> int:
+    recovered = [event["medicine_id"] for event in events if event["status"] == "ok"]
+    low = [event for event in events if event["status"] != "ok"]
+    if recovered:
+        await session.execute(
+            update(StockAlert)
+            .where(
+                StockAlert.medicine_id.in_(recovered),
+                StockAlert.is_active.is_(True),
+                StockAlert.is_resolved.is_(False),
+            )
+            .values(is_active=False, is_resolved=True, resolved_at=func.now())
+        )
+    if not low:
+        await session.commit()
+        active_alerts.resolve_medicines(recovered)
+        return 0
+
+    alerts = await _upsert_alerts(session, low)
+    subscribers = await NotificationService.get_subscriptions_by_medicines(session, alerts)
+
+    await notification_templates.ensure_fresh(session)
+    log_rows = []
+    for medicine_id, alert in alerts.items():
+        message = notification_templates.render_or_default(
+            TEMPLATE_FOR_LEVEL[alert.alert_level], "sms_template", {"medicine_name": alert.medicine_name}
+        )
+        for subscription in subscribers.get(medicine_id, []):
+            log_rows.append(
+                {
+                    "stock_alert_id": alert.id,
+                    "customer_id": subscription.customer_id,
+                    "customer_phone": subscription.customer_phone,
+                    "customer_email": subscription.customer_email,
+                    "medicine_id": medicine_id,
+                    "medicine_name": alert.medicine_name,
+                    "notification_type": "stock_alert",
+                    "message": message,
+                    "notification_method": subscription.alert_type or "both",
+                    "delivery_status": "pending",
+                }
+            )
+    log_ids = []
+    if log_rows:
+        result = await session.execute(insert(NotificationLog).returning(NotificationLog.id, sort_by_parameter_order=True), log_rows)
+        log_ids = list(result.scalars().all())
+    # Commit before the webhook so the alerts and logs exist even if n8n is down.
+    await session.commit()
+    active_alerts.resolve_medicines(recovered)
+    active_alerts.upsert(alerts.values())
+
+    payload_alerts = []
+    position = 0
+    for medicine_id, alert in alerts.items():
+        recipients = []
+        for subscription in subscribers.get(medicine_id, []):
+            recipients.append(
+                {
+                    "notification_id": log_ids[position],
+                    "customer_id": subscription.customer_id,
+                    "customer_phone": subscription.customer_phone,
+                    "customer_email": subscription.customer_email,
+                    "alert_type": subscription.alert_type,
+                    "message": log_rows[position]["message"],
+                }
+            )
+            position += 1
+        payload_alerts.append(
+            {
+                "stock_alert_id": alert.id,
+                "medicine_id": medicine_id,
+                "medicine_name": alert.medicine_name,
+                "stock": alert.current_stock,
+                "threshold": alert.total_stock,
+                "alert_level": alert.alert_level,
+                "subscribers": recipients,
+            }
+        )
+
+    try:
+        await trigger_n8n_webhook(
+            settings.N8N_ORDER_WEBHOOK,
+            {"event": "low_stock_alerts", "alerts": payload_alerts},
+        )
+    except Exception as exc:
+        logger.warning("Low-stock webhook failed for %s alert(s): %s", len(payload_alerts), exc)
+        if log_ids:
+            await session.execute(
+                update(NotificationLog)
+                .where(NotificationLog.id.in_(log_ids))
+                .values(delivery_status="failed", retry_count=NotificationLog.retry_count + 1, last_retry_at=func.now())
+            )
+            await session.commit()
+        return len(log_ids)
+
+    await session.execute(
+        update(StockAlert).where(StockAlert.id.in_([alert.id for alert in alerts.values()])).values(n8n_workflow_triggered=True)
+    )
+    notified = [medicine_id for medicine_id in alerts if subscribers.get(medicine_id)]
+    if notified:
+        await session.execute(
+            update(NotificationSubscription)
+            .where(NotificationSubscription.medicine_id.in_(notified), NotificationSubscription.is_active.is_(True))
+            .values(last_notified_at=func.now())
+        )
+    if log_ids:
+        # Handing the batch to n8n counts as sent; n8n acknowledges delivery separately.
+        await NotificationService.mark_notifications_sent(session, log_ids)
+    else:
+        await session.commit()
+    return len(log_ids)
+
+
+async def _upsert_alerts(session: AsyncSession, events: list[dict]) -> dict[int, StockAlert]:
+    """One active alert per medicine: refresh the open one or create it."""
+    result = await session.execute(
+        select(StockAlert).where(
+            StockAlert.medicine_id.in_([event["medicine_id"] for event in events]),
+            StockAlert.is_active.is_(True),
+            StockAlert.is_resolved.is_(False),
+        )
+    )
+    existing = {alert.medicine_id: alert for alert in result.scalars().all()}
+
+    alerts: dict[int, StockAlert] = {}
+    for event in events:
+        level = ALERT_LEVELS[event["status"]]
+        # Medicines carry no capacity, so percentages are relative to the threshold.
+        threshold = max(event["threshold"], 1)
+        alert = existing.get(event["medicine_id"])
+        if alert is None:
+            alert = StockAlert(
+                medicine_id=event["medicine_id"],
+                medicine_name=event["medicine_name"],
+                total_stock=threshold,
+                refill_quantity=threshold * 2,
+                needs_refill=True,
+                created_at=datetime.now(timezone.utc),
+            )
+            session.add(alert)
+        alert.current_stock = event["stock"]
+        alert.stock_percentage = event["stock"] / threshold * 100
+        alert.alert_level = level
+        alert.severity = level
+        alerts[event["medicine_id"]] = alert
+    await session.flush()
+    return alerts
+
+
+async def stop() -> None:
+    """Flush the open window at shutdown instead of dropping it."""
+    global _flush_task
+    if _flush_task is not None and not _flush_task.done():
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+    _flush_task = None
+    await flush()
+    if _flush_task is not None:
+        # A failed final flush schedules a retry that would never run.
+        _flush_task.cancel()
+        _flush_task = None
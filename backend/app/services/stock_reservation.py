@@ -0,0 +1,175 @@
+"""
+Stock reservations: hold stock at checkout, take it on payment.
+
+A hold is a single conditional UPDATE (``stock >= :quantity``) plus the
+reservation row, so concurrent buyers of the last units cannot both succeed.
+Paying converts the hold (OrderService.settle_orders) without touching stock
+again; holds that outlive their TTL are released by a background sweeper,
+which puts the stock back.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+_sweeper: asyncio.Task | None = None
+
+
+async def hold_stock(
+    session: AsyncSession,
+    order_id: int,
+    medicine_id: int,
+    quantity: int,
+    ttl_seconds: float,
+) -> dict | None:
+    """
+    Hold ``quantity`` units for an order. Re-holding an order that already has
+    a live hold just extends it. Returns the hold, None when there is not
+    enough stock, or {} when the medicine is not in the catalog (nothing to
+    hold).
+    """
+    try:
+        result = await session.execute(
+            text(
+                """
+                WITH existing AS (
+                    UPDATE stock_reservations
+                    SET expires_at = NOW() + make_interval(secs => :ttl), updated_at = NOW()
+                    WHERE order_id = :order_id AND status = 'held'
+                    RETURNING id, order_id, medicine_id, quantity, expires_at
+                ),
+                taken AS (
+                    UPDATE medicines
+                    SET stock = stock - :quantity
+                    WHERE id = :medicine_id
+                      AND stock >= :quantity
+                      AND NOT EXISTS (
+                          SELECT 1 FROM stock_reservations
+                          WHERE order_id = :order_id AND status = 'held'
+                      )
+                    RETURNING id
+                ),
+                created AS (
+                    INSERT INTO stock_reservations (order_id, medicine_id, quantity, status, expires_at)
+                    SELECT :order_id, id, :quantity, 'held', NOW() + make_interval(secs => :ttl)
+                    FROM taken
+                    RETURNING id, order_id, medicine_id, quantity, expires_at
+                )
+                SELECT * FROM existing
+                UNION ALL
+                SELECT * FROM created
+                """
+            ),
+            {"order_id": order_id, "medicine_id": medicine_id, "quantity": quantity, "ttl": float(ttl_seconds)},
+        )
+        row = result.mappings().first()
+        await session.commit()
+    except IntegrityError:
+        # A concurrent request for the same order created the hold first.
+        await session.rollback()
+        result = await session.execute(
+            text(
+                """
+                SELECT id, order_id, medicine_id, quantity, expires_at
+                FROM stock_reservations
+                WHERE order_id = :order_id AND status = 'held'
+                """
+            ),
+            {"order_id": order_id},
+        )
+        row = result.mappings().first()
+    if row:
+        return dict(row)
+    known = await session.execute(text("SELECT 1 FROM medicines WHERE id = :medicine_id"), {"medicine_id": medicine_id})
+    return None if known.first() else {}
+
+
+async def release_orders(session: AsyncSession, order_ids: list[int]) -> int:
+    """Release live holds for orders that will not be paid (cancelled, rejected)."""
+    return await _release(session, "order_id = ANY(:order_ids)", {"order_ids": order_ids})
+
+
+async def release_expired(session: AsyncSession, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    return await _release(session, "expires_at < NOW()", {}, batch_size)
+
+
+async def _release(session: AsyncSession, condition: str, params: dict, limit: int | None = None) -> int:
+    # SKIP LOCKED lets several workers sweep at once, and leaves holds that a
+    # payment is converting right now alone.
+    limit_clause = ""
+    if limit:
+        limit_clause = "LIMIT :limit"
+        params = {**params, "limit": limit}
+    result = await session.execute(
+        text(
+            f"""
+            WITH released AS (
+                UPDATE stock_reservations
+                SET status = 'released', updated_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM stock_reservations
+                    WHERE status = 'held' AND {condition}
+                    ORDER BY id
+                    {limit_clause}
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING medicine_id, quantity
+            ),
+            restocked AS (
+                UPDATE medicines m
+                SET stock = m.stock + r.quantity
+                FROM (
+                    SELECT medicine_id, SUM(quantity) AS quantity
+                    FROM released
+                    GROUP BY medicine_id
+                ) r
+                WHERE m.id = r.medicine_id
+                RETURNING m.id
+            )
+            SELECT COUNT(*) FROM released
+            """
+        ),
+        params,
+    )
+    released = int(result.scalar() or 0)
+    await session.commit()
+    return released
+
+
+async def _sweep_forever(interval_seconds: float) -> None:
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                while await release_expired(session) == SWEEP_BATCH_SIZE:
+                    pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Stock reservation sweep failed: %s", exc)
+        await asyncio.sleep(interval_seconds)
+
+
+def start_sweeper(interval_seconds: float) -> None:
+    global _sweeper
+    if _sweeper is None or _sweeper.done():
+        _sweeper = asyncio.create_task(_sweep_forever(interval_seconds))
+
+
+async def stop_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        try:
+            await _sweeper
+        except asyncio.CancelledError:
+            pass
+        _sweeper = None
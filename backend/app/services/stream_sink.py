@@ -0,0 +1,28 @@
+"""
+In-memory sink for writers that stream into a chunked HTTP response.
+
+Writers such as ZipFile and pyarrow's Parquet writer see a write-only,
+unseekable file, so they emit output as they go; callers drain() it after
+each unit of work and yield the bytes to the response.
+"""
+
+import io
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only target whose buffered contents are handed out by drain()."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+INVENTORY_PATH = Path(__file__).resolve().parents[1] / "data" / "inventory.csv"
+
+
+def normalize_name(name):
+    return str(name).strip().lower()
+
+
+class InventoryIndex:
+    """Catalog loaded once: name -> row position, with price and tax as arrays."""
+
+    def __init__(self, path=INVENTORY_PATH):
+        frame = pd.read_csv(path)
+        names = [normalize_name(name) for name in frame["name"]]
+        self.positions = {name: i for i, name in enumerate(names)}
+        self.names = names
+        self.prices = frame["price"].to_numpy(dtype=float)
+        self.tax_percents = frame["tax_percent"].to_numpy(dtype=float)
+
+    def locate(self, names):
+        """Row positions for the given names, -1 where the item is unknown."""
+        return np.fromiter(
+            (self.positions.get(normalize_name(name), -1) for name in names),
+            dtype=np.int64,
+            count=len(names),
+        )
+
+
+inventory_index = InventoryIndex()
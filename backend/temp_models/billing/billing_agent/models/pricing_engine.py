@@ -1,28 +1,35 @@
-import pandas as pd
+import numpy as np
 
-inventory = pd.read_csv("data/inventory.csv")
+from models.inventory_index import inventory_index
 
-def calculate_prices(cart_items):
-    bill_details = []
-    subtotal = 0
-
-    for item in cart_items:
-        row = inventory[inventory["name"] == item["name"]]
-
-        if row.empty:
-            continue
-
-        price = float(row["price"].values[0])
-        quantity = item["quantity"]
 
-        total_price = price * quantity
-        subtotal += total_price
-
-        bill_details.append({
+def calculate_prices(cart_items):
+    if not cart_items:
+        return [], 0
+
+    positions = inventory_index.locate([item["name"] for item in cart_items])
+    found = positions >= 0
+    rows = positions[found]
+    items = [item for item, hit in zip(cart_items, found) if hit]
+
+    quantities = np.array([item["quantity"] for item in items], dtype=float)
+    unit_prices = inventory_index.prices[rows]
+    tax_percents = inventory_index.tax_percents[rows]
+    total_prices = unit_prices * quantities
+    tax_amounts = total_prices * (tax_percents / 100)
+
+    bill_details = [
+        {
             "name": item["name"],
-            "quantity": quantity,
-            "unit_price": price,
-            "total_price": total_price
-        })
-
-    return bill_details, subtotal
\ No newline at end of file
+            "quantity": item["quantity"],
+            "unit_price": float(unit_price),
+            "total_price": float(total_price),
+            "tax_percent": float(tax_percent),
+            "tax_amount": float(tax_amount),
+        }
+        for item, unit_price, total_price, tax_percent, tax_amount in zip(
+            items, unit_prices, total_prices, tax_percents, tax_amounts
+        )
+    ]
+
+    return bill_details, float(total_prices.sum())
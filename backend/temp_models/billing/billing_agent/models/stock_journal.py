@@ -0,0 +1,144 @@
+"""
+Append-only stock journal for the billing agent.
+
+Every deduction is one row appended to `stock_events` in a SQLite database
+running in WAL mode, so concurrent bills never overwrite each other.
+Current stock is kept in memory (snapshot + events since) and compaction
+periodically folds the events into `stock_snapshot` and rewrites
+inventory.csv so the CSV stays a readable copy of current stock.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from models.inventory_index import INVENTORY_PATH, normalize_name
+
+JOURNAL_PATH = Path(__file__).resolve().parents[1] / "data" / "stock_journal.db"
+COMPACT_EVERY = 500
+
+
+class StockJournal:
+    def __init__(self, path=JOURNAL_PATH, inventory_path=INVENTORY_PATH):
+        self.path = Path(path)
+        self.inventory_path = Path(inventory_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS stock_snapshot (
+                name TEXT PRIMARY KEY,
+                stock INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stock_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                delta INTEGER NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+        self._stock = self._load()
+        self._pending_events = self._conn.execute("SELECT COUNT(*) FROM stock_events").fetchone()[0]
+
+    def _load(self):
+        self._seed_from_csv()
+        snapshot = dict(self._conn.execute("SELECT name, stock FROM stock_snapshot"))
+        for name, delta in self._conn.execute("SELECT name, SUM(delta) FROM stock_events GROUP BY name"):
+            snapshot[name] = snapshot.get(name, 0) + delta
+        return snapshot
+
+    def _seed_from_csv(self):
+        """Add products that appear in inventory.csv but not yet in the snapshot."""
+        if not self.inventory_path.exists():
+            return
+        frame = pd.read_csv(self.inventory_path)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO stock_snapshot (name, stock) VALUES (?, ?)",
+            ((normalize_name(name), int(stock)) for name, stock in zip(frame["name"], frame["stock"])),
+        )
+
+    def current_stock(self, name=None):
+        with self._lock:
+            if name is not None:
+                return self._stock.get(normalize_name(name))
+            return dict(self._stock)
+
+    def deduct(self, cart_items):
+        """
+        Journal one decrement per known cart item, all in a single transaction.
+        Raises ValueError, journaling nothing, if any item would go below zero.
+        """
+        with self._lock:
+            demand = {}
+            for item in cart_items:
+                name = normalize_name(item["name"])
+                if name in self._stock:
+                    demand[name] = demand.get(name, 0) + int(item["quantity"])
+            short = sorted(name for name, quantity in demand.items() if quantity > self._stock[name])
+            if short:
+                raise ValueError(f"Insufficient stock for: {', '.join(short)}")
+            events = [(name, -quantity) for name, quantity in demand.items()]
+            if not events:
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT INTO stock_events (name, delta) VALUES (?, ?)", events)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for name, delta in events:
+                self._stock[name] += delta
+            self._pending_events += len(events)
+            if self._pending_events >= COMPACT_EVERY:
+                self._compact()
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            last_id = self._conn.execute("SELECT MAX(id) FROM stock_events").fetchone()[0]
+            if last_id is None:
+                self._conn.execute("COMMIT")
+                return
+            self._conn.execute(
+                """
+                UPDATE stock_snapshot
+                SET stock = stock + (
+                    SELECT SUM(delta) FROM stock_events e
+                    WHERE e.name = stock_snapshot.name AND e.id <= ?
+                )
+                WHERE name IN (SELECT name FROM stock_events WHERE id <= ?)
+                """,
+                (last_id, last_id),
+            )
+            self._conn.execute("DELETE FROM stock_events WHERE id <= ?", (last_id,))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._pending_events = 0
+        self._write_inventory_csv()
+
+    def _write_inventory_csv(self):
+        if not self.inventory_path.exists():
+            return
+        frame = pd.read_csv(self.inventory_path)
+        frame["stock"] = [
+            self._stock.get(normalize_name(name), stock) for name, stock in zip(frame["name"], frame["stock"])
+        ]
+        tmp_path = self.inventory_path.with_suffix(".csv.tmp")
+        frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.inventory_path)
+
+
+stock_journal = StockJournal()
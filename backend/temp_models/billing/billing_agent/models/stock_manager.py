@@ -1,12 +1,9 @@
-import pandas as pd
+from models.stock_journal import stock_journal
 
-def deduct_stock(cart_items):
-    inventory = pd.read_csv("data/inventory.csv")
 
-    for item in cart_items:
-        index = inventory[inventory["name"] == item["name"]].index
+def deduct_stock(cart_items):
+    stock_journal.deduct(cart_items)
 
-        if not index.empty:
-            inventory.loc[index, "stock"] -= item["quantity"]
 
-    inventory.to_csv("data/inventory.csv", index=False)
\ No newline at end of file
+def get_stock(name=None):
+    return stock_journal.current_stock(name)
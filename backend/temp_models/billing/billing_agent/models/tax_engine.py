@@ -1,15 +1,18 @@
-import pandas as pd
+from models.inventory_index import inventory_index
 
-inventory = pd.read_csv("data/inventory.csv")
 
 def calculate_tax(bill_details):
+    # Lines priced by calculate_prices already carry their tax.
     total_tax = 0
 
     for item in bill_details:
-        row = inventory[inventory["name"] == item["name"]]
-        tax_percent = float(row["tax_percent"].values[0])
+        if "tax_amount" in item:
+            total_tax += item["tax_amount"]
+            continue
+        position = inventory_index.locate([item["name"]])[0]
+        if position < 0:
+            continue
+        tax_percent = float(inventory_index.tax_percents[position])
+        total_tax += item["total_price"] * (tax_percent / 100)
 
-        tax_amount = item["total_price"] * (tax_percent / 100)
-        total_tax += tax_amount
-
-    return round(total_tax, 2)
\ No newline at end of file
+    return round(total_tax, 2)
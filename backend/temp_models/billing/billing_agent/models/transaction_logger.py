@@ -1,15 +1,19 @@
-import pandas as pd
+import csv
+import threading
+from pathlib import Path
+
+TRANSACTIONS_PATH = Path(__file__).resolve().parents[1] / "data" / "transactions.csv"
+FIELDS = ["invoice_id", "total"]
+
+_lock = threading.Lock()
+
 
 def log_transaction(invoice):
-    try:
-        transactions = pd.read_csv("data/transactions.csv")
-    except:
-        transactions = pd.DataFrame(columns=["invoice_id", "total"])
-
-    new_row = {
-        "invoice_id": invoice["invoice_id"],
-        "total": invoice["total"]
-    }
-
-    transactions = pd.concat([transactions, pd.DataFrame([new_row])])
-    transactions.to_csv("data/transactions.csv", index=False)
\ No newline at end of file
+    # Append one line instead of rewriting the whole history.
+    with _lock:
+        new_file = not TRANSACTIONS_PATH.exists() or TRANSACTIONS_PATH.stat().st_size == 0
+        with open(TRANSACTIONS_PATH, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(FIELDS)
+            writer.writerow([invoice["invoice_id"], invoice["total"]])
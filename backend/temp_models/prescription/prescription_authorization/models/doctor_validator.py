@@ -1,8 +1,16 @@
+from pathlib import Path
+
 import pandas as pd
 
+REGISTRY_PATH = Path(__file__).resolve().parents[1] / "data" / "doctor_registry.csv"
+
+# Loaded once; read as strings so "1111111" matches the OCR'd registration number.
+registered_numbers = frozenset(
+    pd.read_csv(REGISTRY_PATH, dtype={"registration_number": str})["registration_number"].str.strip()
+)
+
 def validate_doctor(registration_number):
     try:
-        registry = pd.read_csv('data/doctor_registry.csv')
-        return registration_number in registry['registration_number'].values
+        return registration_number in registered_numbers
     except Exception as e:
-        raise RuntimeError(f"Doctor validation failed: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Doctor validation failed: {e}")
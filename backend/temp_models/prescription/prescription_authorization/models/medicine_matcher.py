@@ -1,7 +1,13 @@
-from rapidfuzz import fuzz
+from pathlib import Path
+
+from rapidfuzz import fuzz, process
 import pandas as pd
 
-med_db = pd.read_csv("data/medicine_master.csv")
+MEDICINE_MASTER_PATH = Path(__file__).resolve().parents[1] / "data" / "medicine_master.csv"
+
+med_db = pd.read_csv(MEDICINE_MASTER_PATH)
+med_names = list(med_db["name"])
+med_names_lower = [name.lower() for name in med_names]
 
 def match_medicines(prescribed_list):
 
@@ -12,17 +18,10 @@ def match_medicines(prescribed_list):
 
         med_name = p["name"]   # <-- FIX HERE
 
-        best_match = None
-        highest_score = 0
-
-        for med in med_db["name"]:
-            score = fuzz.ratio(med_name.lower(), med.lower())
-            if score > highest_score:
-                highest_score = score
-                best_match = med
+        best = process.extractOne(med_name.lower(), med_names_lower, scorer=fuzz.ratio)
 
-        if highest_score > 80:
-            matched.append(best_match)
+        if best and best[1] > 80:
+            matched.append(med_names[best[2]])
         else:
             unmatched.append(med_name)
 
@@ -0,0 +1,86 @@
+"""
+Tests for the in-memory active stock alert view (app/services/active_alerts.py).
+Alerts are built in memory; no database or server needed.
+
+Run from backend/:
+    python -m pytest -q test_active_alerts.py
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models.notification import StockAlert
+from app.services import active_alerts
+
+
+@pytest.fixture(autouse=True)
+def empty_view():
+    for index in (active_alerts._alerts, active_alerts._by_medicine, active_alerts._by_name, active_alerts._by_severity):
+        index.clear()
+    yield
+    for index in (active_alerts._alerts, active_alerts._by_medicine, active_alerts._by_name, active_alerts._by_severity):
+        index.clear()
+
+
+def _alert(alert_id, medicine_id, name, level, day, **fields):
+    values = {
+        "id": alert_id,
+        "medicine_id": medicine_id,
+        "medicine_name": name,
+        "alert_level": level,
+        "severity": level,
+        "current_stock": 2,
+        "total_stock": 10,
+        "stock_percentage": 20.0,
+        "refill_quantity": 20,
+        "is_active": True,
+        "is_resolved": False,
+        "created_at": datetime(2025, 1, day, tzinfo=timezone.utc),
+    }
+    values.update(fields)
+    return StockAlert(**values)
+
+
+def _ids(views):
+    return [view["id"] for view in views]
+
+
+@pytest.fixture
+def seeded():
+    active_alerts.upsert(
+        [
+            _alert(1, 10, "Paracetamol 500mg", "warning", 1),
+            _alert(2, 11, "Amoxicillin", "critical", 2),
+            _alert(3, 12, "Paracetamol Syrup", "critical", 3),
+        ]
+    )
+
+
+def test_unfiltered_is_newest_first(seeded):
+    assert _ids(active_alerts.query()) == [3, 2, 1]
+
+
+def test_filters_combine(seeded):
+    assert _ids(active_alerts.query(medicine_id=11)) == [2]
+    assert _ids(active_alerts.query(severity="critical")) == [3, 2]
+    assert _ids(active_alerts.query(medicine_name="amoxicillin")) == [2]
+    assert _ids(active_alerts.query(medicine_name="paracetamol")) == [3, 1]
+    assert _ids(active_alerts.query(medicine_name="paracetamol", severity="critical")) == [3]
+    assert active_alerts.query(medicine_id=10, severity="critical") == []
+
+
+def test_upsert_refreshes_and_drops_resolved(seeded):
+    active_alerts.upsert([_alert(1, 10, "Paracetamol 500mg", "critical", 1)])
+    assert _ids(active_alerts.query(severity="warning")) == []
+    assert _ids(active_alerts.query(severity="critical")) == [3, 2, 1]
+
+    active_alerts.upsert([_alert(2, 11, "Amoxicillin", "critical", 2, is_resolved=True)])
+    assert _ids(active_alerts.query()) == [3, 1]
+
+
+def test_resolve_by_id_and_medicine(seeded):
+    active_alerts.resolve_alerts([1])
+    active_alerts.resolve_medicines([12])
+    assert _ids(active_alerts.query()) == [2]
+    assert active_alerts.counts() == {"critical": 1}
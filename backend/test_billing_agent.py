@@ -0,0 +1,135 @@
+"""
+Tests for the billing agent's indexed pricing and append-only stock journal
+(temp_models/billing/billing_agent). Journals run against copies in a temp
+directory, so the agent's data/ files are never modified.
+
+Run from backend/:
+    python -m pytest -q test_billing_agent.py
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+BILLING_AGENT_DIR = Path(__file__).resolve().parent / "temp_models" / "billing" / "billing_agent"
+if str(BILLING_AGENT_DIR) not in sys.path:
+    sys.path.insert(0, str(BILLING_AGENT_DIR))
+
+from models import stock_journal as journal_module  # noqa: E402
+from models.inventory_index import INVENTORY_PATH  # noqa: E402
+from models.pricing_engine import calculate_prices  # noqa: E402
+from models.stock_journal import StockJournal  # noqa: E402
+
+
+def _loop_prices(cart_items):
+    """The per-item DataFrame loop calculate_prices replaced."""
+    inventory = pd.read_csv(INVENTORY_PATH)
+    bill_details, subtotal = [], 0
+    for item in cart_items:
+        row = inventory[inventory["name"] == item["name"]]
+        if row.empty:
+            continue
+        price = float(row["price"].values[0])
+        total_price = price * item["quantity"]
+        subtotal += total_price
+        bill_details.append(
+            {"name": item["name"], "quantity": item["quantity"], "unit_price": price, "total_price": total_price}
+        )
+    return bill_details, subtotal
+
+
+def test_calculate_prices_matches_per_item_loop():
+    cart = [
+        {"name": "morphine", "quantity": 2},
+        {"name": "unknown-item", "quantity": 1},
+        {"name": "paracetamol", "quantity": 5},
+        {"name": "morphine", "quantity": 1},
+    ]
+    details, subtotal = calculate_prices(cart)
+    expected_details, expected_subtotal = _loop_prices(cart)
+
+    assert subtotal == pytest.approx(expected_subtotal)
+    assert [{key: row[key] for key in expected_details[0]} for row in details] == expected_details
+    for row in details:
+        assert row["tax_amount"] == pytest.approx(row["total_price"] * row["tax_percent"] / 100)
+
+
+def test_calculate_prices_empty_cart():
+    assert calculate_prices([]) == ([], 0)
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    path = tmp_path / "inventory.csv"
+    shutil.copy(INVENTORY_PATH, path)
+    return path
+
+
+def _journal(tmp_path, inventory):
+    return StockJournal(tmp_path / "stock_journal.db", inventory)
+
+
+def _csv_stock(path, name):
+    frame = pd.read_csv(path)
+    return int(frame.loc[frame["name"] == name, "stock"].iloc[0])
+
+
+def test_deduct_updates_view_and_survives_restart(tmp_path, inventory):
+    start = _csv_stock(inventory, "morphine")
+    journal = _journal(tmp_path, inventory)
+    journal.deduct([{"name": "Morphine ", "quantity": 2}, {"name": "morphine", "quantity": 1}])
+    assert journal.current_stock("morphine") == start - 3
+
+    assert _journal(tmp_path, inventory).current_stock("morphine") == start - 3
+
+
+def test_unknown_items_are_skipped(tmp_path, inventory):
+    journal = _journal(tmp_path, inventory)
+    before = journal.current_stock()
+    journal.deduct([{"name": "unknown-item", "quantity": 4}])
+    assert journal.current_stock() == before
+
+
+def test_deduct_below_zero_is_rejected_atomically(tmp_path, inventory):
+    journal = _journal(tmp_path, inventory)
+    morphine, norco = journal.current_stock("morphine"), journal.current_stock("norco")
+    with pytest.raises(ValueError, match="norco"):
+        journal.deduct([{"name": "morphine", "quantity": 1}, {"name": "norco", "quantity": norco + 1}])
+    assert journal.current_stock("morphine") == morphine
+    assert journal.current_stock("norco") == norco
+    assert journal._conn.execute("SELECT COUNT(*) FROM stock_events").fetchone()[0] == 0
+
+
+def test_compact_folds_events_into_snapshot_and_csv(tmp_path, inventory):
+    start = _csv_stock(inventory, "paracetamol")
+    journal = _journal(tmp_path, inventory)
+    journal.deduct([{"name": "paracetamol", "quantity": 7}])
+    journal.compact()
+
+    assert journal._conn.execute("SELECT COUNT(*) FROM stock_events").fetchone()[0] == 0
+    snapshot = journal._conn.execute("SELECT stock FROM stock_snapshot WHERE name = 'paracetamol'").fetchone()[0]
+    assert snapshot == start - 7
+    assert _csv_stock(inventory, "paracetamol") == start - 7
+    assert journal.current_stock("paracetamol") == start - 7
+
+
+def test_compacts_automatically(tmp_path, inventory, monkeypatch):
+    monkeypatch.setattr(journal_module, "COMPACT_EVERY", 2)
+    journal = _journal(tmp_path, inventory)
+    journal.deduct([{"name": "codeine", "quantity": 1}])
+    journal.deduct([{"name": "codeine", "quantity": 1}])
+    assert journal._conn.execute("SELECT COUNT(*) FROM stock_events").fetchone()[0] == 0
+
+
+def test_products_added_to_csv_later_are_tracked(tmp_path, inventory):
+    _journal(tmp_path, inventory)
+    frame = pd.read_csv(inventory)
+    frame.loc[len(frame)] = ["newmed", 5, 9, 5]
+    frame.to_csv(inventory, index=False)
+
+    journal = _journal(tmp_path, inventory)
+    journal.deduct([{"name": "newmed", "quantity": 4}])
+    assert journal.current_stock("newmed") == 5
@@ -0,0 +1,93 @@
+"""
+Tests for the primary-database circuit breaker (app/db/circuit_breaker.py).
+Pure in-process checks; no database or server needed.
+
+Run from backend/:
+    python -m pytest -q test_circuit_breaker.py
+"""
+
+import time
+
+from app.db.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _tripped(reset_timeout=30.0):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def _expire_cooldown(breaker):
+    breaker._opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_stays_closed_below_threshold():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_trips_open_and_rejects_requests():
+    breaker = _tripped()
+    assert breaker.state == OPEN
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+
+def test_single_probe_after_cooldown():
+    breaker = _tripped()
+    _expire_cooldown(breaker)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.is_open
+
+    assert breaker.allow_request()
+    # Once the probe is claimed everyone else skips the database again.
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes():
+    breaker = _tripped()
+    _expire_cooldown(breaker)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens():
+    breaker = _tripped()
+    _expire_cooldown(breaker)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+
+def test_abandoned_probe_does_not_block_forever():
+    breaker = _tripped(reset_timeout=30.0)
+    _expire_cooldown(breaker)
+    assert breaker.allow_request()
+    breaker._probe_started_at = time.monotonic() - 31
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_snapshot_reports_state():
+    snapshot = _tripped().snapshot()
+    assert snapshot["state"] == OPEN
+    assert snapshot["consecutive_failures"] == 2
+    assert snapshot["failure_threshold"] == 2
@@ -0,0 +1,73 @@
+"""
+Tests for the vectorised demand forecasters (app/services/demand_forecast.py),
+checked against straightforward per-medicine reference loops.
+
+Run from backend/:
+    python -m pytest -q test_demand_forecast.py
+"""
+
+import numpy as np
+import pytest
+
+from app.services import demand_forecast
+
+
+def _ses_reference(series, alpha):
+    level = series[0]
+    for value in series[1:]:
+        level = alpha * value + (1 - alpha) * level
+    return level
+
+
+def _croston_reference(series, alpha):
+    size = interval = None
+    since_last = 1
+    for value in series:
+        if value > 0:
+            if size is None:
+                size, interval = value, since_last
+            else:
+                size = alpha * value + (1 - alpha) * size
+                interval = alpha * since_last + (1 - alpha) * interval
+            since_last = 1
+        else:
+            since_last += 1
+    return 0.0 if size is None else size / interval
+
+
+MATRIX = np.array(
+    [
+        [3, 4, 5, 4, 6, 5, 4, 5, 6, 7, 5, 6, 4, 5],
+        [0, 0, 6, 0, 0, 0, 2, 0, 0, 0, 0, 8, 0, 0],
+        [0] * 14,
+    ],
+    dtype=float,
+)
+
+
+def test_build_demand_matrix_places_oldest_day_first():
+    rows = [(7, "Aspirin", 0, 2), (7, "Aspirin", 0, 1), (9, "Zinc", 2, 5), (7, "Aspirin", 1, None)]
+    ids, names, matrix = demand_forecast.build_demand_matrix(rows, 3)
+    assert ids == [7, 9]
+    assert names == ["Aspirin", "Zinc"]
+    np.testing.assert_array_equal(matrix, [[0, 0, 3], [5, 0, 0]])
+
+
+def test_ses_matches_reference():
+    expected = [_ses_reference(row, demand_forecast.SES_ALPHA) for row in MATRIX]
+    np.testing.assert_allclose(demand_forecast.simple_exponential_smoothing(MATRIX), expected)
+
+
+def test_croston_matches_reference():
+    expected = [_croston_reference(row, demand_forecast.CROSTON_ALPHA) for row in MATRIX]
+    np.testing.assert_allclose(demand_forecast.croston(MATRIX), expected)
+
+
+def test_forecast_picks_method_by_intermittency():
+    result = demand_forecast.forecast(MATRIX)
+    assert list(result["intermittent"]) == [False, True, True]
+    assert result["daily_rate"][0] == pytest.approx(demand_forecast.simple_exponential_smoothing(MATRIX)[0])
+    assert result["daily_rate"][1] == pytest.approx(demand_forecast.croston(MATRIX)[1])
+    assert result["daily_rate"][2] == 0
+    assert list(result["weekly_orders"]) == [38, 8, 0]
+    assert list(result["previous_week_orders"]) == [31, 8, 0]
@@ -0,0 +1,119 @@
+"""
+Tests for the idempotency-key replay store (app/services/idempotency.py).
+Pure in-process checks; no database or server needed.
+
+Run from backend/:
+    python -m pytest -q test_idempotency.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.idempotency import IdempotencyStore
+
+
+class Handler:
+    def __init__(self, result="created", error=None, delay=0.0):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"result": self.result, "call": self.calls}
+
+
+def test_fingerprint_ignores_key_order():
+    assert IdempotencyStore.fingerprint({"a": 1, "b": 2}) == IdempotencyStore.fingerprint({"b": 2, "a": 1})
+    assert IdempotencyStore.fingerprint({"a": 1}) != IdempotencyStore.fingerprint({"a": 2})
+
+
+def test_retry_replays_first_response():
+    async def scenario():
+        store, handler = IdempotencyStore(), Handler()
+        first = await store.run("k", "fp", 60, handler)
+        second = await store.run("k", "fp", 60, handler)
+        return handler.calls, first, second
+
+    calls, first, second = asyncio.run(scenario())
+    assert calls == 1
+    assert first == ({"result": "created", "call": 1}, False)
+    assert second == ({"result": "created", "call": 1}, True)
+
+
+def test_key_reused_with_other_payload_is_rejected():
+    async def scenario():
+        store = IdempotencyStore()
+        await store.run("k", "fp-1", 60, Handler())
+        await store.run("k", "fp-2", 60, Handler())
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(scenario())
+    assert excinfo.value.status_code == 422
+
+
+def test_expired_entry_runs_again():
+    async def scenario():
+        store, handler = IdempotencyStore(), Handler()
+        await store.run("k", "fp", 0, handler)
+        _, replayed = await store.run("k", "fp", 0, handler)
+        return handler.calls, replayed
+
+    assert asyncio.run(scenario()) == (2, False)
+
+
+def test_failed_request_is_not_cached():
+    async def scenario():
+        store = IdempotencyStore()
+        with pytest.raises(RuntimeError):
+            await store.run("k", "fp", 60, Handler(error=RuntimeError("db down")))
+        return await store.run("k", "fp", 60, Handler())
+
+    assert asyncio.run(scenario()) == ({"result": "created", "call": 1}, False)
+
+
+def test_concurrent_duplicates_share_one_execution():
+    async def scenario():
+        store, handler = IdempotencyStore(), Handler(delay=0.05)
+        results = await asyncio.gather(*(store.run("k", "fp", 60, handler) for _ in range(5)))
+        return handler.calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert {response["call"] for response, _ in results} == {1}
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+
+
+def test_concurrent_duplicates_see_the_failure():
+    async def scenario():
+        store, handler = IdempotencyStore(), Handler(error=RuntimeError("boom"), delay=0.05)
+        results = await asyncio.gather(
+            store.run("k", "fp", 60, handler),
+            store.run("k", "fp", 60, handler),
+            return_exceptions=True,
+        )
+        return handler.calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_lru_evicts_oldest_and_forget_drops_entry():
+    async def scenario():
+        store = IdempotencyStore(max_entries=2)
+        for key in ("a", "b", "c"):
+            await store.run(key, "fp", 60, Handler())
+        evicted = await store.run("a", "fp", 60, Handler())
+        store.forget("c")
+        forgotten = await store.run("c", "fp", 60, Handler())
+        return evicted[1], forgotten[1]
+
+    assert asyncio.run(scenario()) == (False, False)
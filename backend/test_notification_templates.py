@@ -0,0 +1,55 @@
+"""
+Tests for compiled notification templates (app/services/notification_templates.py).
+compile_template must render exactly like str.format_map.
+
+Run from backend/:
+    python -m pytest -q test_notification_templates.py
+"""
+
+import pytest
+
+from app.services import notification_templates
+from app.services.notification_service import DEFAULT_TEMPLATES
+from app.services.notification_templates import compile_template
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "No placeholders at all",
+        "100% sure about {medicine_name}",
+        "{medicine_name}: {medicine_name} again, %s stays literal",
+        "{customer_name} needs {medicine_name} ({quantity} left)",
+        "Discount {{escaped}} for {medicine_name}",
+        "Price {price:.2f} for {medicine_name}",
+        "{medicine_name!r} quoted",
+    ],
+)
+def test_compiled_output_matches_format_map(source):
+    values = {"medicine_name": "Aspirin", "customer_name": "Asha", "quantity": 3, "price": 12.5}
+    assert compile_template(source)(values) == source.format_map(values)
+
+
+def test_missing_field_raises_key_error():
+    with pytest.raises(KeyError):
+        compile_template("Hello {customer_name}")({"medicine_name": "Aspirin"})
+
+
+def test_malformed_template_is_rejected():
+    with pytest.raises(ValueError):
+        compile_template("Unclosed {medicine_name")
+
+
+def test_every_default_template_renders():
+    values = {"medicine_name": "Aspirin", "current_stock": 4, "refill_link": "https://example.test/refill"}
+    for name, source in DEFAULT_TEMPLATES.items():
+        template = notification_templates.get(name)
+        for channel in notification_templates.CHANNELS:
+            if source.get(channel):
+                assert template.render(channel, values) == source[channel].format_map(values)
+
+
+def test_unknown_channel_raises():
+    name = next(iter(DEFAULT_TEMPLATES))
+    with pytest.raises(KeyError):
+        notification_templates.get(name).render("fax_body", {})
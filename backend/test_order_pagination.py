@@ -0,0 +1,94 @@
+"""
+Tests for keyset pagination of the order listings (app/routes/orders.py).
+The keyset walk runs against a throwaway local fallback store; no server or
+primary database needed, only the usual backend environment variables.
+
+Run from backend/:
+    python -m pytest -q test_order_pagination.py
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.order import Order
+from app.routes import orders
+from app.services import local_order_fallback
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect())).replace("\n", " ")
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = orders._encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert orders._decode_cursor(cursor) == (created_at, 42)
+
+
+def test_missing_cursor_is_first_page():
+    assert orders._decode_cursor(None) is None
+    assert orders._decode_cursor("") is None
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(HTTPException) as excinfo:
+        orders._decode_cursor("not-a-cursor")
+    assert excinfo.value.status_code == 400
+
+
+def test_paginate_newest_first():
+    cursor = orders._encode_cursor(datetime(2025, 3, 1, tzinfo=timezone.utc), 7)
+    sql = _sql(orders._paginate(select(Order), cursor, 50, True))
+    assert "(orders.created_at, orders.id) < (" in sql
+    assert "ORDER BY orders.created_at DESC, orders.id DESC" in sql
+    assert "LIMIT" in sql
+
+
+def test_paginate_oldest_first_without_cursor():
+    stmt = orders._paginate(select(Order), None, 50, False)
+    sql = _sql(stmt)
+    assert "WHERE" not in sql
+    assert "ORDER BY orders.created_at ASC, orders.id ASC" in sql
+    # One extra row tells the caller whether another page exists.
+    assert stmt._limit_clause.value == 51
+
+
+def test_finish_page_sets_next_cursor_only_when_more_rows():
+    rows = [SimpleNamespace(id=i, created_at=datetime(2025, 1, i, tzinfo=timezone.utc)) for i in range(1, 4)]
+
+    response = Response()
+    assert orders._finish_page(rows, 3, response, order_of=lambda row: row) == rows
+    assert orders.NEXT_CURSOR_HEADER not in response.headers
+
+    response = Response()
+    page = orders._finish_page(rows, 2, response, order_of=lambda row: row)
+    assert page == rows[:2]
+    assert orders._decode_cursor(response.headers[orders.NEXT_CURSOR_HEADER]) == (rows[1].created_at, 2)
+
+
+def test_fallback_store_keyset_walk(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_order_fallback, "DB_PATH", tmp_path / "fallback.db")
+    for _ in range(7):
+        local_order_fallback.create_fallback_order(
+            {"user_id": "U1", "medicine_id": 1, "quantity": 1, "status": "pending"}, "test"
+        )
+
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        rows = orders._fallback_order_rows(["pending"], 3, False, cursor, user_id="U1")
+        page = orders._finish_page(rows, 3, response)
+        seen.extend(order.id for order, _, _ in page)
+        cursor = response.headers.get(orders.NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    # Rows share created_at to the second, so ties must be broken by id.
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == 7
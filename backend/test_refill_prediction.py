@@ -0,0 +1,59 @@
+"""
+Tests for bulk refill-date prediction (app/services/refill_prediction.py).
+
+Run from backend/:
+    python -m pytest -q test_refill_prediction.py
+"""
+
+from datetime import date
+
+import pandas as pd
+
+from app.services.refill_prediction import HISTORY_COLUMNS, predict_refill_dates
+
+
+def _history(*rows):
+    return pd.DataFrame(list(rows), columns=HISTORY_COLUMNS)
+
+
+def test_refill_date_is_purchase_plus_supply_days():
+    predicted = predict_refill_dates(_history((1, "C1", "Aspirin", 30, date(2025, 1, 1), 2)))
+    assert predicted["refill_date"].tolist() == [pd.Timestamp(2025, 1, 16)]
+
+
+def test_latest_purchase_wins_per_customer_and_medicine():
+    predicted = predict_refill_dates(
+        _history(
+            (1, "C1", "Aspirin", 10, date(2025, 1, 1), 1),
+            (2, "C1", "Aspirin", 20, date(2025, 2, 1), 1),
+            (3, "C1", "Zinc", 5, date(2025, 1, 5), 1),
+            (4, "C2", "Aspirin", 7, date(2025, 1, 1), 1),
+        )
+    )
+    by_key = {(row.customer_id, row.medicine_name): row for row in predicted.itertuples()}
+    assert len(by_key) == 3
+    assert by_key[("C1", "Aspirin")].id == 2
+    assert by_key[("C1", "Aspirin")].refill_date == pd.Timestamp(2025, 2, 21)
+
+
+def test_same_day_purchases_break_ties_on_id():
+    predicted = predict_refill_dates(
+        _history(
+            (5, "C1", "Aspirin", 10, date(2025, 1, 1), 1),
+            (4, "C1", "Aspirin", 30, date(2025, 1, 1), 1),
+        )
+    )
+    assert predicted["id"].tolist() == [5]
+
+
+def test_unusable_rows_are_ignored():
+    predicted = predict_refill_dates(
+        _history(
+            (1, "C1", "Aspirin", 0, date(2025, 1, 1), 1),
+            (2, "C1", "Zinc", 10, date(2025, 1, 1), 0),
+            (3, None, "Aspirin", 10, date(2025, 1, 1), 1),
+            (4, "C1", "Iron", 10, None, 1),
+        )
+    )
+    assert predicted.empty
+    assert "refill_date" in predicted.columns
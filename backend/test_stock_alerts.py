@@ -0,0 +1,105 @@
+"""
+Tests for debounced low-stock alert windows (app/services/stock_alerts.py).
+The database dispatch is replaced per test; no server or database needed,
+only the usual backend environment variables.
+
+Run from backend/:
+    python -m pytest -q test_stock_alerts.py
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import notification_templates, stock_alerts
+
+THRESHOLD = 10
+
+
+@pytest.fixture(autouse=True)
+def clean_window():
+    stock_alerts._pending.clear()
+    stock_alerts._flush_task = None
+    yield
+    stock_alerts._pending.clear()
+    stock_alerts._flush_task = None
+
+
+def _changes(*stocks, medicine_id=1, window=60):
+    """Apply consecutive stock levels inside one window; returns the pending entry."""
+
+    async def scenario():
+        for previous, updated in zip(stocks, stocks[1:]):
+            stock_alerts.record_stock_change(medicine_id, "Aspirin", previous, updated, THRESHOLD, window)
+        task = stock_alerts._flush_task
+        if task is not None:
+            task.cancel()
+        return stock_alerts._pending.get(medicine_id)
+
+    return asyncio.run(scenario())
+
+
+def test_stock_status_levels():
+    assert stock_alerts.stock_status(0, THRESHOLD) == "critical"
+    assert stock_alerts.stock_status(3, THRESHOLD) == "low"
+    assert stock_alerts.stock_status(10, THRESHOLD) == "ok"
+
+
+def test_no_crossing_queues_nothing():
+    assert _changes(50, 40, 30) is None
+
+
+def test_burst_collapses_into_latest_state():
+    entry = _changes(50, 8, 5, 0)
+    assert entry["status"] == "critical"
+    assert entry["stock"] == 0
+    assert entry["window_start"] == "ok"
+
+
+def test_drop_and_recover_within_window_is_dropped():
+    assert _changes(50, 5, 0, 50) is None
+
+
+def test_recovery_of_existing_alert_is_kept():
+    # Already low when the window opened, so stock_alerts has an active row to resolve.
+    entry = _changes(5, 0, 50)
+    assert entry["status"] == "ok"
+    assert entry["window_start"] == "low"
+
+
+def test_improving_but_still_low_is_not_an_alert():
+    assert _changes(0, 5) is None
+
+
+def test_failed_flush_requeues_then_gives_up(monkeypatch):
+    calls = []
+
+    async def failing_dispatch(session, events):
+        calls.append([event["medicine_id"] for event in events])
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(stock_alerts, "_dispatch", failing_dispatch)
+    monkeypatch.setattr(stock_alerts.settings, "STOCK_ALERT_WINDOW_SECONDS", 0.01)
+
+    async def scenario():
+        stock_alerts.record_stock_change(1, "Aspirin", 50, 5, THRESHOLD, 0.01)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not stock_alerts._pending and (stock_alerts._flush_task is None or stock_alerts._flush_task.done()):
+                break
+
+    asyncio.run(scenario())
+    assert calls == [[1]] * stock_alerts.MAX_FLUSH_ATTEMPTS
+    assert stock_alerts._pending == {}
+
+
+def test_broken_template_override_falls_back_to_default(monkeypatch):
+    name = stock_alerts.TEMPLATE_FOR_LEVEL["warning"]
+    broken = notification_templates._compile(
+        {"name": name, "notification_type": "stock_alert", "sms_template": "{medicine_name} {unknown_field}"}
+    )
+    monkeypatch.setitem(notification_templates._registry, name, broken)
+
+    message = notification_templates.render_or_default(name, "sms_template", {"medicine_name": "Aspirin"})
+    assert message == notification_templates._DEFAULTS[name].render("sms_template", {"medicine_name": "Aspirin"})
+    assert "Aspirin" in message